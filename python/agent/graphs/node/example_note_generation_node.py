@@ -22,7 +22,8 @@ sys.path.insert(0, str(backend_path))
 agent_path = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(agent_path))
 
-from app.services.note import NoteGenerator
+from app.services.artifact_cache import get_artifact_cache
+from app.services.note import get_note_generator
 from app.models.audio_model import AudioDownloadResult
 from app.models.transcriber_model import TranscriptResult
 from app.models.notes_model import NoteResult
@@ -100,7 +101,7 @@ def generate_single_note_from_example_sync(video_id: str, example_dir: Path, mod
     Returns:
         Dict: 笔记结果
     """
-    generator = NoteGenerator()
+    generator = get_note_generator()
     
     try:
         # 为每个视频生成唯一的 task_id
@@ -109,9 +110,6 @@ def generate_single_note_from_example_sync(video_id: str, example_dir: Path, mod
         # 从 example 目录创建 AudioDownloadResult
         audio_meta = create_audio_meta_from_example_file(video_id, example_dir)
         
-        # 设置视频路径，供后续使用
-        generator.video_path = Path(audio_meta.video_path) if audio_meta.video_path else None
-        
         # 获取 GPT 实例
         from app.services.provider import ProviderService
         provider = ProviderService.get_provider_by_id(provider_id)
@@ -129,10 +127,8 @@ def generate_single_note_from_example_sync(video_id: str, example_dir: Path, mod
         )
         gpt = GPTFactory().from_config(config)
         
-        # 缓存文件路径
-        from app.services.note import NOTE_OUTPUT_DIR
-        transcript_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_transcript.json"
-        markdown_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_markdown.md"
+        # 转写结果和笔记按视频缓存（见 artifact_cache）
+        cache = get_artifact_cache()
         
         # 更新状态
         generator._update_status(task_id, TaskStatus.PARSING)
@@ -140,8 +136,9 @@ def generate_single_note_from_example_sync(video_id: str, example_dir: Path, mod
         # 1. 转写音频（跳过下载）
         generator._update_status(task_id, TaskStatus.TRANSCRIBING)
         transcript = generator._transcribe_audio(
-            audio_file=audio_meta.file_path,
-            transcript_cache_file=transcript_cache_file,
+            audio_meta=audio_meta,
+            cache=cache,
+            task_id=task_id,
             status_phase=TaskStatus.TRANSCRIBING,
         )
         
@@ -150,7 +147,9 @@ def generate_single_note_from_example_sync(video_id: str, example_dir: Path, mod
             audio_meta=audio_meta,
             transcript=transcript,
             gpt=gpt,
-            markdown_cache_file=markdown_cache_file,
+            cache=cache,
+            note_key=generator._note_cache_key(model_name=model_name, provider_id=provider_id, transcript=transcript),
+            task_id=task_id,
             link=False,
             screenshot=False,
             formats=[],
@@ -227,11 +226,7 @@ async def example_note_generation_node(state: AIState) -> AIState:
     if not example_dir.exists():
         raise Exception(f"example 目录不存在: {example_dir}")
     
-    # 强制使用 Groq 转录器
-    os.environ["TRANSCRIBER_TYPE"] = "groq"
-    if not os.getenv("GROQ_TRANSCRIBER_MODEL"):
-        os.environ["GROQ_TRANSCRIBER_MODEL"] = "whisper-large-v3"
-    print(f"[Example Note Generation Node] 使用 Groq 转录器")
+    print(f"[Example Note Generation Node] 使用转录器: {get_note_generator().transcriber_type}")
     
     # 获取模型配置
     try:
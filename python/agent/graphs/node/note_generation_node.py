@@ -1,6 +1,10 @@
 """
 笔记生成节点
-使用方案三（异步节点）+ ThreadPoolExecutor 并发生成笔记
+异步节点，支持三种笔记生成引擎（通过环境变量 NOTE_ENGINE 选择）：
+- pipeline（默认）：分阶段流水线（下载/音频预处理/转写/笔记/保存 各自独立线程池）
+- async：NoteGenerator.agenerate，转写和 LLM 调用在事件循环中通过 AsyncOpenAI 执行，
+  下载和 ffmpeg 在有界的阻塞任务线程池中执行
+- celery：发送到 Celery worker 执行（见 app/worker），API 进程只异步等待结果
 """
 
 import asyncio
@@ -9,7 +13,6 @@ import os
 import uuid
 from pathlib import Path
 from typing import Dict, List
-from concurrent.futures import ThreadPoolExecutor
 
 from graphs.state import AIState
 
@@ -21,11 +24,55 @@ sys.path.insert(0, str(backend_path))
 agent_path = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(agent_path))
 
-# 默认使用 Groq 转录器（如果未设置环境变量，在 note_generation_node 函数中设置）
-
-from app.services.note import NoteGenerator
+from app.services.note import get_note_generator
+from app.services.note_pipeline import get_note_pipeline
+from app.models.notes_model import NoteResult
 from app.enmus.note_enums import DownloadQuality
 from utils.config_helper import get_model_config_from_state
+from utils.stream_events import emit_event, EVENT_NOTE_DONE, EVENT_NOTE_FAILED
+
+NOTE_ENGINE_PIPELINE = "pipeline"
+NOTE_ENGINE_ASYNC = "async"
+NOTE_ENGINE_CELERY = "celery"
+
+
+def note_result_to_dict(video: Dict, note_result: NoteResult) -> Dict:
+    """
+    将 NoteResult 转换为 summary_node / trace_node 使用的笔记结果字典
+    
+    Args:
+        video: 视频信息 {"url": str, "platform": str, "title": str}
+        note_result: 笔记生成结果
+        
+    Returns:
+        Dict: 笔记结果
+    """
+    # 注意：NoteResult 的字段都是必需的（除了 Optional 标注的），所以不需要过多的 None 检查
+    return {
+        "url": video.get("url", ""),
+        "platform": video.get("platform", note_result.audio_meta.platform),
+        "title": note_result.audio_meta.title,
+        "markdown": note_result.markdown,
+        "transcript": {
+            "language": note_result.transcript.language or "unknown",  # language 是 Optional[str]
+            "full_text": note_result.transcript.full_text,
+            "segments": [
+                {
+                    "start": seg.start,
+                    "end": seg.end,
+                    "text": seg.text
+                }
+                for seg in note_result.transcript.segments
+            ]
+        },
+        "audio_meta": {
+            "title": note_result.audio_meta.title,
+            "duration": note_result.audio_meta.duration,
+            "video_id": note_result.audio_meta.video_id,
+            "platform": note_result.audio_meta.platform,
+            "cover_url": note_result.audio_meta.cover_url or "",  # cover_url 是 Optional[str]
+        }
+    }
 
 
 def generate_single_note_sync(video: Dict, model_name: str, provider_id: str) -> Dict:
@@ -43,14 +90,13 @@ def generate_single_note_sync(video: Dict, model_name: str, provider_id: str) ->
     Raises:
         Exception: 如果笔记生成失败
     """
-    generator = NoteGenerator()
+    generator = get_note_generator()
     
     try:
-        # 为每个视频生成唯一的 task_id，用于状态跟踪、缓存和元数据保存
+        # 为每个视频生成唯一的 task_id，用于状态跟踪和元数据保存（缓存按 video_id 复用，见 artifact_cache）
         task_id = str(uuid.uuid4())
         
-        # 为了 trace_node 能够生成关键帧，需要下载视频
-        # 设置 video_understanding=True 但 grid_size=None，这样会下载视频但不会生成缩略图网格
+        # 只下载音频：trace_node 在总结完成后按引用的时间戳按需下载视频片段
         note_result = generator.generate(
             video_url=video["url"],
             platform=video["platform"],
@@ -64,43 +110,16 @@ def generate_single_note_sync(video: Dict, model_name: str, provider_id: str) ->
             style=None,
             extras=None,
             output_path=None,
-            video_understanding=True,  # 设置为 True 以下载视频（供 trace_node 使用）
+            video_understanding=False,
             video_interval=0,
-            grid_size=None,  # 不生成缩略图网格，只下载视频
+            grid_size=None,
         )
         
         if not note_result:
             raise Exception(f"笔记生成返回 None: {video.get('url', 'unknown')}")
         
         # 构建返回的笔记结果字典（确保与 summary_node 期望的格式匹配）
-        # 注意：NoteResult 的字段都是必需的（除了 Optional 标注的），所以不需要过多的 None 检查
-        result_dict = {
-            "url": video.get("url", ""),
-            "platform": video.get("platform", note_result.audio_meta.platform),
-            "title": note_result.audio_meta.title,
-            "markdown": note_result.markdown,
-            "transcript": {
-                "language": note_result.transcript.language or "unknown",  # language 是 Optional[str]
-                "full_text": note_result.transcript.full_text,
-                "segments": [
-                    {
-                        "start": seg.start,
-                        "end": seg.end,
-                        "text": seg.text
-                    }
-                    for seg in note_result.transcript.segments
-                ]
-            },
-            "audio_meta": {
-                "title": note_result.audio_meta.title,
-                "duration": note_result.audio_meta.duration,
-                "video_id": note_result.audio_meta.video_id,
-                "platform": note_result.audio_meta.platform,
-                "cover_url": note_result.audio_meta.cover_url or "",  # cover_url 是 Optional[str]
-            }
-        }
-        
-        return result_dict
+        return note_result_to_dict(video, note_result)
     except Exception as e:
         raise Exception(f"笔记生成失败 {video.get('url', 'unknown')}: {str(e)}")
 
@@ -109,10 +128,11 @@ async def note_generation_node(state: AIState) -> AIState:
     """
     笔记生成节点 - 异步并发生成所有视频的笔记
     
-    使用方案三：异步节点 + ThreadPoolExecutor
+    所有视频提交到应用级共享的分阶段流水线：下载、音频预处理、转写、笔记 LLM、
+    元数据保存各有独立的线程池，视频 2 下载时视频 1 可以同时转写
     
-    注意：默认使用 Groq 转录器（支持并发，速度快）
-    可以通过环境变量 TRANSCRIBER_TYPE 覆盖
+    注意：转写器和转写模型由进程启动时读取的 NotePipelineConfig 决定
+    （环境变量 TRANSCRIBER_TYPE / GROQ_TRANSCRIBER_MODEL），本节点不再修改环境变量
     
     Args:
         state: AIState
@@ -130,12 +150,8 @@ async def note_generation_node(state: AIState) -> AIState:
         state["note_results"] = []
         return state
     
-    # 强制使用 Groq 转录器（覆盖环境变量中的旧值）
-    os.environ["TRANSCRIBER_TYPE"] = "groq"
-    # 设置 Groq 转录模型
-    if not os.getenv("GROQ_TRANSCRIBER_MODEL"):
-        os.environ["GROQ_TRANSCRIBER_MODEL"] = "whisper-large-v3"
-    print(f"[Note Generation Node] 使用 Groq 转录器（支持并发，速度快）")
+    generator = get_note_generator()
+    print(f"[Note Generation Node] 使用转录器: {generator.transcriber_type}（模型: {generator.config.groq_transcriber_model}）")
     
     # 获取模型配置
     try:
@@ -146,29 +162,68 @@ async def note_generation_node(state: AIState) -> AIState:
     except Exception as e:
         raise Exception(f"获取模型配置失败: {str(e)}")
     
-    # 获取当前事件循环
-    loop = asyncio.get_event_loop()
+    note_engine = os.getenv("NOTE_ENGINE", NOTE_ENGINE_PIPELINE).lower()
+    pipeline = get_note_pipeline()
+    # 同一次图运行的视频属于同一分组，流水线在分组之间轮询放行，避免大请求饿死小请求
+    run_group = str(uuid.uuid4())
     
-    # 创建线程池（限制并发数量为5）
-    max_workers = min(5, len(video_urls))
-    executor = ThreadPoolExecutor(max_workers=max_workers)
+    print(f"[Note Generation Node] 开始并发生成 {len(video_urls)} 个视频的笔记（引擎: {note_engine}）")
     
-    print(f"[Note Generation Node] 开始并发生成 {len(video_urls)} 个视频的笔记（并发数: {max_workers}）")
-    
-    # 定义异步任务（将同步函数在线程池中运行）
+    # 定义异步任务（提交到流水线等待其 Future 完成，或直接 await 异步生成器）
     async def generate_single_note_async(video: Dict) -> Dict:
         try:
-            return await loop.run_in_executor(
-                executor,
-                generate_single_note_sync,
-                video,
-                model_name,
-                provider_id
-            )
+            # 只下载音频（video_understanding=False），关键帧所需的视频片段由 trace_node 按需下载
+            if note_engine == NOTE_ENGINE_CELERY:
+                # 仅在启用 worker 层时导入 Celery
+                from app.worker.tasks import agenerate_note_via_worker
+                note_result = await agenerate_note_via_worker(
+                    video_url=video["url"],
+                    platform=video["platform"],
+                    task_id=str(uuid.uuid4()),
+                    model_name=model_name,
+                    provider_id=provider_id,
+                    quality=DownloadQuality.medium,
+                    video_understanding=False,
+                )
+            elif note_engine == NOTE_ENGINE_ASYNC:
+                note_result = await generator.agenerate(
+                    video_url=video["url"],
+                    platform=video["platform"],
+                    quality=DownloadQuality.medium,
+                    task_id=str(uuid.uuid4()),
+                    model_name=model_name,
+                    provider_id=provider_id,
+                    video_understanding=False,
+                )
+            else:
+                future = pipeline.submit(
+                    video_url=video["url"],
+                    platform=video["platform"],
+                    task_id=str(uuid.uuid4()),
+                    model_name=model_name,
+                    provider_id=provider_id,
+                    quality=DownloadQuality.medium,
+                    video_understanding=False,
+                    group=run_group,
+                )
+                note_result = await asyncio.wrap_future(future)
+            if not note_result:
+                raise Exception(f"笔记生成返回 None: {video.get('url', 'unknown')}")
+            result_dict = note_result_to_dict(video, note_result)
+            # 流式接口：每个视频完成时立即推送
+            await emit_event(EVENT_NOTE_DONE, {
+                "url": result_dict["url"],
+                "platform": result_dict["platform"],
+                "title": result_dict["title"],
+                "video_id": result_dict["audio_meta"]["video_id"],
+                "markdown": result_dict["markdown"],
+            })
+            return result_dict
         except Exception as e:
             # 记录单个视频处理失败的错误，但不中断其他视频的处理
             video_url = video.get("url", "unknown")
             print(f"[Note Generation Node] 视频处理失败 {video_url}: {str(e)}")
+            await emit_event(EVENT_NOTE_FAILED, {"url": video_url, "error": str(e)})
             raise  # 重新抛出异常，让 asyncio.gather 处理
     
     # 创建所有任务
@@ -184,12 +239,12 @@ async def note_generation_node(state: AIState) -> AIState:
         failed_videos = []
         
         for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                # 这是一个异常，记录失败的视频
+            if isinstance(result, BaseException):
+                # 这是一个异常（包括被取消的任务），记录失败的视频
                 video_url = video_urls[i].get("url", "unknown")
-                failed_videos.append((video_url, str(result)))
+                failed_videos.append((video_url, str(result) or type(result).__name__))
                 print(f"[Note Generation Node] ⚠ 视频处理失败（已跳过）: {video_url}")
-                print(f"   错误原因: {str(result)}")
+                print(f"   错误原因: {str(result) or type(result).__name__}")
             else:
                 # 这是一个成功的笔记结果
                 note_results.append(result)
@@ -200,6 +255,8 @@ async def note_generation_node(state: AIState) -> AIState:
         total_count = len(video_urls)
         
         print(f"[Note Generation Node] 笔记生成完成: 成功 {success_count}/{total_count}, 失败 {fail_count}/{total_count}")
+        if note_engine == NOTE_ENGINE_PIPELINE:
+            print(f"[Note Generation Node] 流水线各阶段状态: {pipeline.stats()}")
         
         # 验证结果
         if not note_results:
@@ -214,12 +271,7 @@ async def note_generation_node(state: AIState) -> AIState:
         return state
         
     except Exception as e:
-        # 关闭线程池
-        executor.shutdown(wait=False)
         error_msg = f"笔记生成过程中出错: {str(e)}"
         print(f"[Note Generation Node] {error_msg}")
         raise Exception(error_msg)
-    finally:
-        # 确保关闭线程池
-        executor.shutdown(wait=True)
 
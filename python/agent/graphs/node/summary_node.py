@@ -1,128 +1,193 @@
 """
 多视频总结节点（Agent2）
-使用 LangGraph prebuilt create_react_agent 实现
+直接调用对话模型生成总结；默认流式输出，边生成边按章节增量去重
+视频较多时分层总结：先分组并发生成局部总结，再合并为最终总结（保留 -videoN 时间戳标记）
+
+配置（环境变量）：
+    SUMMARY_STREAMING                 是否流式生成总结（默认 true）
+    SUMMARY_EVIDENCE_TOP_K            每个视频的时间戳参考片段数上限（默认 30）
+    SUMMARY_EVIDENCE_MAX_TOKENS       每个视频的时间戳参考 token 预算（默认 1500）
+    SUMMARY_HIERARCHICAL_MIN_VIDEOS   视频数超过该值时分层总结（默认 6，0 表示不分层）
+    SUMMARY_GROUP_SIZE                分层总结时每组的视频数（默认 4）
+    SUMMARY_GROUP_CONCURRENCY         同时生成的局部总结数（默认 4）
 """
 
+import asyncio
+import math
+import os
+import re
+from typing import List, Optional
+
 from graphs.state import AIState
-from tools.llm_tool import get_llm_client
-from tools.summary_tools import summary_tools
-from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage
-from prompts.summary_prompts import SUMMARY_SYSTEM_PROMPT, SUMMARY_USER_PROMPT_TEMPLATE
+from tools.llm_tool import get_llm_client, get_stream_cache, make_stream_cache_key
+from langchain_core.messages import HumanMessage, SystemMessage
+from prompts.summary_prompts import (
+    SUMMARY_SYSTEM_PROMPT,
+    SUMMARY_USER_PROMPT_TEMPLATE,
+    SUMMARY_GROUP_NOTE,
+    SUMMARY_MERGE_USER_PROMPT_TEMPLATE,
+)
 from utils.config_helper import get_model_config_from_state
-from typing import Optional
-import re
+from utils.evidence_selector import select_evidence
+from utils.stream_events import emit_event, EVENT_SUMMARY_SECTION, TAG_NO_STREAM
 
-# 创建 agent executor（单例模式，但会根据 state 中的配置动态创建）
-_agent_executors = {}  # 使用字典存储不同配置的 executor
+SUMMARY_STREAMING = os.getenv("SUMMARY_STREAMING", "true").lower() in ("1", "true", "yes")
+# 每个视频提供给总结模型的时间戳参考：最多片段数和 token 预算（按与问题的相关度选取）
+SUMMARY_EVIDENCE_TOP_K = int(os.getenv("SUMMARY_EVIDENCE_TOP_K", "30"))
+SUMMARY_EVIDENCE_MAX_TOKENS = int(os.getenv("SUMMARY_EVIDENCE_MAX_TOKENS", "1500"))
+# 分层总结：视频数超过该值时分组生成局部总结再合并（0 表示不分层），每组视频数和同时生成的分组数
+SUMMARY_HIERARCHICAL_MIN_VIDEOS = int(os.getenv("SUMMARY_HIERARCHICAL_MIN_VIDEOS", "6"))
+SUMMARY_GROUP_SIZE = int(os.getenv("SUMMARY_GROUP_SIZE", "4"))
+SUMMARY_GROUP_CONCURRENCY = int(os.getenv("SUMMARY_GROUP_CONCURRENCY", "4"))
 
 
-def _deduplicate_summary(summary: str) -> str:
+HEADER_PATTERN = re.compile(r'^(#{1,6})\s+(.+)$')
+
+
+def _normalize_text(text: str) -> str:
+    """标准化文本用于比较：移除时间戳、特殊字符，转为小写"""
+    # 移除时间戳标记
+    text = re.sub(r'\*?Content-\[\d{2}:\d{2}\](?:-video\d+)?', '', text)
+    text = re.sub(r'\[\[|\]\]', '', text)
+    # 移除特殊字符，只保留中文、英文、数字
+    text = re.sub(r'[^\w\u4e00-\u9fff]+', '', text.lower())
+    return text
+
+
+class SummaryDeduplicator:
     """
-    去除摘要中的重复内容
+    增量式摘要去重器
     
     策略：
-    1. 检测重复的标题（相同或相似的 Markdown 标题）
-    2. 检测重复的多行段落（完全相同的段落块）
+    1. 检测重复的标题（相同或相似的 Markdown 标题），跳过重复标题及其下属内容
+    2. 检测重复的多行段落（完全相同或高度相似的段落块）
     3. 检测重复的单行内容（相似度高的单行）
     4. 保留第一个出现的，删除后续重复的
     
-    Args:
-        summary: 原始摘要文本
-        
-    Returns:
-        去重后的摘要文本
+    文本以 Markdown 标题为界切分成章节：流式生成时每遇到下一个标题，上一个章节即已完整，
+    立即去重并输出；已见过的标题/段落/单行在章节之间共享，结果与对全文一次性去重一致。
     """
-    if not summary or not summary.strip():
-        return summary
     
-    lines = summary.split('\n')
-    seen_headers = {}  # 记录已见过的标题及其位置
-    seen_content = []  # 记录已见过的内容片段（单行）
-    seen_paragraphs = []  # 记录已见过的多行段落
-    result_lines = []
-    i = 0
+    def __init__(self):
+        self._seen_headers = set()  # 已见过的标题
+        self._seen_content = []  # 已见过的内容片段（单行）
+        self._seen_paragraphs = []  # 已见过的多行段落
+        self._skip_level: Optional[int] = None  # 正在跳过的重复标题级别
+        self._buffer = ""  # 尚未形成完整行的文本
+        self._section: List[str] = []  # 当前章节已完整的行
+        self._emitted = False  # 是否已经输出过内容
     
-    def normalize_text(text: str) -> str:
-        """标准化文本用于比较：移除时间戳、特殊字符，转为小写"""
-        # 移除时间戳标记
-        text = re.sub(r'\*?Content-\[\d{2}:\d{2}\](?:-video\d+)?', '', text)
-        text = re.sub(r'\[\[|\]\]', '', text)
-        # 移除特殊字符，只保留中文、英文、数字
-        text = re.sub(r'[^\w\u4e00-\u9fff]+', '', text.lower())
+    def feed(self, text: str) -> str:
+        """
+        追加一段增量文本，返回已完整章节去重后的文本（没有完整章节时返回空字符串）
+        """
+        self._buffer += text
+        if "\n" not in self._buffer:
+            return ""
+        *complete_lines, self._buffer = self._buffer.split("\n")
+        
+        output = []
+        for line in complete_lines:
+            output.extend(self._feed_line(line))
+        return self._render(output)
+    
+    def _feed_line(self, line: str) -> List[str]:
+        # 遇到新标题：之前的章节已完整，去重后返回其保留的行
+        output = []
+        if HEADER_PATTERN.match(line.strip()) and self._section:
+            output = self._process_section(self._section)
+            self._section = []
+        self._section.append(line)
+        return output
+    
+    def flush(self) -> str:
+        """输入结束，处理剩余内容并返回去重后的文本"""
+        output = self._render(self._feed_line(self._buffer) + self._process_section(self._section))
+        self._buffer = ""
+        self._section = []
+        return output
+    
+    def _render(self, lines: List[str]) -> str:
+        # 各次输出直接拼接后等价于 '\n'.join(全部保留的行)
+        if not lines:
+            return ""
+        text = "\n".join(lines)
+        if self._emitted:
+            text = "\n" + text
+        self._emitted = True
         return text
     
-    while i < len(lines):
-        line = lines[i]
+    def _process_section(self, lines: List[str]) -> List[str]:
+        """对一个章节（以标题开头，或文档开头无标题的部分）去重，返回保留的行"""
+        result_lines = []
+        i = 0
         
-        # 检测 Markdown 标题（#、##、### 等）
-        header_match = re.match(r'^(#{1,6})\s+(.+)$', line.strip())
-        if header_match:
-            header_level = len(header_match.group(1))
-            header_text = header_match.group(2).strip()
-            
-            # 标准化标题文本用于比较
-            normalized_header = normalize_text(header_text)
-            
-            # 检查是否已见过相同或相似的标题
-            if normalized_header in seen_headers:
-                # 找到重复的标题，跳过这个标题及其后续内容，直到下一个同级或更高级的标题
-                print(f"[Summary Agent] 检测到重复标题: {header_text}，将跳过")
-                skip_level = header_level
-                i += 1
-                # 跳过直到下一个同级或更高级的标题，或文档结束
-                while i < len(lines):
-                    next_line = lines[i]
-                    next_header_match = re.match(r'^(#{1,6})\s+(.+)$', next_line.strip())
-                    if next_header_match:
-                        next_level = len(next_header_match.group(1))
-                        # 如果遇到同级或更高级的标题，停止跳过
-                        if next_level <= skip_level:
-                            break
-                    i += 1
-                continue
+        # 上一个重复标题的下属内容：跳过，直到遇到同级或更高级的标题
+        if self._skip_level is not None:
+            header_match = HEADER_PATTERN.match(lines[0].strip())
+            if header_match and len(header_match.group(1)) <= self._skip_level:
+                self._skip_level = None
             else:
-                # 新标题，记录并保留
-                seen_headers[normalized_header] = i
-                result_lines.append(line)
-                i += 1
-                continue
+                return result_lines
         
-        # 检测多行段落重复（连续的非空行组成段落）
-        line_stripped = line.strip()
-        if line_stripped:
-            # 收集当前段落（直到遇到空行或标题）
-            paragraph_lines = []
-            j = i
-            while j < len(lines):
-                current_line = lines[j]
-                # 遇到标题，停止收集
-                if re.match(r'^(#{1,6})\s+', current_line.strip()):
-                    break
-                # 遇到空行，可能是段落结束
-                if not current_line.strip():
-                    # 跳过连续的空行，但记录空行位置
-                    break
-                paragraph_lines.append(current_line)
-                j += 1
+        while i < len(lines):
+            line = lines[i]
             
-            # 判断是单行还是多行段落
-            if len(paragraph_lines) > 1:
-                # 多行段落
-                paragraph_text = '\n'.join(paragraph_lines)
-                paragraph_normalized = normalize_text(paragraph_text)
+            # 检测 Markdown 标题（#、##、### 等）
+            header_match = HEADER_PATTERN.match(line.strip())
+            if header_match:
+                header_level = len(header_match.group(1))
+                header_text = header_match.group(2).strip()
                 
-                # 对于多行段落，如果长度足够，进行精确匹配检查
-                if len(paragraph_normalized) >= 20:  # 只对足够长的段落进行去重
-                    # 先检查是否完全相同（精确匹配）
-                    if paragraph_normalized in seen_paragraphs:
-                        print(f"[Summary Agent] 检测到重复的多行段落（{len(paragraph_lines)}行），将跳过")
-                        i = j
-                        continue
-                    else:
+                # 标准化标题文本用于比较
+                normalized_header = _normalize_text(header_text)
+                
+                # 检查是否已见过相同或相似的标题
+                if normalized_header in self._seen_headers:
+                    # 找到重复的标题，跳过这个标题及其后续内容，直到下一个同级或更高级的标题
+                    print(f"[Summary Agent] 检测到重复标题: {header_text}，将跳过")
+                    self._skip_level = header_level
+                    return result_lines
+                else:
+                    # 新标题，记录并保留
+                    self._seen_headers.add(normalized_header)
+                    result_lines.append(line)
+                    i += 1
+                    continue
+            
+            # 检测多行段落重复（连续的非空行组成段落）
+            line_stripped = line.strip()
+            if line_stripped:
+                # 收集当前段落（直到遇到空行或标题）
+                paragraph_lines = []
+                j = i
+                while j < len(lines):
+                    current_line = lines[j]
+                    # 遇到标题，停止收集
+                    if re.match(r'^(#{1,6})\s+', current_line.strip()):
+                        break
+                    # 遇到空行，段落结束
+                    if not current_line.strip():
+                        break
+                    paragraph_lines.append(current_line)
+                    j += 1
+                
+                # 判断是单行还是多行段落
+                if len(paragraph_lines) > 1:
+                    # 多行段落
+                    paragraph_text = '\n'.join(paragraph_lines)
+                    paragraph_normalized = _normalize_text(paragraph_text)
+                    
+                    # 对于多行段落，如果长度足够，进行精确匹配检查
+                    if len(paragraph_normalized) >= 20:  # 只对足够长的段落进行去重
+                        # 先检查是否完全相同（精确匹配）
+                        if paragraph_normalized in self._seen_paragraphs:
+                            print(f"[Summary Agent] 检测到重复的多行段落（{len(paragraph_lines)}行），将跳过")
+                            i = j
+                            continue
                         # 检查是否有高度相似的段落（相似度>90%）
                         is_duplicate_para = False
-                        for seen_para in seen_paragraphs:
+                        for seen_para in self._seen_paragraphs:
                             if len(seen_para) > 0:
                                 # 计算相似度：如果一个是另一个的子串，认为是重复
                                 if (paragraph_normalized in seen_para or seen_para in paragraph_normalized):
@@ -132,98 +197,236 @@ def _deduplicate_summary(summary: str) -> str:
                                         print(f"[Summary Agent] 检测到高度相似的多行段落（相似度: {similarity:.2f}），将跳过")
                                         break
                         
-                        if is_duplicate_para:
-                            i = j
-                            continue
-                        else:
+                        if not is_duplicate_para:
                             # 记录新段落
-                            seen_paragraphs.append(paragraph_normalized)
+                            self._seen_paragraphs.append(paragraph_normalized)
                             result_lines.extend(paragraph_lines)
-                            i = j
-                            continue
-                else:
-                    # 多行但长度不够，直接添加所有行（不做去重检查，因为短段落重复可能性低）
-                    result_lines.extend(paragraph_lines)
-                    i = j
-                    continue
-            # else: 单行，继续执行单行处理逻辑
-        
-        # 单行内容检测（处理单行或长度不够的多行段落的第一行）
-        if line_stripped:
-            # 移除时间戳标记用于比较
-            content_normalized = normalize_text(line_stripped)
-            
-            # 如果内容太短（少于5个字符），可能是格式标记，直接保留
-            if len(content_normalized) < 5:
-                result_lines.append(line)
-                i += 1
-                continue
-            
-            # 检查是否与已见过的内容重复
-            is_duplicate = False
-            for seen in seen_content:
-                if len(seen) > 0 and len(content_normalized) > 0:
-                    # 先检查是否完全相同
-                    if content_normalized == seen:
-                        is_duplicate = True
-                        print(f"[Summary Agent] 检测到完全相同的重复内容，将跳过")
-                        break
-                    # 再检查相似度（相似度>85%）
-                    similarity = 0
-                    if content_normalized in seen or seen in content_normalized:
-                        similarity = min(len(content_normalized), len(seen)) / max(len(content_normalized), len(seen))
+                        i = j
+                        continue
                     else:
-                        # 计算字符重叠度
-                        common_chars = set(content_normalized) & set(seen)
-                        total_chars = set(content_normalized) | set(seen)
-                        if len(total_chars) > 0:
-                            similarity = len(common_chars) / len(total_chars)
-                    
-                    if similarity > 0.85:  # 提高阈值，更严格
-                        is_duplicate = True
-                        print(f"[Summary Agent] 检测到重复内容，相似度: {similarity:.2f}")
-                        break
+                        # 多行但长度不够，直接添加所有行（不做去重检查，因为短段落重复可能性低）
+                        result_lines.extend(paragraph_lines)
+                        i = j
+                        continue
+                # else: 单行，继续执行单行处理逻辑
             
-            if is_duplicate:
+            # 单行内容检测（处理单行或长度不够的多行段落的第一行）
+            if line_stripped:
+                # 移除时间戳标记用于比较
+                content_normalized = _normalize_text(line_stripped)
+                
+                # 如果内容太短（少于5个字符），可能是格式标记，直接保留
+                if len(content_normalized) < 5:
+                    result_lines.append(line)
+                    i += 1
+                    continue
+                
+                # 检查是否与已见过的内容重复
+                is_duplicate = False
+                for seen in self._seen_content:
+                    if len(seen) > 0 and len(content_normalized) > 0:
+                        # 先检查是否完全相同
+                        if content_normalized == seen:
+                            is_duplicate = True
+                            print(f"[Summary Agent] 检测到完全相同的重复内容，将跳过")
+                            break
+                        # 再检查相似度（相似度>85%）
+                        similarity = 0
+                        if content_normalized in seen or seen in content_normalized:
+                            similarity = min(len(content_normalized), len(seen)) / max(len(content_normalized), len(seen))
+                        else:
+                            # 计算字符重叠度
+                            common_chars = set(content_normalized) & set(seen)
+                            total_chars = set(content_normalized) | set(seen)
+                            if len(total_chars) > 0:
+                                similarity = len(common_chars) / len(total_chars)
+                        
+                        if similarity > 0.85:  # 提高阈值，更严格
+                            is_duplicate = True
+                            print(f"[Summary Agent] 检测到重复内容，相似度: {similarity:.2f}")
+                            break
+                
+                if not is_duplicate:
+                    # 记录新内容（只记录较长的内容，避免短格式标记干扰）
+                    if len(content_normalized) >= 10:
+                        self._seen_content.append(content_normalized)
+                    result_lines.append(line)
                 i += 1
-                continue
             else:
-                # 记录新内容（只记录较长的内容，避免短格式标记干扰）
-                if len(content_normalized) >= 10:
-                    seen_content.append(content_normalized)
+                # 空行直接保留
                 result_lines.append(line)
                 i += 1
-        else:
-            # 空行直接保留
-            result_lines.append(line)
-            i += 1
+        
+        return result_lines
+
+
+def _cleanup_blank_lines(text: str) -> str:
+    """清理多余的空行（连续3个以上空行合并为2个）"""
+    return re.sub(r'\n{4,}', '\n\n\n', text)
+
+
+def _deduplicate_summary(summary: str) -> str:
+    """
+    去除摘要中的重复内容（一次性处理完整文本）
+    
+    Args:
+        summary: 原始摘要文本
+        
+    Returns:
+        去重后的摘要文本
+    """
+    if not summary or not summary.strip():
+        return summary
+    
+    deduplicator = SummaryDeduplicator()
+    result = deduplicator.feed(summary) + deduplicator.flush()
+    return _cleanup_blank_lines(result)
+
+
+def _get_llm(model_name: Optional[str] = None, provider_id: Optional[str] = None):
+    """获取或创建总结使用的 LLM 客户端"""
+    # get_llm_client 按供应商配置缓存客户端，供应商更新后自动失效；
+    # 相同视频笔记和问题的总结可以复用，开启 LLM 响应缓存
+    return get_llm_client(model_name=model_name, provider_id=provider_id, use_cache=True)
+
+
+async def _stream_summary(llm, messages) -> str:
+    """
+    流式生成总结：逐 token 接收模型输出（通过 astream_events 转发给调用方），
+    每完成一个章节立即去重并上报 summary_section 事件
+    LangChain 的 astream 不查询响应缓存，这里自行查找和写入：命中时直接按章节上报缓存的输出
+    """
+    deduplicator = SummaryDeduplicator()
+    parts = []
+    raw_parts = []
+    
+    async def publish(section: str):
+        if section:
+            parts.append(section)
+            await emit_event(EVENT_SUMMARY_SECTION, {"text": section})
+    
+    cache = get_stream_cache(llm)
+    key = make_stream_cache_key(llm, messages) if cache else None
+    cached = await cache.aget(key) if cache else None
+    if cached is not None:
+        print(f"[Summary Agent] 命中 LLM 响应缓存，直接使用缓存的总结")
+        raw_parts.append(cached)
+        await publish(deduplicator.feed(cached))
+    else:
+        async for chunk in llm.astream(messages):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if not text:
+                continue
+            raw_parts.append(text)
+            await publish(deduplicator.feed(text))
+    await publish(deduplicator.flush())
+    
+    raw_text = "".join(raw_parts)
+    if cache and cached is None and raw_text.strip():
+        await cache.aput(key, raw_text, model=llm.model_name, provider=str(llm.openai_api_base or ""))
+    
+    summary = _cleanup_blank_lines("".join(parts))
+    print(f"[Summary Agent] 流式生成完成，原始长度 {len(raw_text)} 字符，去重后 {len(summary)} 字符")
+    return summary
+
+
+async def _invoke_summary(llm, messages) -> str:
+    """非流式生成总结：等待完整输出后一次性去重"""
+    response = await llm.ainvoke(messages)
+    summary = response.content if isinstance(response.content, str) else ""
+    original_length = len(summary)
+    summary = _deduplicate_summary(summary)
+    if original_length != len(summary):
+        print(f"[Summary Agent] ✓ 已去除重复内容，长度从 {original_length} 减少到 {len(summary)} 字符")
+    return summary
+
+
+def _build_note_block(index: int, note: dict, question: str) -> str:
+    """
+    构建单个视频的笔记内容块（包含原始 transcript 时间戳参考）
     
-    result = '\n'.join(result_lines)
+    Args:
+        index: 视频编号（从 1 开始，全局编号，用于 -videoN 时间戳标记）
+        note: 单个视频的笔记结果
+        question: 用户问题（用于挑选相关的时间戳参考片段）
+    """
+    block = f"\n## 视频 {index}: {note.get('title', '未知标题')}\n\n"
+    block += f"**来源**: {note.get('platform', '未知平台')} - [{note.get('url', '未知链接')}]({note.get('url', '#')})\n\n"
     
-    # 清理多余的空行（连续3个以上空行合并为2个）
-    result = re.sub(r'\n{4,}', '\n\n\n', result)
+    # 添加原始 transcript segments 信息（帮助 LLM 理解时间戳和内容的对应关系）
+    transcript = note.get('transcript', {})
+    segments = transcript.get('segments', [])
+    if segments:
+        block += "**原始时间戳参考**（用于准确引用时间戳）：\n"
+        # 按与用户问题的相关度（BM25）选取片段，名额不足时均匀采样补齐（避免输入过长）
+        sampled_segments = select_evidence(
+            segments,
+            question,
+            top_k=SUMMARY_EVIDENCE_TOP_K,
+            max_tokens=SUMMARY_EVIDENCE_MAX_TOKENS,
+        )
+        
+        for seg in sampled_segments:
+            start = seg.get('start', 0)
+            mm = int(start) // 60
+            ss = int(start) % 60
+            text = seg.get('text', '').strip()
+            # 限制文本长度，避免单个segment太长
+            if len(text) > 150:
+                text = text[:150] + "..."
+            block += f"- `[{mm:02d}:{ss:02d}]` {text}\n"
+        block += "\n"
     
-    return result
+    # 添加处理后的笔记内容
+    block += "**笔记内容**：\n"
+    block += f"{note.get('markdown', '无内容')}\n\n"
+    block += "---\n\n"
+    return block
+
 
+def _group_notes(note_count: int) -> List[range]:
+    """把视频按搜索结果顺序均匀分为若干组，每组不超过 SUMMARY_GROUP_SIZE 个"""
+    group_count = math.ceil(note_count / max(1, SUMMARY_GROUP_SIZE))
+    base, extra = divmod(note_count, group_count)
+    groups, start = [], 0
+    for i in range(group_count):
+        size = base + (1 if i < extra else 0)
+        groups.append(range(start, start + size))
+        start += size
+    return groups
 
-def _get_agent_executor(model_name: Optional[str] = None, provider_id: Optional[str] = None):
-    """获取或创建 agent executor"""
-    # 使用 (model_name, provider_id) 作为 key，支持不同配置的 executor
-    key = (model_name, provider_id)
+
+async def _summarize_groups(llm, note_blocks: List[str], question: str) -> List[str]:
+    """并发生成各组视频的局部总结（不向前端推送逐 token 输出）"""
+    groups = _group_notes(len(note_blocks))
+    semaphore = asyncio.Semaphore(max(1, SUMMARY_GROUP_CONCURRENCY))
     
-    if key not in _agent_executors:
-        llm = get_llm_client(model_name=model_name, provider_id=provider_id)
-        _agent_executors[key] = create_react_agent(
-            llm,
-            summary_tools,
-            prompt=SUMMARY_SYSTEM_PROMPT
+    async def summarize_group(group: range) -> str:
+        # 分组说明紧跟在笔记之后，保持总结要求前缀与不分层时一致，用户问题仍在末尾
+        user_prompt = SUMMARY_USER_PROMPT_TEMPLATE.format(
+            question=question,
+            note_count=len(group),
+            notes_text="".join(note_blocks[i] for i in group)
+            + SUMMARY_GROUP_NOTE.format(total_count=len(note_blocks), first=group[0] + 1, last=group[-1] + 1),
         )
-    return _agent_executors[key]
+        messages = [
+            SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+            HumanMessage(content=user_prompt),
+        ]
+        async with semaphore:
+            response = await llm.ainvoke(messages, config={"tags": [TAG_NO_STREAM]})
+        summary = response.content if isinstance(response.content, str) else ""
+        print(f"[Summary Agent] 视频 {group[0] + 1}-{group[-1] + 1} 的局部总结完成（{len(summary)} 字符）")
+        return summary
+    
+    print(f"[Summary Agent] 视频数 {len(note_blocks)} 超过 {SUMMARY_HIERARCHICAL_MIN_VIDEOS}，分 {len(groups)} 组生成局部总结后合并")
+    return list(await asyncio.gather(*(summarize_group(group) for group in groups)))
 
 
 async def summary_node(state: AIState) -> AIState:
     """
-    多视频总结节点 - 使用 ReAct Agent 对多个视频笔记进行总结
+    多视频总结节点 - 调用对话模型对多个视频笔记进行总结（默认流式生成）
+    视频数超过 SUMMARY_HIERARCHICAL_MIN_VIDEOS 时分层总结：先分组并发生成局部总结，再合并为最终总结
     
     Args:
         state: AIState
@@ -242,101 +445,54 @@ async def summary_node(state: AIState) -> AIState:
     print(f"[Summary Agent] 开始总结 {len(note_results)} 个视频的笔记")
     
     # 构建所有笔记的 Markdown 内容（包含原始 transcript 时间戳信息）
-    notes_text = ""
-    for i, note in enumerate(note_results, 1):
-        notes_text += f"\n## 视频 {i}: {note.get('title', '未知标题')}\n\n"
-        notes_text += f"**来源**: {note.get('platform', '未知平台')} - [{note.get('url', '未知链接')}]({note.get('url', '#')})\n\n"
-        
-        # 添加原始 transcript segments 信息（帮助 LLM 理解时间戳和内容的对应关系）
-        transcript = note.get('transcript', {})
-        segments = transcript.get('segments', [])
-        if segments:
-            notes_text += "**原始时间戳参考**（用于准确引用时间戳）：\n"
-            # 只显示前30个segment作为参考（避免输入过长），如果segments太多则采样
-            max_segments = 30
-            if len(segments) > max_segments:
-                # 均匀采样
-                step = len(segments) // max_segments
-                sampled_segments = [segments[i] for i in range(0, len(segments), step)][:max_segments]
-            else:
-                sampled_segments = segments
-            
-            for seg in sampled_segments:
-                start = seg.get('start', 0)
-                mm = int(start) // 60
-                ss = int(start) % 60
-                text = seg.get('text', '').strip()
-                # 限制文本长度，避免单个segment太长
-                if len(text) > 150:
-                    text = text[:150] + "..."
-                notes_text += f"- `[{mm:02d}:{ss:02d}]` {text}\n"
-            notes_text += "\n"
-        
-        # 添加处理后的笔记内容
-        notes_text += "**笔记内容**：\n"
-        notes_text += f"{note.get('markdown', '无内容')}\n\n"
-        notes_text += "---\n\n"
+    note_blocks = [_build_note_block(i, note, user_question) for i, note in enumerate(note_results, 1)]
     
     # 从 state 中获取模型配置
     model_name, provider_id = get_model_config_from_state(state)
     
     print(f"[Summary Agent] 使用模型: {model_name}, 提供商: {provider_id}")
-    print(f"[Summary Agent] 输入内容长度: {len(notes_text)} 字符")
+    print(f"[Summary Agent] 输入内容长度: {sum(len(block) for block in note_blocks)} 字符")
     print(f"[Summary Agent] 用户问题: {user_question}")
     
-    # 获取 agent executor（使用 state 中的配置）
-    executor = _get_agent_executor(model_name=model_name, provider_id=provider_id)
-    
-    # 构建提示词
-    user_prompt = SUMMARY_USER_PROMPT_TEMPLATE.format(
-        question=user_question,
-        note_count=len(note_results),
-        notes_text=notes_text
-    )
-    
-    print(f"[Summary Agent] 提示词长度: {len(user_prompt)} 字符")
-    print(f"[Summary Agent] 正在调用 LLM 生成总结...")
+    # 获取 LLM 客户端（使用 state 中的配置）
+    llm = _get_llm(model_name=model_name, provider_id=provider_id)
     
     try:
-        # 创建运行时的配置，包含 state
-        config = {
-            "configurable": {
-                "user_id": state.get("user_id")
-            }
-        }
-        
-        # 执行 agent（异步调用）
-        result = await executor.ainvoke(
-            {"messages": [HumanMessage(content=user_prompt)]},
-            config=config
-        )
+        hierarchical = SUMMARY_HIERARCHICAL_MIN_VIDEOS > 0 and len(note_blocks) > SUMMARY_HIERARCHICAL_MIN_VIDEOS
         
-        print(f"[Summary Agent] LLM 调用完成，正在解析结果...")
-        
-        # 提取最后一条 AI 消息作为总结
-        messages = result.get("messages", [])
-        print(f"[Summary Agent] 收到 {len(messages)} 条消息")
+        # 构建提示词
+        if hierarchical:
+            partial_summaries = await _summarize_groups(llm, note_blocks, user_question)
+            user_prompt = SUMMARY_MERGE_USER_PROMPT_TEMPLATE.format(
+                question=user_question,
+                note_count=len(note_results),
+                group_count=len(partial_summaries),
+                partial_summaries="\n\n---\n\n".join(
+                    f"### 第 {i} 组局部总结\n\n{summary}" for i, summary in enumerate(partial_summaries, 1)
+                ),
+            )
+        else:
+            user_prompt = SUMMARY_USER_PROMPT_TEMPLATE.format(
+                question=user_question,
+                note_count=len(note_results),
+                notes_text="".join(note_blocks)
+            )
         
-        ai_messages = [msg for msg in messages 
-                      if hasattr(msg, "content") and msg.__class__.__name__ == "AIMessage"]
+        print(f"[Summary Agent] 提示词长度: {len(user_prompt)} 字符")
+        print(f"[Summary Agent] 正在调用 LLM 生成总结...")
         
-        print(f"[Summary Agent] 找到 {len(ai_messages)} 条 AI 消息")
+        messages = [
+            SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+            HumanMessage(content=user_prompt),
+        ]
         
-        if ai_messages:
-            summary = ai_messages[-1].content
-            if not summary or not summary.strip():
-                print(f"[Summary Agent] ⚠ 警告: AI 消息内容为空")
-                summary = "无法生成总结内容"
-            else:
-                print(f"[Summary Agent] ✓ 成功提取总结内容，长度: {len(summary)} 字符")
-                # 对摘要进行去重处理
-                original_length = len(summary)
-                summary = _deduplicate_summary(summary)
-                deduplicated_length = len(summary)
-                if original_length != deduplicated_length:
-                    print(f"[Summary Agent] ✓ 已去除重复内容，长度从 {original_length} 减少到 {deduplicated_length} 字符")
+        if SUMMARY_STREAMING:
+            summary = await _stream_summary(llm, messages)
         else:
-            print(f"[Summary Agent] ⚠ 警告: 未找到 AI 消息")
+            summary = await _invoke_summary(llm, messages)
+        
+        if not summary or not summary.strip():
+            print(f"[Summary Agent] ⚠ 警告: 总结内容为空")
             summary = "无法生成总结内容"
         
         print(f"[Summary Agent] 总结完成（最终长度: {len(summary)} 字符）")
@@ -348,6 +504,7 @@ async def summary_node(state: AIState) -> AIState:
         state["metadata"] = {
             "total_videos": len(note_results),
             "videos_processed": len(note_results),
+            "hierarchical": hierarchical,
         }
         
         return state
@@ -1,8 +1,12 @@
 """
 证据链回溯节点
 从总结Markdown中提取时间戳，生成关键帧，并插入到Markdown中
+
+关键帧按批处理：先解析出所有 (视频, 时间戳)，再用有界的异步 ffmpeg 子进程池并发截图
+（相同的视频和时间戳只截一次），最后统一改写 Markdown；总耗时约等于最慢的一帧
 """
 
+import asyncio
 import re
 import os
 import sys
@@ -16,10 +20,12 @@ from graphs.state import AIState
 backend_path = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(backend_path))
 
-from app.utils.video_helper import generate_screenshot
+from app.utils.video_helper import agenerate_screenshot
+from app.utils.blocking_pool import run_blocking
 from app.utils.url_parser import extract_video_id
 from app.utils.path_helper import get_data_dir
 from app.downloaders.bilibili_downloader import BilibiliDownloader
+from utils.stream_events import emit_event, EVENT_KEYFRAME
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,6 +34,10 @@ IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/static/screenshots")
 api_path = os.getenv("API_BASE_URL", "http://localhost")
 BACKEND_PORT = os.getenv("BACKEND_PORT", "8483")
 BACKEND_BASE_URL = f"{api_path}:{BACKEND_PORT}"
+# 本地没有完整视频时，按固定窗口只下载时间戳附近的片段（同一窗口内的多个时间戳共用一个片段）
+TRACE_CLIP_WINDOW = int(os.getenv("TRACE_CLIP_WINDOW", "20"))
+# 同时运行的截图 ffmpeg 子进程数（0 表示按 CPU 核数）
+TRACE_FFMPEG_CONCURRENCY = int(os.getenv("TRACE_FFMPEG_CONCURRENCY", "0")) or (os.cpu_count() or 4)
 
 
 def extract_timestamp_markers(markdown: str) -> List[Tuple[str, int, Optional[int], str]]:
@@ -116,6 +126,34 @@ def get_video_path_from_id(video_id: str, platform: str) -> Optional[str]:
     return None
 
 
+def get_clip_for_timestamp(
+    video_url: str,
+    video_id: str,
+    timestamp: int,
+    duration: Optional[float] = None,
+) -> Tuple[str, int]:
+    """
+    下载包含时间戳的视频片段（目前仅支持bilibili）
+    
+    片段窗口按 TRACE_CLIP_WINDOW 对齐，下载结果按 (video_id, 窗口) 缓存
+    
+    Args:
+        video_url: 视频链接
+        video_id: 视频ID（audio_meta 中的 video_id，分P视频带 _pN 后缀），用作片段缓存键
+        timestamp: 时间戳（秒）
+        duration: 视频时长（秒，可选，用于截断最后一个窗口）
+        
+    Returns:
+        (片段路径, 时间戳在片段内的偏移秒数)
+    """
+    window_start = (timestamp // TRACE_CLIP_WINDOW) * TRACE_CLIP_WINDOW
+    window_end = window_start + TRACE_CLIP_WINDOW
+    if duration:
+        window_end = min(window_end, int(duration) + 1)
+    clip_path = BilibiliDownloader().download_clip(video_url, video_id, window_start, window_end)
+    return clip_path, timestamp - window_start
+
+
 def match_timestamp_to_video(
     timestamp: int,
     video_idx: Optional[int],
@@ -156,6 +194,150 @@ def match_timestamp_to_video(
     return None
 
 
+def _build_frame_url(screenshot_path: str) -> str:
+    """构建前端可访问的关键帧 URL"""
+    filename = Path(screenshot_path).name
+    # 确保URL路径正确
+    if IMAGE_BASE_URL.startswith('/'):
+        return f"{BACKEND_BASE_URL.rstrip('/')}{IMAGE_BASE_URL}/{filename}"
+    return f"{BACKEND_BASE_URL.rstrip('/')}/{IMAGE_BASE_URL.lstrip('/')}/{filename}"
+
+
+def _extract_conclusion(context_text: str, marker: str, markdown: str) -> str:
+    """
+    提取时间戳标记对应的结论文本（去除时间戳标记和 Markdown 格式）
+    由于提示词要求时间戳标记紧跟在结论后面，上下文文本应该就是结论
+    """
+    # 如果上下文文本包含时间戳标记，移除它
+    conclusion_text = re.sub(r'\*?Content-\[\d{2}:\d{2}\](?:-video\d+)?', '', context_text).strip()
+    
+    # 清理结论文本：移除Markdown格式标记（如**、*、#等），但保留内容
+    conclusion_text = re.sub(r'\*\*([^*]+)\*\*', r'\1', conclusion_text)  # 移除加粗
+    conclusion_text = re.sub(r'\*([^*]+)\*', r'\1', conclusion_text)  # 移除斜体
+    conclusion_text = re.sub(r'#{1,6}\s+', '', conclusion_text)  # 移除标题标记
+    conclusion_text = conclusion_text.strip()
+    
+    # 如果结论文本为空或太短，尝试从更远的上下文提取
+    if not conclusion_text or len(conclusion_text) < 5:
+        marker_pos = markdown.find(marker)
+        if marker_pos > 0:
+            # 尝试从标记前更远的文本中提取（最多300字符）
+            extended_start = max(0, marker_pos - 300)
+            extended_context = markdown[extended_start:marker_pos].strip()
+            extended_context = re.sub(r'\s+', ' ', extended_context)
+            # 提取最后一个句子（以句号、问号、感叹号结尾）
+            sentences = re.split(r'[。！？.!?]\s*', extended_context)
+            if sentences:
+                conclusion_text = sentences[-1].strip()
+                if len(conclusion_text) > 100:
+                    conclusion_text = "..." + conclusion_text[-100:]
+        if not conclusion_text or len(conclusion_text) < 5:
+            conclusion_text = "上述结论"
+    return conclusion_text
+
+
+def _resolve_marker(
+    timestamp_seconds: int,
+    video_idx: Optional[int],
+    note_results: List[Dict],
+) -> Optional[Dict[str, Any]]:
+    """
+    把时间戳标记解析为关键帧任务（对应的视频、video_id、时长等），无法生成关键帧时返回 None
+    """
+    # 匹配到对应的视频
+    video_info = match_timestamp_to_video(timestamp_seconds, video_idx, note_results)
+    if not video_info:
+        print(f"[Trace Node] ⚠ 无法匹配时间戳 {timestamp_seconds}s 到视频，跳过")
+        return None
+    
+    video_url = video_info.get("url", "")
+    platform = video_info.get("platform", "bilibili")
+    audio_meta = video_info.get("audio_meta", {})
+    video_id = audio_meta.get("video_id", "")
+    
+    if not video_id:
+        # 尝试从URL中提取video_id
+        video_id = extract_video_id(video_url, platform)
+    
+    if not video_id:
+        print(f"[Trace Node] ⚠ 视频 {video_url} 缺少video_id，跳过")
+        return None
+    
+    # 验证时间戳是否在视频时长范围内
+    duration = audio_meta.get("duration", 0)
+    if duration and timestamp_seconds > duration:
+        print(f"[Trace Node] ⚠ 时间戳 {timestamp_seconds}s 超出视频时长 {duration}s，跳过")
+        return None
+    
+    video_index: Optional[int] = None
+    for idx, note in enumerate(note_results):
+        if note is video_info or note.get("url") == video_url:
+            video_index = idx + 1
+            break
+    
+    return {
+        "video_url": video_url,
+        "video_id": video_id,
+        "platform": platform,
+        "duration": duration,
+        "video_title": audio_meta.get("title") or video_info.get("title") or "",
+        "video_index": video_index,
+    }
+
+
+async def _extract_frame(
+    video_id: str,
+    platform: str,
+    video_url: str,
+    timestamp_seconds: int,
+    duration: Optional[float],
+    index: int,
+    semaphore: asyncio.Semaphore,
+) -> str:
+    """
+    生成一张关键帧截图，返回截图路径（失败时抛出异常）
+    片段下载在阻塞任务线程池中执行，ffmpeg 截图占用 semaphore 的一个名额
+    """
+    # 获取本地视频路径（data 或 example 目录中已有完整视频时直接使用）
+    video_path = get_video_path_from_id(video_id, platform)
+    seek_seconds = timestamp_seconds
+    
+    # 如果视频未下载，只按需下载时间戳附近的片段（目前仅支持bilibili）
+    if not video_path:
+        if platform != "bilibili":
+            raise ValueError(f"平台 {platform} 暂不支持按需下载视频")
+        print(f"[Trace Node] 📥 视频 {video_id} 未下载到本地，下载 {timestamp_seconds}s 附近的片段...")
+        try:
+            video_path, seek_seconds = await run_blocking(
+                get_clip_for_timestamp, video_url, video_id, timestamp_seconds, duration
+            )
+        except Exception as download_error:
+            raise RuntimeError(f"片段下载失败: {str(download_error)}") from download_error
+        print(f"[Trace Node] ✓ 片段就绪: {video_path}（偏移 {seek_seconds}s）")
+    
+    # 生成关键帧截图
+    print(f"[Trace Node] 📸 为视频 {video_id} 在 {timestamp_seconds}s 生成关键帧...")
+    async with semaphore:
+        screenshot_path = await agenerate_screenshot(
+            video_path=video_path,
+            output_dir=IMAGE_OUTPUT_DIR,
+            timestamp=seek_seconds,
+            index=index
+        )
+    
+    # 验证截图文件是否真的存在
+    if not os.path.exists(screenshot_path):
+        raise FileNotFoundError(f"截图文件不存在: {screenshot_path}")
+    
+    # 验证文件大小（确保不是空文件）
+    file_size = os.path.getsize(screenshot_path)
+    if file_size == 0:
+        raise ValueError(f"截图文件为空: {screenshot_path}")
+    
+    print(f"[Trace Node] ✓ 截图生成成功: {screenshot_path} (大小: {file_size} bytes)")
+    return screenshot_path
+
+
 async def trace_node(state: AIState) -> AIState:
     """
     证据链回溯节点
@@ -193,198 +375,108 @@ async def trace_node(state: AIState) -> AIState:
     
     print(f"[Trace Node] 找到 {len(timestamp_markers)} 个时间戳标记")
     
-    # 存储时间戳到关键帧URL的映射
-    trace_data: Dict[str, Dict[str, Any]] = {}
-    updated_markdown = summary_result
-    screenshot_index = 0
-    success_count = 0
+    # 第一步：把所有时间戳标记解析为关键帧任务（按标记顺序分配 trace_key）
+    jobs: List[Dict[str, Any]] = []
+    trace_keys = set()
     fail_count = 0
-    
-    # 处理每个时间戳标记
     for marker, timestamp_seconds, video_idx, context_text in timestamp_markers:
         try:
-            # 匹配到对应的视频
-            video_info = match_timestamp_to_video(timestamp_seconds, video_idx, note_results)
-            
-            if not video_info:
-                print(f"[Trace Node] ⚠ 无法匹配时间戳 {timestamp_seconds}s 到视频，跳过")
-                fail_count += 1
-                continue
-            
-            video_url = video_info.get("url", "")
-            platform = video_info.get("platform", "bilibili")
-            audio_meta = video_info.get("audio_meta", {})
-            video_id = audio_meta.get("video_id", "")
-            
-            if not video_id:
-                # 尝试从URL中提取video_id
-                video_id = extract_video_id(video_url, platform)
-            
-            if not video_id:
-                print(f"[Trace Node] ⚠ 视频 {video_url} 缺少video_id，跳过")
-                fail_count += 1
-                continue
-            
-            # 获取本地视频路径
-            video_path = get_video_path_from_id(video_id, platform)
-            
-            # 如果视频未下载，尝试按需下载（目前仅支持bilibili）
-            if not video_path:
-                if platform == "bilibili":
-                    print(f"[Trace Node] 📥 视频 {video_id} 未下载到本地，尝试下载...")
-                    try:
-                        downloader = BilibiliDownloader()
-                        video_path = downloader.download_video(video_url)
-                        print(f"[Trace Node] ✓ 视频下载成功: {video_path}")
-                    except Exception as download_error:
-                        print(f"[Trace Node] ✗ 视频下载失败: {str(download_error)}")
-                        fail_count += 1
-                        continue
-                else:
-                    print(f"[Trace Node] ⚠ 平台 {platform} 暂不支持按需下载视频")
-                    fail_count += 1
-                    continue
-            
-            # 验证时间戳是否在视频时长范围内
-            duration = audio_meta.get("duration", 0)
-            if duration and timestamp_seconds > duration:
-                print(f"[Trace Node] ⚠ 时间戳 {timestamp_seconds}s 超出视频时长 {duration}s，跳过")
-                fail_count += 1
-                continue
-            
-            # 生成关键帧截图
-            print(f"[Trace Node] 📸 为视频 {video_id} 在 {timestamp_seconds}s 生成关键帧...")
-            try:
-                screenshot_path = generate_screenshot(
-                    video_path=video_path,
-                    output_dir=IMAGE_OUTPUT_DIR,
-                    timestamp=timestamp_seconds,
-                    index=screenshot_index
-                )
-                
-                # 验证截图文件是否真的存在
-                if not os.path.exists(screenshot_path):
-                    raise FileNotFoundError(f"截图文件不存在: {screenshot_path}")
-                
-                # 验证文件大小（确保不是空文件）
-                file_size = os.path.getsize(screenshot_path)
-                if file_size == 0:
-                    raise ValueError(f"截图文件为空: {screenshot_path}")
-                
-                print(f"[Trace Node] ✓ 截图生成成功: {screenshot_path} (大小: {file_size} bytes)")
-                
-            except subprocess.CalledProcessError as e:
-                print(f"[Trace Node] ✗ ffmpeg 执行失败: {e.stderr if hasattr(e, 'stderr') else str(e)}")
-                fail_count += 1
-                continue
-            except FileNotFoundError as e:
-                print(f"[Trace Node] ✗ {str(e)}")
-                fail_count += 1
-                continue
-            except Exception as e:
-                print(f"[Trace Node] ✗ 生成截图时出错: {str(e)}")
-                fail_count += 1
-                continue
-            
-            screenshot_index += 1
-            
-            # 构建前端可访问的URL（改进路径拼接）
-            filename = Path(screenshot_path).name
-            # 确保URL路径正确
-            if IMAGE_BASE_URL.startswith('/'):
-                img_url = f"{BACKEND_BASE_URL.rstrip('/')}{IMAGE_BASE_URL}/{filename}"
-            else:
-                img_url = f"{BACKEND_BASE_URL.rstrip('/')}/{IMAGE_BASE_URL.lstrip('/')}/{filename}"
-            
-            video_title = audio_meta.get("title") or video_info.get("title") or ""
-            video_index: Optional[int] = None
-            for idx, note in enumerate(note_results):
-                if note is video_info or note.get("url") == video_url:
-                    video_index = idx + 1
-                    break
-            video_index_label = f"视频 {video_index}" if video_index else "视频"
-            video_source_text = f"{video_index_label} · {video_title}" if video_title else video_index_label
-
-            # 保存到trace_data（处理重复时间戳的情况）
-            trace_key = f"{video_id}_{timestamp_seconds}"
-            # 如果已存在相同的trace_key，添加序号
-            if trace_key in trace_data:
-                counter = 1
-                while f"{trace_key}_{counter}" in trace_data:
-                    counter += 1
-                trace_key = f"{trace_key}_{counter}"
-            
-            trace_data[trace_key] = {
-                "video_url": video_url,
-                "video_id": video_id,
-                "video_title": video_title,
-                "video_index": video_index,
-                "timestamp": timestamp_seconds,
-                "frame_url": img_url,
-                "frame_path": screenshot_path,
-                "platform": platform
-            }
-            
-            # 将时间戳标记替换为关键帧图片链接，并与结论强关联
-            # 格式：使用引用块格式，将结论和关键帧关联显示
-            mm = timestamp_seconds // 60
-            ss = timestamp_seconds % 60
-            if platform == "bilibili":
-                video_link_url = f"{video_url}?t={timestamp_seconds}"
-            else:
-                video_link_url = video_url
-            
-            # 提取结论文本（从上下文文本中提取，去除时间戳标记）
-            # 由于提示词要求时间戳标记紧跟在结论后面，上下文文本应该就是结论
-            conclusion_text = context_text
-            # 如果上下文文本包含时间戳标记，移除它
-            conclusion_text = re.sub(r'\*?Content-\[\d{2}:\d{2}\](?:-video\d+)?', '', conclusion_text).strip()
-            
-            # 清理结论文本：移除Markdown格式标记（如**、*、#等），但保留内容
-            conclusion_text = re.sub(r'\*\*([^*]+)\*\*', r'\1', conclusion_text)  # 移除加粗
-            conclusion_text = re.sub(r'\*([^*]+)\*', r'\1', conclusion_text)  # 移除斜体
-            conclusion_text = re.sub(r'#{1,6}\s+', '', conclusion_text)  # 移除标题标记
-            conclusion_text = conclusion_text.strip()
-            
-            # 如果结论文本为空或太短，尝试从更远的上下文提取
-            if not conclusion_text or len(conclusion_text) < 5:
-                # 在 updated_markdown 中查找标记位置
-                marker_pos = updated_markdown.find(marker)
-                if marker_pos > 0:
-                    # 尝试从标记前更远的文本中提取（最多300字符）
-                    extended_start = max(0, marker_pos - 300)
-                    extended_context = updated_markdown[extended_start:marker_pos].strip()
-                    extended_context = re.sub(r'\s+', ' ', extended_context)
-                    # 提取最后一个句子（以句号、问号、感叹号结尾）
-                    sentences = re.split(r'[。！？.!?]\s*', extended_context)
-                    if sentences:
-                        conclusion_text = sentences[-1].strip()
-                        if len(conclusion_text) > 100:
-                            conclusion_text = "..." + conclusion_text[-100:]
-                if not conclusion_text or len(conclusion_text) < 5:
-                    conclusion_text = "上述结论"
-            
-            # 将时间戳标记替换为关键帧图片和链接，自然融入文本
-            # 格式：结论文本 + 关键帧图片 + 原片链接（自然排列）
-            replacement = (
-                f"{conclusion_text}\n\n"
-                f"来源视频：{video_source_text}\n\n"
-                f"![关键帧 · {video_index_label} @ {mm:02d}:{ss:02d}]({img_url})\n\n"
-                f"[查看原片 · {video_index_label} @ {mm:02d}:{ss:02d}]({video_link_url})"
-            )
-            
-            # 替换标记（只替换第一次出现的，避免重复替换）
-            updated_markdown = updated_markdown.replace(marker, replacement, 1)
-            
-            success_count += 1
-            print(f"[Trace Node] ✓ 成功生成关键帧: {img_url}")
-            
+            job = _resolve_marker(timestamp_seconds, video_idx, note_results)
         except Exception as e:
-            fail_count += 1
             print(f"[Trace Node] ✗ 处理时间戳 {timestamp_seconds}s 时出错: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            job = None
+        if not job:
+            fail_count += 1
             continue
+        
+        # 处理重复时间戳的情况：如果已存在相同的trace_key，添加序号
+        trace_key = f"{job['video_id']}_{timestamp_seconds}"
+        if trace_key in trace_keys:
+            counter = 1
+            while f"{trace_key}_{counter}" in trace_keys:
+                counter += 1
+            trace_key = f"{trace_key}_{counter}"
+        trace_keys.add(trace_key)
+        
+        job.update(
+            marker=marker,
+            timestamp=timestamp_seconds,
+            trace_key=trace_key,
+            conclusion_text=_extract_conclusion(context_text, marker, summary_result),
+        )
+        jobs.append(job)
+    
+    # 第二步：并发生成关键帧，相同的 (video_id, 时间戳) 只截一次
+    semaphore = asyncio.Semaphore(max(1, TRACE_FFMPEG_CONCURRENCY))
+    frame_tasks: Dict[Tuple[str, int], asyncio.Task] = {}
+    for job in jobs:
+        frame_key = (job["video_id"], job["timestamp"])
+        if frame_key not in frame_tasks:
+            frame_tasks[frame_key] = asyncio.create_task(_extract_frame(
+                job["video_id"], job["platform"], job["video_url"], job["timestamp"], job["duration"],
+                len(frame_tasks), semaphore,
+            ))
+    if frame_tasks:
+        print(f"[Trace Node] 并发生成 {len(frame_tasks)} 张关键帧（ffmpeg 并发数 {TRACE_FFMPEG_CONCURRENCY}）")
+    
+    async def build_replacement(job: Dict[str, Any]) -> Optional[str]:
+        try:
+            screenshot_path = await frame_tasks[(job["video_id"], job["timestamp"])]
+        except subprocess.CalledProcessError as e:
+            print(f"[Trace Node] ✗ ffmpeg 执行失败: {e.stderr if hasattr(e, 'stderr') else str(e)}")
+            return None
+        except Exception as e:
+            print(f"[Trace Node] ✗ 生成关键帧时出错（{job['video_id']} @ {job['timestamp']}s）: {str(e)}")
+            return None
+        
+        img_url = _build_frame_url(screenshot_path)
+        timestamp_seconds = job["timestamp"]
+        video_index = job["video_index"]
+        video_title = job["video_title"]
+        video_index_label = f"视频 {video_index}" if video_index else "视频"
+        video_source_text = f"{video_index_label} · {video_title}" if video_title else video_index_label
+        
+        job["frame_url"] = img_url
+        job["frame_path"] = screenshot_path
+        
+        # 将时间戳标记替换为关键帧图片链接，并与结论强关联
+        mm = timestamp_seconds // 60
+        ss = timestamp_seconds % 60
+        if job["platform"] == "bilibili":
+            video_link_url = f"{job['video_url']}?t={timestamp_seconds}"
+        else:
+            video_link_url = job["video_url"]
+        
+        # 格式：结论文本 + 关键帧图片 + 原片链接（自然排列）
+        replacement = (
+            f"{job['conclusion_text']}\n\n"
+            f"来源视频：{video_source_text}\n\n"
+            f"![关键帧 · {video_index_label} @ {mm:02d}:{ss:02d}]({img_url})\n\n"
+            f"[查看原片 · {video_index_label} @ {mm:02d}:{ss:02d}]({video_link_url})"
+        )
+        print(f"[Trace Node] ✓ 成功生成关键帧: {img_url}")
+        # 流式接口：每生成一张关键帧立即推送（前端可用 marker 就地替换）
+        await emit_event(EVENT_KEYFRAME, {
+            "trace_key": job["trace_key"],
+            "marker": job["marker"],
+            "replacement": replacement,
+            **_trace_entry(job),
+        })
+        return replacement
+    
+    replacements = await asyncio.gather(*(build_replacement(job) for job in jobs))
+    
+    # 第三步：按标记顺序统一改写 Markdown（只替换第一次出现的，避免重复替换）
+    trace_data: Dict[str, Dict[str, Any]] = {}
+    updated_markdown = summary_result
+    success_count = 0
+    for job, replacement in zip(jobs, replacements):
+        if replacement is None:
+            fail_count += 1
+            continue
+        updated_markdown = updated_markdown.replace(job["marker"], replacement, 1)
+        trace_data[job["trace_key"]] = {**_trace_entry(job), "frame_path": job["frame_path"]}
+        success_count += 1
     
     # 更新state
     state["summary_result"] = updated_markdown
@@ -395,3 +487,15 @@ async def trace_node(state: AIState) -> AIState:
     
     return state
 
+
+def _trace_entry(job: Dict[str, Any]) -> Dict[str, Any]:
+    """trace_data 中的关键帧信息（不含本地截图路径）"""
+    return {
+        "video_url": job["video_url"],
+        "video_id": job["video_id"],
+        "video_title": job["video_title"],
+        "video_index": job["video_index"],
+        "timestamp": job["timestamp"],
+        "frame_url": job["frame_url"],
+        "platform": job["platform"],
+    }
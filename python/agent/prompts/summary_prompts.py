@@ -13,13 +13,9 @@ SUMMARY_SYSTEM_PROMPT = """你是一个专业的视频内容分析师。你的
 6. 尽可能全面回答用户的问题，提供有价值的信息
 7. **重要：避免重复内容** - 每个观点、事实或信息只应该出现一次，不要在不同章节或段落中重复相同的内容"""
 
-SUMMARY_USER_PROMPT_TEMPLATE = """用户问题：{question}
-
-以下是 {note_count} 个相关视频的笔记内容：
-
-{notes_text}
-
-请基于这些笔记，生成一份全面、客观的多角度总结，尽可能全面回答用户的问题。总结应该：
+# 提示词布局：系统提示词和总结要求是静态内容，放在最前面；笔记和用户问题每次请求不同，放在最后
+# 供应商的提示词前缀缓存按请求开头的相同 token 命中，静态部分不能掺入任何变量
+SUMMARY_USER_PROMPT_TEMPLATE = """请基于本消息末尾提供的视频笔记，生成一份全面、客观的多角度总结，尽可能全面回答用户的问题。总结应该：
 - 涵盖不同视频的观点
 - 指出共同点和差异点
 - 单独指出不同视频描述有矛盾的地方
@@ -91,5 +87,33 @@ SUMMARY_USER_PROMPT_TEMPLATE = """用户问题：{question}
 - 相同的观点或事实只应该在一个地方描述，不要在不同章节重复
 - 如果多个视频都提到相同的观点，应该合并为一条描述，并标注所有相关的视频时间戳
 - 在组织内容时，先列出所有要点，然后按主题分类，避免重复
-- 如果发现自己在重复相同的内容，应该删除重复的部分，只保留最完整或最准确的描述"""
+- 如果发现自己在重复相同的内容，应该删除重复的部分，只保留最完整或最准确的描述
+
+以下是 {note_count} 个相关视频的笔记内容：
+
+{notes_text}
+
+用户问题：{question}"""
+
+
+
+# 分层总结：视频较多时先分组生成局部总结（沿用 SUMMARY_USER_PROMPT_TEMPLATE，分组说明附在笔记之后），再合并
+SUMMARY_GROUP_NOTE = """
+
+**分组说明**：以上只是全部 {total_count} 个视频中的一组（视频 {first}-{last}），你的总结稍后会与其他分组的总结合并。
+- 视频编号沿用上面标注的编号，时间戳标记必须写成 `*Content-[mm:ss]-video{{N}}`，N 为上面的视频编号
+- 只总结本组视频的内容，不需要写引言和结尾"""
+
+SUMMARY_MERGE_USER_PROMPT_TEMPLATE = """相关视频已被分为若干组分别进行了总结，请将本消息末尾的各组局部总结合并为一份全面、客观的多角度总结，尽可能全面回答用户的问题。合并时：
+- 按主题重新组织内容，涵盖所有视频的观点，指出共同点、差异点和矛盾之处
+- 不同分组中相同的观点合并为一条，并保留所有相关视频的时间戳标记
+- **原样保留**局部总结中的 `[[...]]` 回溯标记和 `*Content-[mm:ss]-video{{N}}` 时间戳标记，不得修改其中的时间和视频编号，不得编造新的时间戳
+- 时间戳标记必须紧跟在结论文本后面，与结论在同一行
+- 使用清晰的 Markdown 格式；表格中的空单元格留空，不要使用 `---` 作为单元格内容
+- **避免重复内容**：每个标题、观点或事实只出现一次，不要重复来源视频等信息
+
+共有 {note_count} 个相关视频，分为 {group_count} 组。以下是各组的局部总结：
+
+{partial_summaries}
 
+用户问题：{question}"""
\ No newline at end of file
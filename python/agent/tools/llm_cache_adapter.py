@@ -0,0 +1,68 @@
+"""
+LangChain 缓存适配器
+让 get_llm_client 返回的 ChatOpenAI 复用 app 的 LLM 响应缓存（app.gpt.llm_cache），
+与 UniversalGPT、对话标题生成共用同一个 SQLite 缓存、淘汰策略和命中统计
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+# 添加 backend/app 到路径
+backend_path = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_path))
+
+try:
+    from app.gpt.llm_cache import LLMCache, make_llm_cache_key
+    from app.utils.logger import get_logger
+except ImportError as e:
+    raise ImportError(f"无法导入 app 模块: {e}")
+
+logger = get_logger(__name__)
+
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain BaseCache 实现
+    LangChain 传入的 llm_string 已包含模型名称、温度等调用参数，直接作为缓存键中的模型部分；
+    llm_string 不包含 Base URL，因此每个供应商使用各自的实例，以 provider 区分缓存键
+    """
+
+    def __init__(self, cache: LLMCache, provider: str):
+        self.cache = cache
+        self.provider = provider
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        return make_llm_cache_key(llm_string, self.provider, prompt)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        cached = self.cache.get(self._key(prompt, llm_string))
+        if cached is None:
+            return None
+        try:
+            generations = [loads(item) for item in json.loads(cached)]
+        except Exception as e:
+            logger.warning(f"LLM 缓存条目反序列化失败，视为未命中: {e}")
+            return None
+        # 命中缓存时没有请求供应商，去掉缓存中的 usage，避免重复计入 token 用量统计
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None and getattr(message, "usage_metadata", None):
+                message.usage_metadata = None
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        try:
+            payload = json.dumps([dumps(generation) for generation in return_val], ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"LLM 响应无法序列化，跳过缓存: {e}")
+            return
+        self.cache.put(self._key(prompt, llm_string), payload, model="langchain", provider=self.provider)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
@@ -4,9 +4,11 @@ LLM 工具模块
 """
 
 import sys
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
+import httpx
 from langchain_openai import ChatOpenAI
 
 # 添加 backend/app 到路径
@@ -16,11 +18,74 @@ sys.path.insert(0, str(backend_path))
 try:
     from app.services.provider import ProviderService
     from app.models.model_config import ModelConfig
+    from app.gpt.client_pool import add_invalidation_listener, get_async_http_client, get_http_client
+    from app.gpt.llm_cache import LLMCache, get_llm_cache, make_llm_cache_key
 except ImportError as e:
     raise ImportError(f"无法导入 app 服务: {e}")
 
+from .llm_cache_adapter import LLMResponseCache
+from .usage_callback import UsageRecorder
 
-def get_llm_client(model_name: Optional[str] = None, provider_id: Optional[str] = None) -> ChatOpenAI:
+# 超时时间 180 秒（3分钟），因为总结多个视频笔记时，输入内容较长，可能需要更长的处理时间
+LLM_TIMEOUT = 180.0
+
+# ChatOpenAI 缓存：(base_url, api_key, model, timeout, 异步连接池, 是否使用响应缓存) -> 客户端
+# 异步连接池绑定事件循环，因此在协程中创建的客户端按所在事件循环的连接池区分
+_clients: Dict[Tuple[str, str, str, float, Optional[httpx.AsyncClient], bool], ChatOpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+def _invalidate(base_url: str, api_key: str) -> None:
+    """供应商配置变更时移除对应的 ChatOpenAI 客户端"""
+    with _clients_lock:
+        for key in [k for k in _clients if k[0] == base_url and k[1] == api_key]:
+            del _clients[key]
+
+
+add_invalidation_listener(_invalidate)
+
+# Base URL -> LangChain 适配的响应缓存（llm_string 不含 Base URL，按供应商分别创建）
+_langchain_caches: Dict[str, LLMResponseCache] = {}
+
+
+def _response_cache(base_url: str):
+    """指定供应商的 LangChain 适配 LLM 响应缓存，未启用缓存时返回 False"""
+    cache = get_llm_cache()
+    if cache is None:
+        return False
+    provider = str(base_url or "").rstrip("/")
+    with _clients_lock:
+        adapter = _langchain_caches.get(provider)
+        if adapter is None:
+            adapter = _langchain_caches[provider] = LLMResponseCache(cache, provider)
+    return adapter
+
+
+def get_stream_cache(llm: ChatOpenAI) -> Optional[LLMCache]:
+    """
+    流式调用使用的 LLM 响应缓存
+    LangChain 的 astream 不会查询 BaseCache，流式调用方需要自行查找和写入；客户端关闭了缓存或未启用缓存时返回 None
+    """
+    if llm.cache is False:
+        return None
+    return get_llm_cache()
+
+
+def make_stream_cache_key(llm: ChatOpenAI, messages) -> str:
+    """流式调用的缓存键：模型、Base URL、消息和温度"""
+    return make_llm_cache_key(
+        llm.model_name,
+        str(llm.openai_api_base or ""),
+        [{"role": message.type, "content": message.content} for message in messages],
+        llm.temperature,
+    )
+
+
+def get_llm_client(
+    model_name: Optional[str] = None,
+    provider_id: Optional[str] = None,
+    use_cache: bool = False,
+) -> ChatOpenAI:
     """
     根据 model_name 和 provider_id 获取 LLM 客户端实例
     使用 app 的逻辑从数据库获取配置（与 note.py 的 _get_gpt 方法逻辑一致）
@@ -28,6 +93,8 @@ def get_llm_client(model_name: Optional[str] = None, provider_id: Optional[str]
     Args:
         model_name: 模型名称（可选，如果不提供则使用默认）
         provider_id: 提供商 ID（可选，如果不提供则使用默认）
+        use_cache: 是否使用 LLM 响应缓存（默认 False）；开启后相同请求直接返回缓存的响应，
+            只适合结果可复用的调用（如多视频总结），对话等需要每次重新生成的调用不要开启
     
     Returns:
         ChatOpenAI: LangChain 的 ChatOpenAI 客户端
@@ -74,13 +141,37 @@ def get_llm_client(model_name: Optional[str] = None, provider_id: Optional[str]
     
     # 从 ModelConfig 创建 ChatOpenAI 客户端（LangGraph 需要）
     # 注意：这里使用的是 ModelConfig 中的配置，与 note.py 中创建 GPT 实例使用的配置完全一致
-    # timeout 设置为 180 秒，因为总结多个视频笔记时，输入内容较长，可能需要更长的处理时间
-    client = ChatOpenAI(
-        api_key=config.api_key,
-        base_url=config.base_url,
-        model=config.model_name,
-        temperature=0.7,  # 默认温度，可以根据需要调整
-        timeout=180.0,  # 超时时间设置为 180 秒（3分钟），适用于处理长文本总结
+    # 同一供应商和模型复用同一个客户端，底层共享 app 的 httpx 连接池（keep-alive，避免重复握手）
+    try:
+        async_http_client = get_async_http_client()
+    except RuntimeError:
+        # 不在事件循环中，由 ChatOpenAI 在首次异步调用时自行创建异步连接
+        async_http_client = None
+    key = (
+        str(config.base_url or "").rstrip("/"),
+        config.api_key,
+        config.model_name,
+        LLM_TIMEOUT,
+        async_http_client,
+        use_cache,
     )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = ChatOpenAI(
+                api_key=config.api_key,
+                base_url=config.base_url,
+                model=config.model_name,
+                temperature=0.7,  # 默认温度，可以根据需要调整
+                timeout=LLM_TIMEOUT,
+                http_client=get_http_client(),
+                http_async_client=async_http_client,
+                # 与 UniversalGPT 共用 app 的 SQLite 响应缓存；关闭缓存时显式传 False，不使用 LangChain 全局缓存
+                cache=_response_cache(config.base_url) if use_cache else False,
+                # 流式调用结束时也返回 usage，记录输入 / 输出 token 和命中供应商前缀缓存的 token 数
+                stream_usage=True,
+                callbacks=[UsageRecorder(config.model_name)],
+            )
+            _clients[key] = client
     
     return client
@@ -0,0 +1,39 @@
+"""
+LangChain token 用量回调
+把 get_llm_client 返回的 ChatOpenAI 每次调用的 usage_metadata（含命中供应商前缀缓存的 token 数）
+记入 app 的用量统计（app.gpt.usage_metrics），与 UniversalGPT 的笔记生成共用同一份指标
+"""
+
+import sys
+from pathlib import Path
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# 添加 backend/app 到路径
+backend_path = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_path))
+
+try:
+    from app.gpt.usage_metrics import record_usage
+except ImportError as e:
+    raise ImportError(f"无法导入 app 模块: {e}")
+
+
+class UsageRecorder(BaseCallbackHandler):
+    """
+    每个 ChatOpenAI 客户端一个实例，流式调用需开启 stream_usage 才能在结束时拿到用量
+    """
+
+    def __init__(self, model: str, scope: str = "agent"):
+        self.model = model
+        self.scope = scope
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    record_usage(self.scope, self.model, usage)
@@ -37,63 +37,57 @@ def get_default_model_config() -> Tuple[str, str]:
         ValueError: 如果数据库中没有可用的提供商或模型
     """
     try:
-        from app.db.engine import get_db
-        from sqlalchemy import text
-        from app.db.provider_dao import get_enabled_providers
+        # 供应商和模型读取自进程内配置缓存（app.services.config_cache），不再每次查询数据库
+        from app.services.config_cache import get_config_cache
         
-        db = next(get_db())
-        try:
-            # 1. 获取所有启用的提供商
-            enabled_providers = get_enabled_providers()
-            
-            if not enabled_providers or len(enabled_providers) == 0:
-                raise ValueError(
-                    "数据库中没有启用的提供商，请先配置至少一个提供商。"
-                    "或者在请求中明确指定 provider_id 和 model_name。"
-                )
-            
-            # 2. 优先选择 qwen 提供商
-            provider = None
-            for p in enabled_providers:
-                if p.id.lower() == "qwen":
-                    provider = p
-                    break
-            
-            # 如果没有 qwen，选择第一个启用的提供商
-            if not provider:
-                provider = enabled_providers[0]
-            
-            provider_id = provider.id  # Provider.id 是 str 类型
-            provider_name_lower = provider.name.lower() if provider.name else ""
-            
-            # 3. 获取所有模型（Model 表没有 enabled 列，所以获取所有模型）
-            all_models = db.execute(
-                text("SELECT id, model_name, provider_id FROM models ORDER BY id")
-            ).fetchall()
-            
-            if not all_models:
-                raise ValueError(
-                    "数据库中没有启用的模型，请先添加至少一个模型。"
-                    "或者在请求中明确指定 provider_id 和 model_name。"
-                )
-            
-            # 4. 优先选择模型名称包含提供商名称的模型（如 qwen-max 包含 qwen）
-            model_name = None
-            for model_row in all_models:
-                model_name_candidate = model_row[1]
-                # 检查模型名称是否包含提供商名称
-                if provider_name_lower and provider_name_lower in model_name_candidate.lower():
-                    model_name = model_name_candidate
-                    break
-            
-            # 如果没有匹配的，使用第一个模型
-            if not model_name:
-                model_name = all_models[0][1]
-            
-            return (model_name, provider_id)
-            
-        finally:
-            db.close()
+        cache = get_config_cache()
+        
+        # 1. 获取所有启用的提供商
+        enabled_providers = cache.get_enabled_providers()
+        
+        if not enabled_providers or len(enabled_providers) == 0:
+            raise ValueError(
+                "数据库中没有启用的提供商，请先配置至少一个提供商。"
+                "或者在请求中明确指定 provider_id 和 model_name。"
+            )
+        
+        # 2. 优先选择 qwen 提供商
+        provider = None
+        for p in enabled_providers:
+            if p["id"].lower() == "qwen":
+                provider = p
+                break
+        
+        # 如果没有 qwen，选择第一个启用的提供商
+        if not provider:
+            provider = enabled_providers[0]
+        
+        provider_id = provider["id"]  # Provider.id 是 str 类型
+        provider_name_lower = provider["name"].lower() if provider["name"] else ""
+        
+        # 3. 获取所有模型（Model 表没有 enabled 列，所以获取所有模型，按 id 排序）
+        all_models = cache.get_models()
+        
+        if not all_models:
+            raise ValueError(
+                "数据库中没有启用的模型，请先添加至少一个模型。"
+                "或者在请求中明确指定 provider_id 和 model_name。"
+            )
+        
+        # 4. 优先选择模型名称包含提供商名称的模型（如 qwen-max 包含 qwen）
+        model_name = None
+        for model in all_models:
+            model_name_candidate = model["model_name"]
+            # 检查模型名称是否包含提供商名称
+            if provider_name_lower and provider_name_lower in model_name_candidate.lower():
+                model_name = model_name_candidate
+                break
+        
+        # 如果没有匹配的，使用第一个模型
+        if not model_name:
+            model_name = all_models[0]["model_name"]
+        
+        return (model_name, provider_id)
             
     except ValueError:
         # ValueError 直接抛出
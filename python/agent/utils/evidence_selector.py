@@ -0,0 +1,143 @@
+"""
+转写证据选择模块
+为 summary_node 从每个视频的转写片段中挑选与用户问题最相关的片段作为时间戳参考：
+    1. 对片段文本分词（中日韩文字按字符二元组，英文/数字按单词），建立倒排索引
+    2. 用 BM25 计算每个片段与问题的相关度，按得分从高到低选取
+    3. 剩余名额用均匀采样的片段补齐，保证泛化问题（如"总结这些视频"）也能覆盖全片
+    4. 所有选中片段的 token 总数不超过预算，最终按时间顺序返回
+索引只在单次请求内使用，不做持久化
+"""
+
+import math
+import re
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# 添加 backend/app 到路径，以便复用 app 的 token 估算
+backend_path = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_path))
+
+try:
+    from app.gpt.token_utils import estimate_tokens
+except ImportError as e:
+    raise ImportError(f"无法导入 app 模块: {e}")
+
+_CJK_RUN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "what", "which", "with", "why",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：中日韩文字切为相邻字符二元组（单字词保留单字），英文和数字按单词切分并去除停用词
+    """
+    text = (text or "").lower()
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(word for word in _WORD.findall(text) if word not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    单次请求内使用的 BM25 倒排索引
+    """
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        # 词 -> [(文档序号, 词频)]
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        for doc_id, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((doc_id, tf))
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        n = len(self.doc_lengths)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str) -> List[float]:
+        """
+        计算每个文档与查询的 BM25 得分
+        """
+        scores = [0.0] * len(self.doc_lengths)
+        if not self.avg_length:
+            return scores
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+def _uniform_order(count: int, top_k: int) -> List[int]:
+    """均匀采样的片段序号（与原先的按步长采样一致）"""
+    step = max(1, count // top_k) if top_k else 1
+    return list(range(0, count, step))
+
+
+def select_evidence(
+    segments: Sequence[dict],
+    question: Optional[str],
+    top_k: int = 30,
+    max_tokens: int = 1500,
+    max_chars: int = 150,
+) -> List[dict]:
+    """
+    从一个视频的转写片段中选择与问题最相关的片段
+
+    Args:
+        segments: 转写片段列表（dict，包含 start / text）
+        question: 用户问题，为空时退化为均匀采样
+        top_k: 最多选择的片段数
+        max_tokens: 选中片段文本的 token 总预算
+        max_chars: 单个片段文本的最大长度（超出截断，按截断后的文本计算 token）
+
+    Returns:
+        List[dict]: 按时间顺序排列的片段（原片段对象）
+    """
+    if not segments or top_k <= 0:
+        return []
+
+    texts = [(seg.get("text") or "").strip() for seg in segments]
+    ranked: List[int] = []
+    if question and question.strip():
+        scores = BM25Index(texts).score(question)
+        ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+
+    # 相关片段优先，其余名额用均匀采样补齐
+    ranked_set = set(ranked)
+    candidates = ranked + [i for i in _uniform_order(len(segments), top_k) if i not in ranked_set]
+
+    selected: List[int] = []
+    used_tokens = 0
+    for i in candidates:
+        if len(selected) >= top_k:
+            break
+        if not texts[i]:
+            continue
+        tokens = estimate_tokens(texts[i][:max_chars])
+        if used_tokens + tokens > max_tokens:
+            continue
+        selected.append(i)
+        used_tokens += tokens
+
+    return [segments[i] for i in sorted(selected)]
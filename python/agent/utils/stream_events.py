@@ -0,0 +1,37 @@
+"""
+图节点流式事件辅助模块
+节点通过 LangChain 自定义事件（custom event）上报中间结果，
+/api/multi_video/stream 使用 graph.astream_events 接收后以 SSE 推送给前端
+"""
+
+from typing import Any, Dict
+
+from langchain_core.callbacks.manager import adispatch_custom_event
+
+# 自定义事件名称
+EVENT_SEARCH_RESULTS = "search_results"  # 视频搜索完成
+EVENT_NOTE_DONE = "note_done"  # 单个视频笔记生成完成
+EVENT_NOTE_FAILED = "note_failed"  # 单个视频笔记生成失败
+EVENT_SUMMARY_TOKEN = "summary_token"  # 总结的增量文本（模型原始输出）
+EVENT_SUMMARY_SECTION = "summary_section"  # 总结中已完成并去重的章节
+EVENT_KEYFRAME = "keyframe"  # trace_node 生成了一张关键帧
+
+# 带有该标签的模型调用不向前端推送逐 token 输出（如分层总结的中间结果）
+TAG_NO_STREAM = "no_stream"
+
+
+async def emit_event(name: str, data: Dict[str, Any]) -> None:
+    """
+    上报一个自定义流式事件
+
+    在普通的 graph.ainvoke 中调用也是安全的：没有事件订阅者时不会产生任何效果，
+    不在 LangChain 运行上下文中（如单独调用节点函数）时静默忽略，避免影响主流程
+
+    Args:
+        name: 事件名称
+        data: 事件数据（需可 JSON 序列化）
+    """
+    try:
+        await adispatch_custom_event(name, data)
+    except Exception:
+        pass
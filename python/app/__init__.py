@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 
-from .routers import provider, model, auth, conversation
+from .routers import provider, model, auth, conversation, task
 
 
 def create_app(lifespan) -> FastAPI:
@@ -9,5 +9,6 @@ def create_app(lifespan) -> FastAPI:
     app.include_router(model.router, prefix="/api")
     app.include_router(auth.router, prefix="/api/auth")
     app.include_router(conversation.router, prefix="/api")
+    app.include_router(task.router, prefix="/api")
 
     return app
@@ -7,6 +7,7 @@ from app.db.models.video_tasks import VideoTask
 from app.db.models.user import User
 from app.db.models.conversation import Conversation
 from app.db.models.message import Message
+from app.db.models.task_status import TaskStatusRecord
 from app.db.engine import get_engine, Base
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, func
+
+from app.db.engine import Base
+
+
+class TaskStatusRecord(Base):
+    __tablename__ = "task_statuses"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(String, unique=True, nullable=False, index=True)
+    status = Column(String(32), nullable=False)
+    message = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
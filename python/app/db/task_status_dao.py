@@ -0,0 +1,58 @@
+from typing import Dict, List, Optional
+
+from app.db.models.task_status import TaskStatusRecord
+from app.db.engine import get_db
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# 批量写入任务状态（存在则更新，不存在则插入）
+def upsert_task_statuses(records: List[Dict]):
+    if not records:
+        return
+    db = next(get_db())
+    try:
+        task_ids = [record["task_id"] for record in records]
+        existing = {
+            row.task_id: row
+            for row in db.query(TaskStatusRecord).filter(TaskStatusRecord.task_id.in_(task_ids)).all()
+        }
+        for record in records:
+            row = existing.get(record["task_id"])
+            if row is None:
+                db.add(TaskStatusRecord(
+                    task_id=record["task_id"],
+                    status=record["status"],
+                    message=record.get("message"),
+                ))
+            else:
+                row.status = record["status"]
+                row.message = record.get("message")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to upsert task statuses: {e}")
+        raise
+    finally:
+        db.close()
+
+
+# 查询任务状态
+def get_task_status(task_id: str) -> Optional[Dict]:
+    db = next(get_db())
+    try:
+        row = db.query(TaskStatusRecord).filter_by(task_id=task_id).first()
+        if not row:
+            return None
+        return {
+            "task_id": row.task_id,
+            "status": row.status,
+            "message": row.message,
+            "updated_at": row.updated_at.timestamp() if row.updated_at else None,
+        }
+    except Exception as e:
+        logger.error(f"Failed to get task status: {e}")
+        return None
+    finally:
+        db.close()
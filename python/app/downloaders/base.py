@@ -36,3 +36,19 @@ class Downloader(ABC):
     def download_video(self, video_url: str,
                        output_dir: Union[str, None] = None) -> str:
         pass
+
+    def download_media(self, video_url: str, output_dir: str = None,
+                       quality: DownloadQuality = "fast") -> AudioDownloadResult:
+        '''
+        同时需要视频和音频时调用，返回的 AudioDownloadResult 带有 video_path
+        默认分别下载视频和音频；支持的平台应重写为只下载一次、在本地分离音轨
+
+        :param video_url: 资源链接
+        :param output_dir: 输出路径 默认根目录data
+        :param quality: 音频质量 fast | medium | slow
+        :return:返回一个 AudioDownloadResult 类
+        '''
+        video_path = self.download_video(video_url, output_dir)
+        audio = self.download(video_url, output_dir, quality, need_video=True)
+        audio.video_path = video_path
+        return audio
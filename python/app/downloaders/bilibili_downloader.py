@@ -1,14 +1,21 @@
 import os
+import subprocess
+import threading
 from abc import ABC
 from typing import Union, Optional
 
 import yt_dlp
+from yt_dlp.utils import download_range_func
 
 from app.downloaders.base import Downloader, DownloadQuality, QUALITY_MAP
 from app.models.notes_model import AudioDownloadResult
 from app.utils.path_helper import get_data_dir
+from app.utils.single_flight import SingleFlight
 from app.utils.url_parser import extract_video_id
 
+# 同一视频片段的并发下载只执行一次
+clip_flight = SingleFlight("video_clip")
+
 
 class BilibiliDownloader(Downloader, ABC):
     def __init__(self):
@@ -29,16 +36,11 @@ class BilibiliDownloader(Downloader, ABC):
 
         output_path = os.path.join(output_dir, "%(id)s.%(ext)s")
 
+        # 直接保存原始音频流（通常为 m4a），不再用 FFmpegExtractAudio 转码；
+        # 转写前由转写器按需准备 ASR 音频（见 app/utils/audio_prep.py）
         ydl_opts = {
             'format': 'bestaudio[ext=m4a]/bestaudio/best',
             'outtmpl': output_path,
-            'postprocessors': [
-                {
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '64',
-                }
-            ],
             'noplaylist': True,
             'quiet': False,
             # 网络超时和重试配置
@@ -54,7 +56,7 @@ class BilibiliDownloader(Downloader, ABC):
             title = info.get("title")
             duration = info.get("duration", 0)
             cover_url = info.get("thumbnail")
-            audio_path = os.path.join(output_dir, f"{video_id}.mp3")
+            audio_path = ydl.prepare_filename(info)
 
         return AudioDownloadResult(
             file_path=audio_path,
@@ -113,6 +115,135 @@ class BilibiliDownloader(Downloader, ABC):
 
         return video_path
 
+    def download_media(
+        self,
+        video_url: str,
+        output_dir: Union[str, None] = None,
+        quality: DownloadQuality = "fast",
+    ) -> AudioDownloadResult:
+        """
+        一次下载同时获得视频和音频：只下载一次视频流和音频流（合并为 mp4），
+        再用 ffmpeg 从 mp4 中直接拷贝出音轨（-vn -c:a copy，不重新编码），不再单独下载音频
+
+        :return: AudioDownloadResult，file_path 为本地音频（m4a），video_path 为合并后的 mp4
+        """
+        if output_dir is None:
+            output_dir = get_data_dir()
+        if not output_dir:
+            output_dir = self.cache_data
+        os.makedirs(output_dir, exist_ok=True)
+
+        output_path = os.path.join(output_dir, "%(id)s.%(ext)s")
+
+        ydl_opts = {
+            'format': 'bv*[height<=720][ext=mp4]+ba[ext=m4a]/best[height<=720]',
+            'outtmpl': output_path,
+            'noplaylist': True,
+            'quiet': False,
+            'merge_output_format': 'mp4',  # 确保合并成 mp4
+            # 网络超时和重试配置
+            'socket_timeout': 120,
+            'retries': 10,
+            'fragment_retries': 10,
+            'file_access_retries': 5,
+        }
+
+        # 已下载过的 mp4 不会重复下载，这里只取元信息
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=True)
+            video_id = info.get("id")
+            video_path = os.path.join(output_dir, f"{video_id}.mp4")
+
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"视频文件未找到: {video_path}")
+
+        audio_path = os.path.join(output_dir, f"{video_id}.m4a")
+        if not os.path.exists(audio_path):
+            self._extract_audio(video_path, audio_path)
+
+        return AudioDownloadResult(
+            file_path=audio_path,
+            title=info.get("title"),
+            duration=info.get("duration", 0),
+            cover_url=info.get("thumbnail"),
+            platform="bilibili",
+            video_id=video_id,
+            raw_info=info,
+            video_path=video_path,
+        )
+
+    @staticmethod
+    def _extract_audio(video_path: str, audio_path: str) -> None:
+        """从本地 mp4 拷贝出音轨（不重新编码），先写临时文件再改名，避免留下不完整的音频"""
+        # 临时文件名带进程和线程标识，同一视频被并发提取音轨时互不覆盖
+        tmp_path = f"{audio_path}.{os.getpid()}.{threading.get_ident()}.part"
+        command = [
+            "ffmpeg",
+            "-i", video_path,
+            "-vn",
+            "-c:a", "copy",
+            "-f", "mp4",
+            tmp_path,
+            "-y",
+        ]
+        result = subprocess.run(command, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout, stderr=result.stderr)
+        os.replace(tmp_path, audio_path)
+
+    def download_clip(
+        self,
+        video_url: str,
+        video_id: str,
+        start: int,
+        end: int,
+        output_dir: Union[str, None] = None,
+    ) -> str:
+        """
+        只下载视频 [start, end) 秒范围内的画面（不含音频），返回片段文件路径
+
+        片段按 (video_id, start, end) 缓存在 output_dir（默认 data/clips）中，
+        切点强制对齐关键帧，片段内的时间 t 对应原视频的 start + t
+
+        :param video_id: 调用方已解析的视频 ID（分P视频带 _pN 后缀），用作缓存键
+        """
+        if not video_id:
+            raise ValueError(f"缺少 video_id，无法缓存视频片段: {video_url}")
+        if output_dir is None:
+            output_dir = os.path.join(get_data_dir(), "clips")
+        os.makedirs(output_dir, exist_ok=True)
+        clip_path = os.path.join(output_dir, f"{video_id}_{start}_{end}.mp4")
+        if os.path.exists(clip_path):
+            return clip_path
+
+        def _download() -> str:
+            if os.path.exists(clip_path):
+                return clip_path
+            ydl_opts = {
+                # 只需要截取画面，不下载音频
+                'format': 'bv*[height<=720][ext=mp4]/bv*[height<=720]/best[height<=720]',
+                'outtmpl': clip_path,
+                'noplaylist': True,
+                'quiet': False,
+                'download_ranges': download_range_func(None, [(start, end)]),
+                'force_keyframes_at_cuts': True,
+                # 网络超时和重试配置
+                'socket_timeout': 120,
+                'retries': 10,
+                'fragment_retries': 10,
+                'file_access_retries': 5,
+            }
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.download([video_url])
+            if not os.path.exists(clip_path):
+                raise FileNotFoundError(f"视频片段未找到: {clip_path}")
+            return clip_path
+
+        path, _ = clip_flight.do((video_id, start, end), _download)
+        return path
+
     def delete_video(self, video_path: str) -> str:
         """
         删除视频文件
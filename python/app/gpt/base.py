@@ -1,6 +1,7 @@
 from abc import ABC,abstractmethod
 
 from app.models.gpt_model import GPTSource
+from app.utils.blocking_pool import run_blocking
 
 
 class GPT(ABC):
@@ -11,6 +12,13 @@ class GPT(ABC):
         :return:
         '''
         pass
+    async def asummarize(self, source:GPTSource)->str:
+        '''
+        异步版本的 summarize，默认在阻塞任务线程池中执行同步实现
+        :param source:
+        :return:
+        '''
+        return await run_blocking(self.summarize, source)
     def create_messages(self, segments:list,**kwargs)->list:
         pass
     def list_models(self):
@@ -0,0 +1,248 @@
+"""
+OpenAI 兼容客户端池
+
+同步和异步客户端都按 (base_url, api_key, timeout) 复用，并共享底层 httpx 连接池（keep-alive，
+安装了 h2 时启用 HTTP/2），GPTFactory、转写器、对话标题生成和 agent 的 LLM 工具不再每次调用都
+新建客户端、重新进行 TCP/TLS 握手。
+
+    - 同步：进程内共享一个 httpx.Client（线程安全）
+    - 异步：httpx.AsyncClient 的连接绑定在创建它的事件循环上，因此每个事件循环一个连接池
+
+供应商的 API Key 或 Base URL 更新、供应商被删除时，调用 invalidate_provider_clients 移除旧客户端；
+其他模块缓存的派生客户端（如 LangChain ChatOpenAI）可通过 add_invalidation_listener 同步失效。
+
+配置（环境变量）：
+    HTTP_CLIENT_HTTP2                 是否启用 HTTP/2（默认 true，需要安装 h2）
+    ASYNC_HTTP_MAX_CONNECTIONS        最大连接数（默认 200，同步与异步连接池共用）
+    ASYNC_HTTP_MAX_KEEPALIVE          最大保活连接数（默认 50）
+    ASYNC_HTTP_TIMEOUT                默认请求超时（秒，默认 600）
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv("ASYNC_HTTP_MAX_KEEPALIVE", "50"))
+ASYNC_HTTP_TIMEOUT = float(os.getenv("ASYNC_HTTP_TIMEOUT", "600"))
+# HTTP/2 依赖 h2 包，未安装时自动退回 HTTP/1.1
+HTTP_CLIENT_HTTP2 = (
+    os.getenv("HTTP_CLIENT_HTTP2", "true").lower() in ("1", "true", "yes")
+    and importlib.util.find_spec("h2") is not None
+)
+
+ClientKey = Tuple[str, str, float]
+
+
+def _client_key(api_key: str, base_url: Optional[str], timeout: Optional[float]) -> ClientKey:
+    # OpenAI 客户端会给 base_url 补上结尾的 /，这里统一去掉，保证同一供应商得到同一个键
+    return (str(base_url or "").rstrip("/"), api_key, float(timeout or ASYNC_HTTP_TIMEOUT))
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=ASYNC_HTTP_MAX_KEEPALIVE,
+    )
+
+
+class _PoolStats:
+    """客户端池计数（命中 / 新建 / 失效）"""
+
+    def __init__(self):
+        self.hits = 0
+        self.created = 0
+        self.invalidated = 0
+
+    def as_dict(self, size: int) -> Dict[str, int]:
+        return {"clients": size, "hits": self.hits, "created": self.created, "invalidated": self.invalidated}
+
+
+class _LoopClientPool:
+    """单个事件循环内共享的 httpx 连接池和 AsyncOpenAI 客户端"""
+
+    def __init__(self):
+        self.http_client = httpx.AsyncClient(
+            limits=_http_limits(),
+            timeout=httpx.Timeout(ASYNC_HTTP_TIMEOUT),
+            http2=HTTP_CLIENT_HTTP2,
+        )
+        self.clients: Dict[ClientKey, AsyncOpenAI] = {}
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+        self.clients.clear()
+
+
+_lock = threading.Lock()
+_sync_http_client: Optional[httpx.Client] = None
+_sync_clients: Dict[ClientKey, OpenAI] = {}
+_sync_stats = _PoolStats()
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopClientPool]" = weakref.WeakKeyDictionary()
+_async_stats = _PoolStats()
+_invalidation_listeners: List[Callable[[str, str], None]] = []
+
+
+def get_http_client() -> httpx.Client:
+    """获取进程内共享的同步 httpx 连接池"""
+    global _sync_http_client
+    if _sync_http_client is None:
+        with _lock:
+            if _sync_http_client is None:
+                _sync_http_client = httpx.Client(
+                    limits=_http_limits(),
+                    timeout=httpx.Timeout(ASYNC_HTTP_TIMEOUT),
+                    http2=HTTP_CLIENT_HTTP2,
+                )
+                logger.info(f"创建同步 HTTP 连接池（最大连接数 {ASYNC_HTTP_MAX_CONNECTIONS}，HTTP/2: {HTTP_CLIENT_HTTP2}）")
+    return _sync_http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的异步 httpx 连接池（必须在协程中调用）"""
+    return _get_loop_pool().http_client
+
+
+def _get_loop_pool() -> _LoopClientPool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _LoopClientPool()
+        _pools[loop] = pool
+        logger.info(f"创建异步 HTTP 连接池（最大连接数 {ASYNC_HTTP_MAX_CONNECTIONS}，HTTP/2: {HTTP_CLIENT_HTTP2}）")
+    return pool
+
+
+def get_openai_client(api_key: str, base_url: Optional[str], timeout: Optional[float] = None) -> OpenAI:
+    """
+    获取指定供应商的同步 OpenAI 客户端（线程安全）
+
+    :param api_key: 供应商 API Key
+    :param base_url: 供应商 Base URL
+    :param timeout: 请求超时（秒，默认 ASYNC_HTTP_TIMEOUT）
+    :return: 共享连接池的 OpenAI 客户端
+    """
+    key = _client_key(api_key, base_url, timeout)
+    client = _sync_clients.get(key)
+    if client is not None:
+        # 计数在多个线程中更新，统一在锁内累加
+        with _lock:
+            _sync_stats.hits += 1
+        return client
+    http_client = get_http_client()
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, timeout=key[2], http_client=http_client)
+            _sync_clients[key] = client
+            _sync_stats.created += 1
+        else:
+            _sync_stats.hits += 1
+    return client
+
+
+def get_async_openai_client(api_key: str, base_url: Optional[str], timeout: Optional[float] = None) -> AsyncOpenAI:
+    """
+    获取当前事件循环中指定供应商的 AsyncOpenAI 客户端（必须在协程中调用）
+
+    :param api_key: 供应商 API Key
+    :param base_url: 供应商 Base URL
+    :param timeout: 请求超时（秒，默认 ASYNC_HTTP_TIMEOUT）
+    :return: 共享连接池的 AsyncOpenAI 客户端
+    """
+    pool = _get_loop_pool()
+    key = _client_key(api_key, base_url, timeout)
+    client = pool.clients.get(key)
+    created = client is None
+    if created:
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=key[2], http_client=pool.http_client)
+        pool.clients[key] = client
+    # 不同线程中的事件循环共用同一份异步计数，统一在锁内累加
+    with _lock:
+        if created:
+            _async_stats.created += 1
+        else:
+            _async_stats.hits += 1
+    return client
+
+
+def add_invalidation_listener(listener: Callable[[str, str], None]) -> None:
+    """
+    注册客户端失效回调，供应商客户端失效时以 (base_url, api_key) 调用
+
+    :param listener: 回调函数，需自行保证线程安全
+    """
+    _invalidation_listeners.append(listener)
+
+
+def invalidate_provider_clients(base_url: Optional[str], api_key: Optional[str]) -> int:
+    """
+    移除指定供应商（旧的 base_url + api_key）的所有同步/异步客户端，连接池本身保留
+
+    :return: 移除的客户端数
+    """
+    base_url = str(base_url or "").rstrip("/")
+    with _lock:
+        sync_keys = [k for k in _sync_clients if k[0] == base_url and k[1] == api_key]
+        for key in sync_keys:
+            del _sync_clients[key]
+        async_removed = 0
+        for pool in list(_pools.values()):
+            for key in [k for k in pool.clients if k[0] == base_url and k[1] == api_key]:
+                del pool.clients[key]
+                async_removed += 1
+        _sync_stats.invalidated += len(sync_keys)
+        _async_stats.invalidated += async_removed
+    removed = len(sync_keys) + async_removed
+    for listener in list(_invalidation_listeners):
+        try:
+            listener(base_url, api_key)
+        except Exception as e:
+            logger.warning(f"客户端失效回调执行失败: {e}")
+    if removed:
+        logger.info(f"已移除供应商 {base_url} 的 {removed} 个客户端")
+    return removed
+
+
+def client_pool_stats() -> Dict[str, Any]:
+    """客户端池指标：当前客户端数、命中数、新建数、失效数"""
+    with _lock:
+        sync_size = len(_sync_clients)
+        async_size = sum(len(pool.clients) for pool in _pools.values())
+    return {
+        "http2": HTTP_CLIENT_HTTP2,
+        "sync": _sync_stats.as_dict(sync_size),
+        "async": _async_stats.as_dict(async_size),
+    }
+
+
+def close_clients() -> None:
+    """关闭同步连接池（应用关闭时调用）"""
+    global _sync_http_client
+    with _lock:
+        http_client, _sync_http_client = _sync_http_client, None
+        _sync_clients.clear()
+    if http_client is not None:
+        http_client.close()
+        logger.info("同步 HTTP 连接池已关闭")
+
+
+async def aclose_async_clients() -> None:
+    """关闭当前事件循环的连接池（应用关闭时调用）"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
+        logger.info("异步 HTTP 连接池已关闭")
@@ -0,0 +1,233 @@
+"""
+LLM 响应缓存（SQLite）
+
+相同的模型、供应商、消息和温度再次请求时直接返回上次的响应，不再调用供应商接口：
+    - 键：对 (model, provider, 规范化后的消息, temperature, 其他生成参数) 计算 sha256
+      规范化会统一换行符、去除行尾空白和首尾空行，避免无意义的空白差异导致未命中
+    - 存储：独立的 SQLite 文件（WAL 模式），不占用业务数据库连接
+    - 淘汰：超过 LLM_CACHE_TTL_HOURS 的条目视为过期；条目数或总大小超过上限时按最近最少使用（LRU）删除
+    - 调用方可按次关闭缓存（use_cache=False）
+
+配置（环境变量）：
+    LLM_CACHE_ENABLED       是否启用（默认 true）
+    LLM_CACHE_PATH          缓存数据库路径（默认 {DATA_DIR}/llm_cache.db）
+    LLM_CACHE_TTL_HOURS     有效期（小时，默认 168，0 表示不过期）
+    LLM_CACHE_MAX_ENTRIES   最大条目数（默认 5000）
+    LLM_CACHE_MAX_MB        最大总大小（MB，默认 200）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.blocking_pool import run_blocking
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_data_dir
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or os.path.join(get_data_dir(), "llm_cache.db")
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+
+
+def _normalize_text(text: str) -> str:
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def _normalize_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return _normalize_text(content)
+    if isinstance(content, list):
+        # OpenAI 多模态 content 数组：文本部分规范化，图片等其他部分原样参与计算
+        return [
+            {**part, "text": _normalize_text(part["text"])} if isinstance(part, dict) and isinstance(part.get("text"), str) else part
+            for part in content
+        ]
+    return content
+
+
+def normalize_messages(messages: Any) -> Any:
+    """规范化消息，用于计算缓存键（字符串提示词或 OpenAI 格式的消息列表）"""
+    if isinstance(messages, str):
+        return _normalize_text(messages)
+    return [
+        {"role": message.get("role"), "content": _normalize_content(message.get("content"))}
+        if isinstance(message, dict) else message
+        for message in messages
+    ]
+
+
+def make_llm_cache_key(model: str, provider: str, messages: Any, temperature: Optional[float] = None, **params: Any) -> str:
+    """
+    计算 LLM 响应的缓存键
+
+    :param model: 模型名称
+    :param provider: 供应商标识（Base URL 等）
+    :param messages: 消息列表或提示词字符串
+    :param temperature: 温度
+    :param params: 其他影响输出的生成参数（如 max_tokens）
+    :return: sha256 十六进制字符串
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "provider": str(provider or "").rstrip("/"),
+            "messages": normalize_messages(messages),
+            "temperature": temperature,
+            "params": params,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_hours: float = LLM_CACHE_TTL_HOURS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_mb: float = LLM_CACHE_MAX_MB,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                provider TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的响应，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model: Optional[str] = None, provider: Optional[str] = None) -> None:
+        """写入响应，超出条目数或大小上限时按 LRU 淘汰"""
+        if not response:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, provider, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, provider, response, size, now, now),
+            )
+            self.writes += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        if self.ttl_seconds > 0:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self.evictions += cursor.rowcount
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # 从最久未访问的条目开始删除，直到满足两个上限
+        removed, keys = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall():
+            if count - removed <= self.max_entries and total <= self.max_bytes:
+                break
+            keys.append((key,))
+            removed += 1
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", keys)
+        self.evictions += removed
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await run_blocking(self.get, key)
+
+    async def aput(self, key: str, response: str, model: Optional[str] = None, provider: Optional[str] = None) -> None:
+        await run_blocking(self.put, key, response, model, provider)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中 / 未命中 / 写入 / 淘汰次数，以及当前条目数和总大小"""
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "size_bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """获取进程内共享的 LLM 响应缓存，未启用时返回 None"""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMCache()
+                logger.info(f"LLM 响应缓存: {LLM_CACHE_PATH}（最多 {LLM_CACHE_MAX_ENTRIES} 条 / {LLM_CACHE_MAX_MB:.0f}MB）")
+    return _llm_cache
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    cache = get_llm_cache()
+    return {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
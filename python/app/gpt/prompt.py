@@ -1,18 +1,17 @@
-BASE_PROMPT = '''
+# 提示词版本号：修改下方笔记提示词后需要递增，用于使产物缓存中的旧笔记失效
+PROMPT_VERSION = "3"
+
+# 提示词布局：静态指令在前、视频相关内容在后
+# 供应商（Qwen / DeepSeek / OpenAI 兼容接口）的提示词前缀缓存按请求开头的相同 token 命中，
+# 因此标题、标签、转写文本和用户补充要求只能出现在静态指令和格式 / 风格要求之后
+
+NOTE_PROMPT_PREFIX = '''
 你是一个专业的笔记助手，擅长将视频转录内容整理成清晰、有条理且信息丰富的笔记。
 
 语言要求：
 - 笔记必须使用 **中文** 撰写。
 - 专有名词、技术术语、品牌名称和人名应适当保留 **英文**。
 
-视频标题：
-{video_title}
-
-视频标签：
-{tags}
-
-
-
 输出说明：
 - 仅返回最终的 **Markdown 内容**。
 - **不要**将输出包裹在代码块中（例如：```` ```markdown ````，```` ``` ````）。
@@ -25,14 +24,8 @@ BASE_PROMPT = '''
  `1. **xxx**`
  `1\. **xxx**` 或 `## 1. xxx`
 
-视频分段（格式：开始时间 - 内容）：
-
----
-{segment_text}
----
-
 你的任务：
-根据上面的分段转录内容，生成结构化的笔记，遵循以下原则：
+根据本提示词末尾提供的视频分段转录内容，生成结构化的笔记，遵循以下原则：
 
 1. **完整信息**：记录尽可能多的相关细节，确保内容全面。
 2. **去除无关内容**：省略广告、填充词、问候语和不相关的言论。
@@ -42,11 +35,37 @@ BASE_PROMPT = '''
 
 
 请始终遵循此规则。
+'''
 
+NOTE_TASKS_HEADER = '''
 额外重要的任务如下(每一个都必须严格完成):
 
 '''
 
+NOTE_VIDEO_PROMPT = '''
+
+视频标题：
+{video_title}
+
+视频标签：
+{tags}
+
+视频分段（格式：开始时间 - 内容）：
+
+---
+{segment_text}
+---
+'''
+
+# 用户填写的补充要求（每次请求不同，放在视频内容之后）
+NOTE_EXTRAS_PROMPT = '''
+补充要求（同样必须严格完成）：
+{extras}
+'''
+
+# 旧版各 GPT 实现使用：格式化后在末尾追加额外任务
+BASE_PROMPT = NOTE_PROMPT_PREFIX + NOTE_VIDEO_PROMPT + NOTE_TASKS_HEADER
+
 
 LINK='''
 9. **Add time markers**: THIS IS IMPORTANT For every main heading (`##`), append the starting time of that segment using the format ,start with *Content ,eg: `*Content-[mm:ss]`.
@@ -66,4 +85,38 @@ SCREENSHOT='''
 8. **Screenshot placeholders**: If a section involves **visual demonstrations, code walkthroughs, UI interactions**, or any content where visuals aid understanding, insert a screenshot cue at the end of that section:
    - Format: `*Screenshot-[mm:ss]`
    - Only use it when truly helpful.
-'''
\ No newline at end of file
+'''
+# 长转写分段生成（map）：每个分段先生成局部笔记
+NOTE_MAP_PROMPT = '''
+补充说明（分段生成）：
+这是一个长视频，转录内容被分成了 {total} 个部分，上面只是第 {index}/{total} 部分（{start} - {end}）。
+- 只整理本部分的内容，不要编写全文引言、目录或总结，不要推测其他部分的内容。
+- 使用 `##` 作为本部分各章节的标题；如需添加时间标记，时间取自上面的分段时间。
+'''
+
+# 长转写合并（reduce）：把各部分的局部笔记合并为完整笔记
+# 静态的合并要求在前，局部笔记等视频相关内容在后（见上方提示词布局说明）
+NOTE_MERGE_PROMPT_PREFIX = '''
+你是一个专业的笔记助手。本提示词末尾是同一个视频按时间顺序分段整理出的多份局部笔记，请将它们合并为一份完整、连贯的笔记。
+
+合并要求：
+1. 按时间顺序组织内容，合并相邻部分中重复或被切断的章节，删除重复的表述，不要遗漏任何要点。
+2. **原样保留**所有 `*Content-[mm:ss]` 和 `*Screenshot-[mm:ss]` 标记及其中的时间，不得修改、编造或删除时间标记；合并章节时保留较早的时间标记。
+3. 笔记使用 **中文** 撰写，专有名词、技术术语、品牌名称和人名适当保留 **英文**，数学公式保留 LaTeX 语法。
+4. 仅返回最终的 **Markdown 内容**，**不要**将输出包裹在代码块中；编号标题使用 `## 1. 内容` 的形式。
+'''
+
+NOTE_MERGE_VIDEO_PROMPT = '''
+
+视频标题：
+{video_title}
+
+视频标签：
+{tags}
+
+局部笔记（共 {total} 份）：
+
+---
+{partial_notes}
+---
+'''
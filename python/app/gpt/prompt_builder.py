@@ -1,4 +1,11 @@
-from app.gpt.prompt import BASE_PROMPT
+from app.gpt.prompt import (
+    NOTE_EXTRAS_PROMPT,
+    NOTE_MERGE_PROMPT_PREFIX,
+    NOTE_MERGE_VIDEO_PROMPT,
+    NOTE_PROMPT_PREFIX,
+    NOTE_TASKS_HEADER,
+    NOTE_VIDEO_PROMPT,
+)
 
 note_formats = [
     {'label': '目录', 'value': 'toc'},
@@ -20,27 +27,47 @@ note_styles = [
 ]
 
 
-# 生成 BASE_PROMPT 函数
+def generate_task_prompt(_format=None, style=None):
+    """
+    格式和风格要求（只取决于用户选择的选项）
+    格式按 note_formats 的顺序输出（与用户勾选顺序无关），选项相同时得到完全相同的文本，便于命中供应商的提示词前缀缓存
+    """
+    prompt = NOTE_TASKS_HEADER
+    if _format:
+        ordered = [item['value'] for item in note_formats if item['value'] in _format]
+        prompt += "\n" + "\n".join(get_format_function(f) for f in ordered)
+    if style:
+        prompt += "\n" + get_style_format(style)
+    return prompt
+
+
+def _with_extras(prompt, extras):
+    if extras:
+        prompt += NOTE_EXTRAS_PROMPT.format(extras=extras)
+    return prompt
+
+
+# 生成笔记提示词：静态指令 + 格式 / 风格要求 + 视频内容 + 补充要求
 def generate_base_prompt(title, segment_text, tags, _format=None, style=None, extras=None):
-    # 生成 Base Prompt 开头部分
-    prompt = BASE_PROMPT.format(
+    prompt = NOTE_PROMPT_PREFIX + generate_task_prompt(_format, style)
+    prompt += NOTE_VIDEO_PROMPT.format(
         video_title=title,
         segment_text=segment_text,
         tags=tags
     )
+    return _with_extras(prompt, extras)
 
-    # 添加用户选择的格式
-    if _format:
-        prompt += "\n" + "\n".join([get_format_function(f) for f in _format])
-
-    # 根据用户选择的笔记风格添加描述
-    if style:
-        prompt += "\n" + get_style_format(style)
 
-    # 添加额外内容
-    if extras:
-        prompt += f"\n{extras}"
-    return prompt
+# 生成长转写合并提示词：静态合并要求 + 格式 / 风格要求 + 局部笔记 + 补充要求
+def generate_merge_prompt(title, partial_notes, tags, _format=None, style=None, extras=None):
+    prompt = NOTE_MERGE_PROMPT_PREFIX + generate_task_prompt(_format, style)
+    prompt += NOTE_MERGE_VIDEO_PROMPT.format(
+        total=len(partial_notes),
+        video_title=title,
+        tags=tags,
+        partial_notes="\n\n---\n\n".join(partial_notes),
+    )
+    return _with_extras(prompt, extras)
 
 
 # 获取格式函数
@@ -2,6 +2,7 @@ from typing import Optional, Union
 
 from openai import OpenAI
 
+from app.gpt.client_pool import get_openai_client
 from app.utils.logger import get_logger
 
 logging= get_logger(__name__)
@@ -17,7 +18,8 @@ class OpenAICompatibleProvider:
         if api_key.lower() in placeholder_keys:
             raise ValueError(f"API Key 是占位符，请替换为真实的 API Key。base_url: {base_url}")
         
-        self.client = OpenAI(api_key=api_key.strip(), base_url=base_url)
+        # 同一供应商复用同一个客户端及其连接池
+        self.client = get_openai_client(api_key.strip(), base_url)
         self.model = model
 
     @property
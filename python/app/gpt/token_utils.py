@@ -0,0 +1,83 @@
+"""
+Token 估算与按 token 预算切分转写片段
+
+安装了 tiktoken 时使用 cl100k_base 编码精确计数；否则按字符估算：
+中日韩字符每字约 1 个 token，其他字符每 4 个约 1 个 token（对中文为主的转写文本偏保守）。
+
+编码在首次估算时才加载：离线环境中 tiktoken 无法下载编码文件时退回字符估算，不影响应用启动。
+"""
+
+import re
+import threading
+from typing import Callable, List, Optional, Sequence
+
+from app.models.transcriber_model import TranscriptSegment
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_CJK = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """加载 cl100k_base 编码（只尝试一次），未安装 tiktoken 或加载失败时返回 None"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except ImportError:
+                    _encoding = None
+                except Exception as e:
+                    logger.warning(f"tiktoken 编码加载失败，改用字符估算 token 数: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 token 数"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_segments_by_tokens(
+    segments: Sequence[TranscriptSegment],
+    max_tokens: int,
+    render: Optional[Callable[[TranscriptSegment], str]] = None,
+) -> List[List[TranscriptSegment]]:
+    """
+    按顺序把转写片段分组，每组渲染后的 token 数不超过 max_tokens（单个片段超出预算时单独成组）
+
+    :param segments: 转写片段
+    :param max_tokens: 每组的 token 预算
+    :param render: 片段渲染为提示词文本的函数，默认直接使用片段文本
+    :return: 片段分组列表
+    """
+    render = render or (lambda seg: seg.text)
+    groups: List[List[TranscriptSegment]] = []
+    current: List[TranscriptSegment] = []
+    current_tokens = 0
+    for seg in segments:
+        # +1 为分组内片段之间的换行
+        tokens = estimate_tokens(render(seg)) + 1
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(seg)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,200 @@
+"""
+转写文本压缩（构建笔记提示词之前）
+
+Whisper / Groq 返回的片段往往只有几个字，且常有口头禅和重复识别，逐行写入提示词会浪费大量 token：
+    1. 去掉只包含语气词 / 填充词的片段
+    2. 去掉与最近几个片段几乎相同的片段（Whisper 常见的重复识别）
+    3. 把相邻片段按时间桶（默认 30 秒）合并为段落，每个段落保留起始时间作为时间锚点
+    4. 设置了 token 预算且仍超出时，按比例截断各段落文本（不删除段落，时间锚点全部保留，
+       只有时间锚点本身就超出预算时结果才会超出预算）
+
+配置见 NotePipelineConfig：transcript_compaction / transcript_bucket_seconds / transcript_max_tokens。
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.gpt.token_utils import estimate_tokens
+from app.models.transcriber_model import TranscriptSegment
+
+# 与最近 DUPLICATE_WINDOW 个片段的相似度不低于 DUPLICATE_RATIO 时视为重复
+DUPLICATE_WINDOW = 3
+DUPLICATE_RATIO = 0.9
+# 截断后仍超出预算时收紧预算重试的次数
+TRUNCATE_ROUNDS = 5
+
+_FILLER = re.compile(
+    r"(嗯+|啊+|呃+|额+|哦+|噢+|唉+|哎+|诶+|那个|这个|就是说|然后呢|对吧|对对对|好的?|"
+    r"\bum+\b|\buh+\b|\berm+\b|\bhmm+\b|\byeah\b|\bokay\b|\bok\b|\byou know\b|\blike\b)",
+    re.IGNORECASE,
+)
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+@dataclass
+class CompactionResult:
+    segments: List[TranscriptSegment]
+    original_tokens: int
+    compacted_tokens: int
+    dropped: int = 0                 # 删除的填充词 / 重复片段数
+    truncated: bool = False          # 是否为满足 token 预算截断了段落文本
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+
+@dataclass
+class _Stats:
+    calls: int = 0
+    original_tokens: int = 0
+    compacted_tokens: int = 0
+    dropped: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_stats = _Stats()
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub("", text.lower())
+
+
+def _is_filler(text: str) -> bool:
+    return not _normalize(_FILLER.sub("", text))
+
+
+def _is_duplicate(text: str, recent: Sequence[str]) -> bool:
+    normalized = _normalize(text)
+    return any(
+        normalized == prev or SequenceMatcher(None, normalized, prev).ratio() >= DUPLICATE_RATIO
+        for prev in recent
+    )
+
+
+def _join(parts: List[str]) -> str:
+    text = parts[0]
+    for part in parts[1:]:
+        # 英文等以空格分词的文本之间补空格，中文直接拼接并用逗号隔开
+        text += " " + part if text[-1].isascii() and part[0].isascii() else (
+            part if text[-1] in "，。！？、；：,.!?;:" else "，" + part
+        )
+    return text
+
+
+def _line_tokens(seg: TranscriptSegment, render: Callable[[TranscriptSegment], str]) -> int:
+    # 每个片段渲染为一行，换行符计 1 个 token
+    return estimate_tokens(render(seg)) + 1
+
+
+def _truncate(segments: List[TranscriptSegment], max_tokens: int, render: Callable[[TranscriptSegment], str]) -> List[TranscriptSegment]:
+    """
+    按各段落文本的 token 占比分配预算，逐段截断文本（保留段落和时间锚点）
+
+    每行的固定开销（时间锚点、省略号和换行）先从预算中扣除；token 估算不是线性的，
+    截断后重新核算总数，仍超出时按比例收紧预算重试，最后退化为只保留时间锚点。
+    固定开销本身超出预算时无法满足，此时同样只保留时间锚点。
+    """
+    anchors = [TranscriptSegment(start=seg.start, end=seg.end, text="…") for seg in segments]
+    text_budget = max_tokens - sum(_line_tokens(seg, render) for seg in anchors)
+    text_tokens = [estimate_tokens(seg.text) for seg in segments]
+    total = sum(text_tokens)
+    if text_budget <= 0 or total <= 0:
+        return anchors
+
+    for _ in range(TRUNCATE_ROUNDS):
+        result = []
+        for seg, anchor, seg_tokens in zip(segments, anchors, text_tokens):
+            budget = int(text_budget * seg_tokens / total)
+            if seg_tokens <= budget:
+                result.append(seg)
+                continue
+            keep = int(len(seg.text) * budget / seg_tokens)
+            text = seg.text[:keep].rstrip()
+            result.append(TranscriptSegment(start=seg.start, end=seg.end, text=text + "…") if text else anchor)
+        used = sum(_line_tokens(seg, render) for seg in result)
+        if used <= max_tokens:
+            return result
+        text_budget = int(text_budget * max_tokens / used * 0.9)
+        if text_budget <= 0:
+            break
+    return anchors
+
+
+def compact_segments(
+    segments: Sequence[TranscriptSegment],
+    bucket_seconds: float = 30,
+    max_tokens: int = 0,
+    render: Optional[Callable[[TranscriptSegment], str]] = None,
+) -> CompactionResult:
+    """
+    压缩转写片段
+
+    :param segments: 原始转写片段（按时间排序）
+    :param bucket_seconds: 合并为一个段落的最长时间跨度（秒），0 表示不合并
+    :param max_tokens: 渲染后的 token 预算，0 表示不限制
+    :param render: 片段渲染为提示词行的函数，用于计算 token 数，默认直接使用片段文本
+    :return: 压缩结果（含压缩前后的 token 数）
+    """
+    render = render or (lambda seg: seg.text)
+    original_tokens = sum(_line_tokens(seg, render) for seg in segments)
+
+    kept: List[TranscriptSegment] = []
+    recent: List[str] = []
+    dropped = 0
+    for seg in segments:
+        text = seg.text.strip()
+        if not text or _is_filler(text) or _is_duplicate(text, recent):
+            dropped += 1
+            continue
+        kept.append(TranscriptSegment(start=seg.start, end=seg.end, text=text))
+        recent = (recent + [_normalize(text)])[-DUPLICATE_WINDOW:]
+
+    merged: List[TranscriptSegment] = []
+    if bucket_seconds > 0:
+        bucket: List[TranscriptSegment] = []
+        for seg in kept:
+            if bucket and seg.start - bucket[0].start >= bucket_seconds:
+                merged.append(TranscriptSegment(start=bucket[0].start, end=bucket[-1].end, text=_join([s.text for s in bucket])))
+                bucket = []
+            bucket.append(seg)
+        if bucket:
+            merged.append(TranscriptSegment(start=bucket[0].start, end=bucket[-1].end, text=_join([s.text for s in bucket])))
+    else:
+        merged = kept
+
+    compacted_tokens = sum(_line_tokens(seg, render) for seg in merged)
+    truncated = False
+    if max_tokens > 0 and compacted_tokens > max_tokens and merged:
+        merged = _truncate(merged, max_tokens, render)
+        compacted_tokens = sum(_line_tokens(seg, render) for seg in merged)
+        truncated = True
+
+    result = CompactionResult(
+        segments=merged,
+        original_tokens=original_tokens,
+        compacted_tokens=compacted_tokens,
+        dropped=dropped,
+        truncated=truncated,
+    )
+    with _stats.lock:
+        _stats.calls += 1
+        _stats.original_tokens += original_tokens
+        _stats.compacted_tokens += compacted_tokens
+        _stats.dropped += dropped
+    return result
+
+
+def compaction_stats() -> Dict[str, int]:
+    """进程内累计的压缩次数、压缩前后 token 数和节省的 token 数"""
+    with _stats.lock:
+        return {
+            "calls": _stats.calls,
+            "original_tokens": _stats.original_tokens,
+            "compacted_tokens": _stats.compacted_tokens,
+            "tokens_saved": max(0, _stats.original_tokens - _stats.compacted_tokens),
+            "dropped_segments": _stats.dropped,
+        }
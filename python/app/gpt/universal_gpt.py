@@ -1,16 +1,67 @@
+from app.gpt.client_pool import get_async_openai_client
+from app.gpt.llm_cache import get_llm_cache, make_llm_cache_key
 from app.gpt.base import GPT
-from app.gpt.prompt_builder import generate_base_prompt
+from app.gpt.prompt_builder import generate_base_prompt, generate_merge_prompt
+from app.gpt.token_utils import estimate_tokens, split_segments_by_tokens
+from app.gpt.usage_metrics import record_usage
+from app.gpt.transcript_compactor import compact_segments
 from app.models.gpt_model import GPTSource
-from app.gpt.prompt import BASE_PROMPT, AI_SUM, SCREENSHOT, LINK
+from app.gpt.prompt import NOTE_MAP_PROMPT
 from app.gpt.utils import fix_markdown
 from app.models.transcriber_model import TranscriptSegment
+from app.services.note_config import get_note_config
+from app.utils.logger import get_logger
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import List
+from typing import List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+logger = get_logger(__name__)
+
+# 分段生成局部笔记时只保留时间标记要求；目录、截图和 AI 总结在合并阶段统一生成
+MAP_FORMATS = ("link",)
+
+# 分段生成的并发上限（NOTE_MAP_CONCURRENCY）在进程内所有视频之间共享：
+# 同步路径共用一个线程池，异步路径每个事件循环共用一个信号量，
+# 因此笔记阶段的多个线程同时处理长视频时，分段请求总数仍不超过该上限
+_map_executor: Optional[ThreadPoolExecutor] = None
+_map_executor_lock = threading.Lock()
+_map_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _map_concurrency() -> int:
+    return max(1, get_note_config().note_map_concurrency)
+
+
+def get_map_executor() -> ThreadPoolExecutor:
+    """获取进程内共享的分段生成线程池（单例）"""
+    global _map_executor
+    if _map_executor is None:
+        with _map_executor_lock:
+            if _map_executor is None:
+                _map_executor = ThreadPoolExecutor(max_workers=_map_concurrency(), thread_name_prefix="note-map")
+    return _map_executor
+
+
+def _map_semaphore() -> asyncio.Semaphore:
+    """当前事件循环共享的分段生成信号量"""
+    loop = asyncio.get_running_loop()
+    semaphore = _map_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_map_concurrency())
+        _map_semaphores[loop] = semaphore
+    return semaphore
 
 
 class UniversalGPT(GPT):
-    def __init__(self, client, model: str, temperature: float = 0.7):
+    def __init__(self, client, model: str, temperature: float = 0.7, async_client: Optional[AsyncOpenAI] = None):
         self.client = client
+        # 异步客户端默认在首次 asummarize 时从共享连接池获取（需在事件循环中）
+        self.async_client = async_client
         self.model = model
         self.temperature = temperature
         self.screenshot = False
@@ -19,31 +70,21 @@ class UniversalGPT(GPT):
     def _format_time(self, seconds: float) -> str:
         return str(timedelta(seconds=int(seconds)))[2:]
 
+    def _render_segment(self, seg: TranscriptSegment) -> str:
+        return f"{self._format_time(seg.start)} - {seg.text.strip()}"
+
     def _build_segment_text(self, segments: List[TranscriptSegment]) -> str:
-        return "\n".join(
-            f"{self._format_time(seg.start)} - {seg.text.strip()}"
-            for seg in segments
-        )
+        return "\n".join(self._render_segment(seg) for seg in segments)
 
     def ensure_segments_type(self, segments) -> List[TranscriptSegment]:
         return [TranscriptSegment(**seg) if isinstance(seg, dict) else seg for seg in segments]
 
-    def create_messages(self, segments: List[TranscriptSegment], **kwargs):
-
-        content_text = generate_base_prompt(
-            title=kwargs.get('title'),
-            segment_text=self._build_segment_text(segments),
-            tags=kwargs.get('tags'),
-            _format=kwargs.get('_format'),
-            style=kwargs.get('style'),
-            extras=kwargs.get('extras'),
-        )
-
+    @staticmethod
+    def _user_message(content_text: str, video_img_urls: Optional[List[str]] = None) -> list:
         # ⛳ 组装 content 数组，支持 text + image_url 混合
         content = [{"type": "text", "text": content_text}]
-        video_img_urls = kwargs.get('video_img_urls', [])
 
-        for url in video_img_urls:
+        for url in video_img_urls or []:
             content.append({
                 "type": "image_url",
                 "image_url": {
@@ -53,23 +94,79 @@ class UniversalGPT(GPT):
             })
 
         #  正确格式：整体包在一个 message 里，role + content array
-        messages = [{
+        return [{
             "role": "user",
             "content": content
         }]
 
-        return messages
+    def create_messages(self, segments: List[TranscriptSegment], **kwargs):
+
+        content_text = generate_base_prompt(
+            title=kwargs.get('title'),
+            segment_text=self._build_segment_text(segments),
+            tags=kwargs.get('tags'),
+            _format=kwargs.get('_format'),
+            style=kwargs.get('style'),
+            extras=kwargs.get('extras'),
+        )
+        return self._user_message(content_text, kwargs.get('video_img_urls', []))
+
+    def create_map_messages(self, segments: List[TranscriptSegment], index: int, total: int, **kwargs):
+        """长转写分段生成：第 index 段（从 1 开始）的局部笔记提示词，不附带截图"""
+        _format = [f for f in (kwargs.get('_format') or []) if f in MAP_FORMATS]
+        content_text = generate_base_prompt(
+            title=kwargs.get('title'),
+            segment_text=self._build_segment_text(segments),
+            tags=kwargs.get('tags'),
+            _format=_format,
+            style=kwargs.get('style'),
+            extras=kwargs.get('extras'),
+        )
+        content_text += NOTE_MAP_PROMPT.format(
+            index=index,
+            total=total,
+            start=self._format_time(segments[0].start),
+            end=self._format_time(segments[-1].end),
+        )
+        return self._user_message(content_text)
+
+    def create_merge_messages(self, partial_notes: List[str], **kwargs):
+        """长转写合并：把各段局部笔记合并为完整笔记，目录 / 截图 / AI 总结在此阶段生成"""
+        content_text = generate_merge_prompt(
+            title=kwargs.get('title'),
+            partial_notes=partial_notes,
+            tags=kwargs.get('tags'),
+            _format=kwargs.get('_format'),
+            style=kwargs.get('style'),
+            extras=kwargs.get('extras'),
+        )
+        return self._user_message(content_text, kwargs.get('video_img_urls', []))
 
     def list_models(self):
         return self.client.models.list()
 
-    def summarize(self, source: GPTSource) -> str:
+    def _compact_segments(self, segments: List[TranscriptSegment]) -> List[TranscriptSegment]:
+        """构建提示词前压缩转写片段（去除填充词 / 重复片段，按时间桶合并为段落）"""
+        config = get_note_config()
+        if not config.transcript_compaction or not segments:
+            return segments
+        result = compact_segments(
+            segments,
+            bucket_seconds=config.transcript_bucket_seconds,
+            max_tokens=config.transcript_max_tokens,
+            render=self._render_segment,
+        )
+        logger.info(
+            f"转写文本压缩：{len(segments)} 个片段 -> {len(result.segments)} 个段落，"
+            f"约 {result.original_tokens} -> {result.compacted_tokens} tokens（节省 {result.tokens_saved}）"
+        )
+        return result.segments
+
+    def _prepare_source(self, source: GPTSource) -> Tuple[List[TranscriptSegment], dict]:
         self.screenshot = source.screenshot
         self.link = source.link
         source.segment = self.ensure_segments_type(source.segment)
-
-        messages = self.create_messages(
-            source.segment,
+        return self._compact_segments(source.segment), dict(
             title=source.title,
             tags=source.tags,
             video_img_urls=source.video_img_urls,
@@ -77,9 +174,109 @@ class UniversalGPT(GPT):
             style=source.style,
             extras=source.extras
         )
+
+    def _source_messages(self, source: GPTSource):
+        segments, options = self._prepare_source(source)
+        return self.create_messages(segments, **options)
+
+    def _plan_map_reduce(self, segments: List[TranscriptSegment]) -> Optional[List[List[TranscriptSegment]]]:
+        """转写文本超过阈值时按 token 预算分段，否则返回 None（整段一次生成）"""
+        config = get_note_config()
+        if config.note_map_reduce_threshold_tokens <= 0:
+            return None
+        tokens = estimate_tokens(self._build_segment_text(segments))
+        if tokens <= config.note_map_reduce_threshold_tokens:
+            return None
+        groups = split_segments_by_tokens(segments, config.note_map_chunk_tokens, render=self._render_segment)
+        if len(groups) < 2:
+            return None
+        logger.info(f"转写文本约 {tokens} tokens，分 {len(groups)} 段生成局部笔记后合并")
+        return groups
+
+    def _cache_key(self, messages, temperature: float, **params) -> str:
+        return make_llm_cache_key(self.model, str(self.client.base_url), messages, temperature, **params)
+
+    def complete(self, messages, temperature: float = 0.7, use_cache: bool = True, usage_scope: str = "note", **params) -> str:
+        """
+        发送一次对话请求并返回文本，相同请求优先读取 LLM 响应缓存
+
+        :param messages: OpenAI 格式的消息列表
+        :param temperature: 温度
+        :param use_cache: 是否使用缓存
+        :param usage_scope: token 用量统计中的调用场景
+        :param params: 其他生成参数（如 max_tokens）
+        """
+        cache = get_llm_cache() if use_cache else None
+        key = self._cache_key(messages, temperature, **params) if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
-            temperature=0.7
+            temperature=temperature,
+            **params
         )
-        return response.choices[0].message.content.strip()
+        record_usage(usage_scope, self.model, getattr(response, "usage", None))
+        content = response.choices[0].message.content.strip()
+        if cache:
+            cache.put(key, content, model=self.model, provider=str(self.client.base_url))
+        return content
+
+    async def acomplete(self, messages, temperature: float = 0.7, use_cache: bool = True, usage_scope: str = "note", **params) -> str:
+        """complete 的异步版本，使用共享连接池的异步客户端"""
+        cache = get_llm_cache() if use_cache else None
+        key = self._cache_key(messages, temperature, **params) if cache else None
+        if cache:
+            cached = await cache.aget(key)
+            if cached is not None:
+                return cached
+        client = self.async_client or get_async_openai_client(
+            api_key=self.client.api_key,
+            base_url=str(self.client.base_url),
+        )
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            **params
+        )
+        record_usage(usage_scope, self.model, getattr(response, "usage", None))
+        content = response.choices[0].message.content.strip()
+        if cache:
+            await cache.aput(key, content, model=self.model, provider=str(self.client.base_url))
+        return content
+
+    def summarize(self, source: GPTSource) -> str:
+        segments, options = self._prepare_source(source)
+        groups = self._plan_map_reduce(segments)
+        if not groups:
+            return self.complete(self.create_messages(segments, **options), use_cache=source.use_cache)
+
+        total = len(groups)
+        partial_notes = list(get_map_executor().map(
+            lambda item: self.complete(
+                self.create_map_messages(item[1], item[0], total, **options), use_cache=source.use_cache
+            ),
+            enumerate(groups, start=1),
+        ))
+        return self.complete(self.create_merge_messages(partial_notes, **options), use_cache=source.use_cache)
+
+    async def asummarize(self, source: GPTSource) -> str:
+        segments, options = self._prepare_source(source)
+        groups = self._plan_map_reduce(segments)
+        if not groups:
+            return await self.acomplete(self.create_messages(segments, **options), use_cache=source.use_cache)
+
+        total = len(groups)
+        semaphore = _map_semaphore()
+
+        async def map_chunk(index: int, segments: List[TranscriptSegment]) -> str:
+            async with semaphore:
+                return await self.acomplete(
+                    self.create_map_messages(segments, index, total, **options), use_cache=source.use_cache
+                )
+
+        partial_notes = await asyncio.gather(*(map_chunk(i, g) for i, g in enumerate(groups, start=1)))
+        return await self.acomplete(self.create_merge_messages(list(partial_notes), **options), use_cache=source.use_cache)
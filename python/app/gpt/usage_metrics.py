@@ -0,0 +1,120 @@
+"""
+LLM token 用量与提示词前缀缓存命中统计
+
+从供应商返回的 usage 字段中读取输入 / 输出 token 数和命中前缀缓存的输入 token 数，按调用场景和模型累计：
+    - OpenAI / Qwen（DashScope 兼容模式）：usage.prompt_tokens_details.cached_tokens
+    - DeepSeek：usage.prompt_cache_hit_tokens
+    - LangChain：AIMessage.usage_metadata.input_token_details.cache_read
+命中 LLM 响应缓存（app.gpt.llm_cache）的调用不会请求供应商，也不计入统计。
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_usage(usage: Any) -> Optional[Dict[str, int]]:
+    """
+    解析供应商 usage（OpenAI SDK 对象、dict 或 LangChain usage_metadata）
+
+    :return: prompt_tokens / cached_tokens / completion_tokens，无法解析时返回 None
+    """
+    if usage is None:
+        return None
+    if _field(usage, "input_tokens") is not None:
+        # LangChain usage_metadata
+        return {
+            "prompt_tokens": _int(_field(usage, "input_tokens")),
+            "cached_tokens": _int(_field(_field(usage, "input_token_details"), "cache_read")),
+            "completion_tokens": _int(_field(usage, "output_tokens")),
+        }
+    if _field(usage, "prompt_tokens") is None:
+        return None
+    cached = _field(_field(usage, "prompt_tokens_details"), "cached_tokens")
+    if cached is None:
+        cached = _field(usage, "prompt_cache_hit_tokens")
+    return {
+        "prompt_tokens": _int(_field(usage, "prompt_tokens")),
+        "cached_tokens": _int(cached),
+        "completion_tokens": _int(_field(usage, "completion_tokens")),
+    }
+
+
+class UsageMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (场景, 模型) -> 累计值
+        self._totals: Dict[tuple, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+        )
+
+    def record(self, scope: str, model: str, usage: Any) -> None:
+        parsed = parse_usage(usage)
+        if parsed is None:
+            return
+        with self._lock:
+            totals = self._totals[(scope, model or "unknown")]
+            totals["calls"] += 1
+            for name, value in parsed.items():
+                totals[name] += value
+        logger.debug(
+            f"LLM 用量 [{scope}] {model}: 输入 {parsed['prompt_tokens']}（前缀缓存命中 {parsed['cached_tokens']}），"
+            f"输出 {parsed['completion_tokens']}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """按场景汇总，并列出各模型的明细；cache_hit_rate 为命中前缀缓存的输入 token 占比"""
+        with self._lock:
+            items = [(scope, model, dict(totals)) for (scope, model), totals in self._totals.items()]
+        result: Dict[str, Any] = {}
+        for scope, model, totals in sorted(items):
+            entry = result.setdefault(scope, {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "models": {},
+            })
+            for name, value in totals.items():
+                entry[name] += value
+            entry["models"][model] = {**totals, "cache_hit_rate": _rate(totals)}
+        for entry in result.values():
+            entry["cache_hit_rate"] = _rate(entry)
+        return result
+
+
+def _rate(totals: Dict[str, Any]) -> float:
+    return round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+
+
+_usage_metrics = UsageMetrics()
+
+
+def record_usage(scope: str, model: str, usage: Any) -> None:
+    """
+    记录一次 LLM 调用的 token 用量
+
+    :param scope: 调用场景（如 note / title / agent）
+    :param model: 模型名称
+    :param usage: 供应商返回的 usage（格式见模块说明）
+    """
+    _usage_metrics.record(scope, model, usage)
+
+
+def usage_stats() -> Dict[str, Any]:
+    return _usage_metrics.stats()
@@ -15,4 +15,5 @@ class GPTSource:
     extras: Optional[str] = None
     _format: Optional[list] = None
     video_img_urls:  Optional[list] = None
+    use_cache: bool = True  # 是否使用 LLM 响应缓存
 
@@ -1,5 +1,6 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
 
 from app.models.audio_model import AudioDownloadResult
 from app.models.transcriber_model import TranscriptResult
@@ -9,4 +10,12 @@ from app.models.transcriber_model import TranscriptResult
 class NoteResult:
     markdown: str                  # GPT 总结的 Markdown 内容
     transcript: TranscriptResult                # Whisper 转写结果
-    audio_meta: AudioDownloadResult  # 音频下载的元信息（title、duration、封面等）
\ No newline at end of file
+    audio_meta: AudioDownloadResult  # 音频下载的元信息（title、duration、封面等）
+
+
+@dataclass
+class NoteTaskContext:
+    """单次笔记生成任务的可变状态，随任务传递，使同一个 NoteGenerator 可以并发处理多个任务"""
+    task_id: Optional[str] = None
+    video_path: Optional[Path] = None              # 下载的视频文件路径（截图/视频理解时使用）
+    video_img_urls: List[str] = field(default_factory=list)  # 视频缩略图网格（视频理解时使用）
\ No newline at end of file
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.task_status import FINAL_STATUSES, get_task_status_store
+from app.utils.blocking_pool import run_blocking
+from app.utils.response import ResponseWrapper as R
+
+router = APIRouter()
+
+# SSE 心跳间隔（秒），防止代理在长时间无状态变化时断开连接
+SSE_HEARTBEAT_SECONDS = 15
+# 没有推送时读取数据库状态的间隔（秒）：其他进程（Celery worker）中的状态更新不会推送到本进程
+SSE_POLL_SECONDS = 3
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/task_status/{task_id}")
+def get_task_status(task_id: str):
+    """
+    查询笔记生成任务的当前状态
+
+    Args:
+        task_id: 任务ID
+
+    Returns:
+        成功响应，包含 status / message / updated_at
+    """
+    record = get_task_status_store().get(task_id)
+    if not record:
+        return R.error(msg="任务不存在", code=404)
+    return R.success(data=record)
+
+
+@router.get("/task_status/{task_id}/events")
+async def stream_task_status(task_id: str, request: Request):
+    """
+    以 Server-Sent Events 推送任务状态变化，任务完成（SUCCESS / FAILED）后结束
+
+    本进程内的状态更新通过订阅队列实时推送；没有推送时每 SSE_POLL_SECONDS 秒读取一次数据库，
+    以获得 Celery worker 等其他进程写回的状态
+
+    事件格式：event: status，data 为状态记录 JSON
+    """
+    store = get_task_status_store()
+    # 先订阅再读取当前状态，避免两者之间的状态变化丢失
+    queue = store.subscribe(task_id)
+
+    async def event_stream():
+        last: Optional[tuple] = None
+        last_sent = time.monotonic()
+        try:
+            current = store.get(task_id)
+            if current:
+                yield _sse("status", current)
+                last = (current["status"], current.get("message"))
+                if current["status"] in FINAL_STATUSES:
+                    return
+            while True:
+                if await request.is_disconnected():
+                    return
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout=SSE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    record = await run_blocking(store.get_persisted, task_id)
+                    if not record or (record["status"], record.get("message")) == last:
+                        if time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                            last_sent = time.monotonic()
+                            yield ": heartbeat\n\n"
+                        continue
+                yield _sse("status", record)
+                last = (record["status"], record.get("message"))
+                last_sent = time.monotonic()
+                if record["status"] in FINAL_STATUSES:
+                    return
+        finally:
+            store.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
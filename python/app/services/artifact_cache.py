@@ -0,0 +1,248 @@
+"""
+视频产物缓存（内容寻址）
+
+按 (platform, video_id) 持久化保存音频元信息、转写结果和单视频笔记，
+转写结果额外以转写器/模型区分，笔记额外以模型、提示词版本和笔记选项区分。
+这样不同请求、不同用户查询同一视频时可以直接命中缓存，跳过下载、转写和 LLM 调用。
+
+目录结构：
+    {ARTIFACT_CACHE_DIR}/{platform}/{video_id}/
+        audio.json                   音频元信息（AudioDownloadResult）
+        transcript_{key}.json        转写结果（TranscriptResult）
+        note_{key}.md                单视频笔记 Markdown
+
+淘汰策略：
+    - 每次命中或写入都会刷新视频目录的访问时间（mtime）
+    - 超过 ARTIFACT_CACHE_TTL_DAYS 未访问的视频目录会被删除
+    - 视频目录数量超过 ARTIFACT_CACHE_MAX_VIDEOS 时按最近最少使用（LRU）删除
+    - 删除视频目录时一并删除其音频元信息指向的音频、视频文件和 ASR 转码产物，使淘汰策略同时约束磁盘占用
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.models.audio_model import AudioDownloadResult
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+ARTIFACT_CACHE_DIR = Path(
+    os.getenv("ARTIFACT_CACHE_DIR", os.path.join(os.getenv("NOTE_OUTPUT_DIR", "note_results"), "artifacts"))
+)
+ARTIFACT_CACHE_MAX_VIDEOS = int(os.getenv("ARTIFACT_CACHE_MAX_VIDEOS", "500"))
+ARTIFACT_CACHE_TTL_DAYS = float(os.getenv("ARTIFACT_CACHE_TTL_DAYS", "30"))
+# 两次淘汰扫描之间的最小间隔（秒），避免每次写入都遍历缓存目录
+EVICTION_INTERVAL_SECONDS = 60
+
+
+def make_cache_key(**parts: Any) -> str:
+    """
+    将若干参数（模型、提示词版本、笔记选项等）组合为稳定的短哈希，用作缓存文件名的一部分
+
+    :param parts: 参与计算的键值对，值需可被 JSON 序列化
+    :return: 16 位十六进制字符串
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class VideoArtifactCache:
+    """
+    以 (platform, video_id) 为主键的视频产物缓存，线程安全
+    """
+
+    def __init__(
+        self,
+        root: Path = ARTIFACT_CACHE_DIR,
+        max_videos: int = ARTIFACT_CACHE_MAX_VIDEOS,
+        ttl_days: float = ARTIFACT_CACHE_TTL_DAYS,
+    ):
+        self.root = Path(root)
+        self.max_videos = max_videos
+        self.ttl_seconds = ttl_days * 24 * 3600 if ttl_days > 0 else 0
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ---------------- 音频元信息 ----------------
+
+    def get_audio(self, platform: str, video_id: str, require_file: bool = True) -> Optional[AudioDownloadResult]:
+        """
+        读取音频元信息缓存；若记录的音频文件已被删除，视为未命中
+
+        :param require_file: 为 False 时只读取元信息，不检查音频文件是否存在（如音频在其他 worker 机器上）
+        """
+        data = self._read_json(self._video_dir(platform, video_id) / "audio.json")
+        if not data:
+            return None
+        try:
+            audio = AudioDownloadResult(**data)
+        except TypeError as e:
+            logger.warning(f"音频缓存格式无效 ({platform}/{video_id})：{e}")
+            return None
+        if require_file and (not audio.file_path or not os.path.exists(audio.file_path)):
+            logger.info(f"音频缓存对应的文件已不存在 ({audio.file_path})，忽略缓存")
+            return None
+        self._touch(platform, video_id)
+        return audio
+
+    def put_audio(self, platform: str, video_id: str, audio: AudioDownloadResult) -> None:
+        self._write_json(self._video_dir(platform, video_id) / "audio.json", asdict(audio))
+
+    # ---------------- 转写结果 ----------------
+
+    def get_transcript(self, platform: str, video_id: str, key: str) -> Optional[TranscriptResult]:
+        data = self._read_json(self._video_dir(platform, video_id) / f"transcript_{key}.json")
+        if not data:
+            return None
+        try:
+            segments = [TranscriptSegment(**seg) for seg in data.get("segments", [])]
+            transcript = TranscriptResult(
+                language=data.get("language"),
+                full_text=data["full_text"],
+                segments=segments,
+                raw=data.get("raw"),
+            )
+        except (KeyError, TypeError) as e:
+            logger.warning(f"转写缓存格式无效 ({platform}/{video_id})：{e}")
+            return None
+        self._touch(platform, video_id)
+        return transcript
+
+    def put_transcript(self, platform: str, video_id: str, key: str, transcript: TranscriptResult) -> None:
+        self._write_json(self._video_dir(platform, video_id) / f"transcript_{key}.json", asdict(transcript))
+
+    # ---------------- 单视频笔记 ----------------
+
+    def get_note(self, platform: str, video_id: str, key: str) -> Optional[str]:
+        path = self._video_dir(platform, video_id) / f"note_{key}.md"
+        if not path.exists():
+            return None
+        try:
+            markdown = path.read_text(encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"读取笔记缓存失败 ({path})：{e}")
+            return None
+        self._touch(platform, video_id)
+        return markdown
+
+    def put_note(self, platform: str, video_id: str, key: str, markdown: str) -> None:
+        self._write_text(self._video_dir(platform, video_id) / f"note_{key}.md", markdown)
+
+    # ---------------- 淘汰 ----------------
+
+    def evict(self, force: bool = False) -> int:
+        """
+        执行一次淘汰：先删除超过 TTL 的视频目录，再按 LRU 删除超出数量上限的目录
+
+        :param force: 为 True 时忽略扫描间隔限制
+        :return: 删除的视频目录数量
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_eviction < EVICTION_INTERVAL_SECONDS:
+                return 0
+            self._last_eviction = now
+
+        entries = []
+        for platform_dir in self.root.iterdir() if self.root.exists() else []:
+            if not platform_dir.is_dir():
+                continue
+            for video_dir in platform_dir.iterdir():
+                if video_dir.is_dir():
+                    try:
+                        entries.append((video_dir.stat().st_mtime, video_dir))
+                    except OSError:
+                        continue
+
+        expired = [d for mtime, d in entries if self.ttl_seconds and now - mtime > self.ttl_seconds]
+        remaining = sorted((e for e in entries if e[1] not in expired), key=lambda e: e[0])
+        overflow = len(remaining) - self.max_videos if self.max_videos > 0 else 0
+        victims = expired + [d for _, d in remaining[:max(overflow, 0)]]
+
+        for video_dir in victims:
+            self._remove_media(video_dir)
+            shutil.rmtree(video_dir, ignore_errors=True)
+        if victims:
+            logger.info(f"产物缓存淘汰 {len(victims)} 个视频目录（过期 {len(expired)}，超限 {len(victims) - len(expired)}）")
+        return len(victims)
+
+    # ---------------- 内部方法 ----------------
+
+    def _remove_media(self, video_dir: Path) -> None:
+        """删除视频目录中 audio.json 指向的音频、视频文件，以及音频旁的 ASR 转码产物（{stem}.asr.*）"""
+        data = self._read_json(video_dir / "audio.json") or {}
+        paths = [data.get("file_path"), data.get("video_path")]
+        if data.get("file_path"):
+            audio_path = Path(data["file_path"])
+            paths.extend(str(p) for p in audio_path.parent.glob(f"{audio_path.stem}.asr.*"))
+        for path in filter(None, paths):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"删除缓存媒体文件失败 ({path})：{e}")
+
+    def _video_dir(self, platform: str, video_id: str) -> Path:
+        safe_platform = "".join(c for c in platform if c.isalnum() or c in "-_") or "unknown"
+        safe_video_id = "".join(c for c in video_id if c.isalnum() or c in "-_") or "unknown"
+        return self.root / safe_platform / safe_video_id
+
+    def _touch(self, platform: str, video_id: str) -> None:
+        try:
+            os.utime(self._video_dir(platform, video_id))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取缓存失败 ({path})：{e}")
+            return None
+
+    def _write_json(self, path: Path, data: Dict[str, Any]) -> None:
+        self._write_text(path, json.dumps(data, ensure_ascii=False, default=str))
+
+    def _write_text(self, path: Path, text: str) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再原子替换，避免并发读取到写了一半的文件
+            temp_file = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            temp_file.write_text(text, encoding="utf-8")
+            temp_file.replace(path)
+            os.utime(path.parent)
+        except OSError as e:
+            logger.error(f"写入缓存失败 ({path})：{e}")
+            return
+        self.evict()
+
+
+_artifact_cache: Optional[VideoArtifactCache] = None
+_artifact_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> VideoArtifactCache:
+    """获取进程内共享的产物缓存实例（单例）"""
+    global _artifact_cache
+    if _artifact_cache is None:
+        with _artifact_cache_lock:
+            if _artifact_cache is None:
+                _artifact_cache = VideoArtifactCache()
+    return _artifact_cache
@@ -0,0 +1,162 @@
+"""
+供应商 / 模型配置缓存（进程内）
+
+笔记、总结、对话和标题生成的每一步都要查询供应商和模型配置，这些数据很少变化，
+因此在进程内缓存一份快照，读取时不再访问 SQLite：
+    - 应用启动时加载一次，之后超过 CONFIG_CACHE_TTL 秒自动重新加载
+    - ProviderService / ModelService 写入供应商或模型后立即失效
+    - 多个 worker 进程通过时间戳文件同步：任一进程失效缓存时更新该文件，
+      其他进程读取时发现文件修改时间变化即重新加载
+
+配置（环境变量）：
+    CONFIG_CACHE_TTL          缓存有效期（秒，默认 300，0 表示不缓存）
+    CONFIG_CACHE_SYNC         是否通过时间戳文件在多进程间同步失效（默认 true）
+    CONFIG_CACHE_STAMP_FILE   时间戳文件路径（默认 {DATA_DIR}/config_cache.stamp）
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_data_dir
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "300"))
+CONFIG_CACHE_SYNC = os.getenv("CONFIG_CACHE_SYNC", "true").lower() in ("1", "true", "yes")
+CONFIG_CACHE_STAMP_FILE = os.getenv("CONFIG_CACHE_STAMP_FILE") or os.path.join(get_data_dir(), "config_cache.stamp")
+
+
+@dataclass
+class _Snapshot:
+    providers: Dict[str, dict] = field(default_factory=dict)   # provider_id -> 供应商配置（含 api_key）
+    models: List[dict] = field(default_factory=list)           # [{id, provider_id, model_name}]，按 id 排序
+    loaded_at: float = 0.0
+    stamp: Optional[float] = None                              # 加载时时间戳文件的修改时间
+
+
+class ConfigCache:
+    def __init__(self, ttl: float = CONFIG_CACHE_TTL, stamp_file: Optional[str] = None):
+        self.ttl = ttl
+        self.stamp_file = stamp_file if stamp_file is not None else (CONFIG_CACHE_STAMP_FILE if CONFIG_CACHE_SYNC else None)
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def _read_stamp(self) -> Optional[float]:
+        if not self.stamp_file:
+            return None
+        try:
+            return os.stat(self.stamp_file).st_mtime
+        except OSError:
+            return None
+
+    def _is_fresh(self, snapshot: Optional[_Snapshot]) -> bool:
+        if snapshot is None or time.monotonic() - snapshot.loaded_at >= self.ttl:
+            return False
+        return snapshot.stamp == self._read_stamp()
+
+    @staticmethod
+    def _load() -> _Snapshot:
+        # 延迟导入：ProviderService 本身依赖本模块
+        from app.db.model_dao import get_all_models
+        from app.db.provider_dao import get_all_providers
+        from app.services.provider import ProviderService
+
+        providers = {}
+        for row in get_all_providers() or []:
+            provider = ProviderService.serialize_provider(row)
+            providers[provider["id"]] = provider
+        models = sorted(get_all_models(), key=lambda m: m["id"])
+        return _Snapshot(providers=providers, models=models)
+
+    def _get(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self.hits += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot
+            return self._reload()
+
+    def _reload(self) -> _Snapshot:
+        # 先读时间戳再查库，加载期间发生的失效会在下次读取时再次触发加载
+        stamp = self._read_stamp()
+        snapshot = self._load()
+        snapshot.stamp = stamp
+        snapshot.loaded_at = time.monotonic()
+        self._snapshot = snapshot
+        self.loads += 1
+        return snapshot
+
+    def refresh(self) -> None:
+        """立即从数据库重新加载（应用启动时调用）"""
+        with self._lock:
+            snapshot = self._reload()
+        logger.info(f"配置缓存已加载：{len(snapshot.providers)} 个供应商，{len(snapshot.models)} 个模型")
+
+    def invalidate(self) -> None:
+        """供应商或模型写入后调用：丢弃本进程缓存，并通知其他进程"""
+        with self._lock:
+            self._snapshot = None
+            self.invalidations += 1
+        if self.stamp_file:
+            try:
+                os.makedirs(os.path.dirname(self.stamp_file) or ".", exist_ok=True)
+                with open(self.stamp_file, "w", encoding="utf-8") as f:
+                    f.write(str(time.time()))
+            except OSError as e:
+                logger.warning(f"更新配置缓存时间戳文件失败: {e}")
+
+    def get_provider(self, provider_id: str) -> Optional[dict]:
+        provider = self._get().providers.get(provider_id)
+        return dict(provider) if provider else None
+
+    def get_providers(self) -> List[dict]:
+        return [dict(p) for p in self._get().providers.values()]
+
+    def get_enabled_providers(self) -> List[dict]:
+        return [dict(p) for p in self._get().providers.values() if p.get("enabled") == 1]
+
+    def get_models(self, provider_id: Optional[str] = None) -> List[dict]:
+        models = self._get().models
+        if provider_id is not None:
+            models = [m for m in models if str(m["provider_id"]) == str(provider_id)]
+        return [dict(m) for m in models]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "providers": len(snapshot.providers) if snapshot else 0,
+            "models": len(snapshot.models) if snapshot else 0,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "hits": self.hits,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+
+_config_cache: Optional[ConfigCache] = None
+_config_cache_lock = threading.Lock()
+
+
+def get_config_cache() -> ConfigCache:
+    """获取进程内共享的配置缓存"""
+    global _config_cache
+    if _config_cache is None:
+        with _config_cache_lock:
+            if _config_cache is None:
+                _config_cache = ConfigCache()
+    return _config_cache
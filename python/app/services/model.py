@@ -7,6 +7,7 @@ from app.exceptions.provider import ProviderError
 from app.gpt.gpt_factory import GPTFactory
 from app.gpt.provider.OpenAI_compatible_provider import OpenAICompatibleProvider
 from app.models.model_config import ModelConfig
+from app.services.config_cache import get_config_cache
 from app.services.provider import ProviderService
 from app.utils.logger import get_logger
 
@@ -76,9 +77,11 @@ class ModelService:
         return formatted
     @staticmethod
     def get_enabled_models_by_provider( provider_id: str|int,):
-        from app.db.model_dao import get_models_by_provider
-
-        all_models = get_models_by_provider(provider_id)
+        # 模型列表读取走进程内配置缓存，新增/删除模型时失效
+        all_models = [
+            {"id": m["id"], "model_name": m["model_name"]}
+            for m in get_config_cache().get_models(provider_id)
+        ]
         enabled_models = all_models
         return enabled_models
     @staticmethod
@@ -124,6 +127,7 @@ class ModelService:
     def delete_model_by_id( model_id: int) -> bool:
         try:
             delete_model(model_id)
+            get_config_cache().invalidate()
             return True
         except Exception as e:
             print(f"[{model_id}] <UNK>: {e}")
@@ -145,6 +149,7 @@ class ModelService:
 
             # 插入模型
             insert_model(provider_id=provider_id, model_name=model_name)
+            get_config_cache().invalidate()
             print(f"模型 {model_name} 已成功添加到供应商ID {provider_id}")
             return True
         except Exception as e:
@@ -2,7 +2,7 @@ import json
 import logging
 import os
 import re
-from dataclasses import asdict
+import threading
 from pathlib import Path
 from typing import List, Optional, Tuple, Union, Any
 
@@ -23,14 +23,22 @@ from app.gpt.gpt_factory import GPTFactory
 from app.models.audio_model import AudioDownloadResult
 from app.models.gpt_model import GPTSource
 from app.models.model_config import ModelConfig
-from app.models.notes_model import AudioDownloadResult, NoteResult
-from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.models.notes_model import AudioDownloadResult, NoteResult, NoteTaskContext
+from app.models.transcriber_model import TranscriptResult
+from app.gpt.prompt import PROMPT_VERSION
+from app.services.artifact_cache import VideoArtifactCache, get_artifact_cache, make_cache_key
 from app.services.constant import SUPPORT_PLATFORM_MAP
+from app.services.note_config import NotePipelineConfig, get_note_config
 from app.services.provider import ProviderService
+from app.services.task_status import get_task_status_store
 from app.transcriber.base import Transcriber
-from app.transcriber.transcriber_provider import get_transcriber, _transcribers
+from app.transcriber.chunking import ChunkedTranscriber
+from app.transcriber.transcriber_provider import get_transcriber
 from app.utils.note_helper import replace_content_markers
+from app.utils.blocking_pool import run_blocking
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
 from app.utils.status_code import StatusCode
+from app.utils.url_parser import extract_video_id
 from app.utils.video_helper import generate_screenshot
 from app.utils.video_reader import VideoReader
 
@@ -44,7 +52,7 @@ API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost")
 BACKEND_PORT = os.getenv("BACKEND_PORT", "8483")
 BACKEND_BASE_URL = f"{API_BASE_URL}:{BACKEND_PORT}"
 
-# 输出目录（用于缓存音频、转写、Markdown 文件，以及存储截图）
+# 输出目录（产物缓存默认位于其下的 artifacts 子目录）
 NOTE_OUTPUT_DIR = Path(os.getenv("NOTE_OUTPUT_DIR", "note_results"))
 NOTE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 IMAGE_OUTPUT_DIR = os.getenv("OUT_DIR", "./static/screenshots")
@@ -55,28 +63,27 @@ IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/static/screenshots")
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# 进程级笔记生成去重注册表：并发请求同一视频时共享同一次下载、转写和 GPT 调用
+note_flight = SingleFlight("note_generation")
+# 异步流程（agenerate）使用的去重注册表，作用于同一事件循环内的协程
+note_async_flight = AsyncSingleFlight("note_generation_async")
+
 
 class NoteGenerator:
     """
     NoteGenerator 用于执行视频/音频下载、转写、GPT 生成笔记、插入截图/链接、
     以及将任务信息写入状态文件与数据库等功能。
+
+    实例本身只保存只读的配置和转写器，单个任务的可变状态放在 NoteTaskContext 中，
+    因此同一个实例可以被多个线程/协程并发使用（见 get_note_generator）。
     """
 
-    def __init__(self):
+    def __init__(self, config: Optional[NotePipelineConfig] = None):
         self.model_size: str = "base"
         self.device: Optional[str] = None
-        # 强制使用 Groq 转录器（忽略环境变量中的旧值）
-        transcriber_type_env = os.getenv("TRANSCRIBER_TYPE", "groq")
-        # 如果环境变量设置为旧的 whisper 类型，强制使用 groq
-        if transcriber_type_env in ["fast-whisper", "mlx-whisper", "whisper"]:
-            logger.warning(f"检测到旧的转录器类型 '{transcriber_type_env}'，已自动切换为 'groq'")
-            self.transcriber_type = "groq"
-            os.environ["TRANSCRIBER_TYPE"] = "groq"  # 更新环境变量
-        else:
-            self.transcriber_type = transcriber_type_env if transcriber_type_env == "groq" else "groq"
+        self.config: NotePipelineConfig = config or get_note_config()
+        self.transcriber_type = self.config.transcriber_type
         self.transcriber: Transcriber = self._init_transcriber()
-        self.video_path: Optional[Path] = None
-        self.video_img_urls=[]
         logger.info("NoteGenerator 初始化完成")
 
 
@@ -106,7 +113,7 @@ class NoteGenerator:
         :param video_url: 视频或音频链接
         :param platform: 平台名称，对应 SUPPORT_PLATFORM_MAP 中的键
         :param quality: 下载音频的质量枚举
-        :param task_id: 用于标识本次任务的唯一 ID，亦用于状态文件和缓存文件命名
+        :param task_id: 用于标识本次任务的唯一 ID，用于状态文件和数据库记录
         :param model_name: GPT 模型名称
         :param provider_id: 模型供应商 ID
         :param link: 是否在笔记中插入视频片段链接
@@ -120,6 +127,162 @@ class NoteGenerator:
         :param grid_size: 生成缩略图时的网格大小，如 [3, 3]
         :return: NoteResult 对象，包含 markdown 文本、转写结果和音频元信息
         """
+        # 同一视频 + 相同笔记选项的并发请求只执行一次，后到的调用者直接等待执行中的结果
+        flight_key = self._flight_key(
+            video_url=video_url,
+            platform=platform,
+            quality=quality,
+            model_name=model_name,
+            provider_id=provider_id,
+            link=link,
+            screenshot=screenshot,
+            _format=_format,
+            style=style,
+            extras=extras,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size,
+        )
+        note_result, shared = note_flight.do(
+            flight_key,
+            self._generate,
+            video_url=video_url,
+            platform=platform,
+            quality=quality,
+            task_id=task_id,
+            model_name=model_name,
+            provider_id=provider_id,
+            link=link,
+            screenshot=screenshot,
+            _format=_format,
+            style=style,
+            extras=extras,
+            output_path=output_path,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size,
+        )
+        if shared:
+            logger.info(f"复用并发请求的笔记结果 (task_id={task_id}, key={flight_key})")
+            if note_result:
+                self._save_metadata(video_id=note_result.audio_meta.video_id, platform=platform, task_id=task_id)
+                self._update_status(task_id, TaskStatus.SUCCESS)
+            else:
+                self._update_status(task_id, TaskStatus.FAILED, message="共享的笔记生成任务失败")
+        return note_result
+
+    async def agenerate(
+        self,
+        video_url: Union[str, HttpUrl],
+        platform: str,
+        quality: DownloadQuality = DownloadQuality.medium,
+        task_id: Optional[str] = None,
+        model_name: Optional[str] = None,
+        provider_id: Optional[str] = None,
+        link: bool = False,
+        screenshot: bool = False,
+        _format: Optional[List[str]] = None,
+        style: Optional[str] = None,
+        extras: Optional[str] = None,
+        output_path: Optional[str] = None,
+        video_understanding: bool = False,
+        video_interval: int = 0,
+        grid_size: Optional[List[int]] = None,
+    ) -> NoteResult | None:
+        """
+        generate 的异步版本，参数与返回值相同。
+
+        转写和 GPT 总结通过共享连接池的 AsyncOpenAI 客户端直接在事件循环中执行；
+        yt-dlp 下载、ffmpeg 处理和数据库读写在有界的阻塞任务线程池中执行。
+        """
+        flight_key = self._flight_key(
+            video_url=video_url,
+            platform=platform,
+            quality=quality,
+            model_name=model_name,
+            provider_id=provider_id,
+            link=link,
+            screenshot=screenshot,
+            _format=_format,
+            style=style,
+            extras=extras,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size,
+        )
+        note_result, shared = await note_async_flight.do(
+            flight_key,
+            self._agenerate,
+            video_url=video_url,
+            platform=platform,
+            quality=quality,
+            task_id=task_id,
+            model_name=model_name,
+            provider_id=provider_id,
+            link=link,
+            screenshot=screenshot,
+            _format=_format,
+            style=style,
+            extras=extras,
+            output_path=output_path,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size,
+        )
+        if shared:
+            logger.info(f"复用并发请求的笔记结果 (task_id={task_id}, key={flight_key})")
+            if note_result:
+                await run_blocking(
+                    self._save_metadata, video_id=note_result.audio_meta.video_id, platform=platform, task_id=task_id
+                )
+                self._update_status(task_id, TaskStatus.SUCCESS)
+            else:
+                self._update_status(task_id, TaskStatus.FAILED, message="共享的笔记生成任务失败")
+        return note_result
+
+    @staticmethod
+    def delete_note(video_id: str, platform: str) -> int:
+        """
+        删除数据库中对应 video_id 与 platform 的任务记录
+
+        :param video_id: 视频 ID
+        :param platform: 平台标识
+        :return: 删除的记录数
+        """
+        logger.info(f"删除笔记记录 (video_id={video_id}, platform={platform})")
+        return delete_task_by_video(video_id, platform)
+
+    # ---------------- 私有方法 ----------------
+
+    @staticmethod
+    def _flight_key(video_url: Union[str, HttpUrl], platform: str, **options) -> str:
+        """
+        计算 single-flight 去重键：platform + video_id（无法解析时退化为原始链接）+ 笔记选项
+        """
+        video_id = extract_video_id(str(video_url), platform) or str(video_url)
+        return f"{platform}:{video_id}:{make_cache_key(**options)}"
+
+    def _generate(
+        self,
+        video_url: Union[str, HttpUrl],
+        platform: str,
+        quality: DownloadQuality = DownloadQuality.medium,
+        task_id: Optional[str] = None,
+        model_name: Optional[str] = None,
+        provider_id: Optional[str] = None,
+        link: bool = False,
+        screenshot: bool = False,
+        _format: Optional[List[str]] = None,
+        style: Optional[str] = None,
+        extras: Optional[str] = None,
+        output_path: Optional[str] = None,
+        video_understanding: bool = False,
+        video_interval: int = 0,
+        grid_size: Optional[List[int]] = None,
+    ) -> NoteResult | None:
+        """
+        实际执行笔记生成流程（不做并发去重），参数与返回值同 generate
+        """
         if grid_size is None:
             grid_size = []
 
@@ -128,21 +291,24 @@ class NoteGenerator:
             self._update_status(task_id, TaskStatus.PARSING)
 
             # 获取下载器与 GPT 实例
-
             downloader = self._get_downloader(platform)
+            model_name, provider_id = self._resolve_model_config(model_name, provider_id)
             gpt = self._get_gpt(model_name, provider_id)
 
-            # 缓存文件路径
-            audio_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_audio.json"
-            transcript_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_transcript.json"
-            markdown_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_markdown.md"
-            print(audio_cache_file)
+            # 产物缓存以 (platform, video_id) 为键，跨请求复用音频、转写和笔记；
+            # 无法从链接解析出 video_id 时，下载完成后再以实际 video_id 写入缓存
+            cache = get_artifact_cache()
+            video_id = extract_video_id(str(video_url), platform)
+            ctx = NoteTaskContext(task_id=task_id)
+
             # 1. 下载音频/视频
             audio_meta = self._download_media(
                 downloader=downloader,
                 video_url=video_url,
                 quality=quality,
-                audio_cache_file=audio_cache_file,
+                cache=cache,
+                video_id=video_id,
+                ctx=ctx,
                 status_phase=TaskStatus.DOWNLOADING,
                 platform=platform,
                 output_path=output_path,
@@ -154,30 +320,46 @@ class NoteGenerator:
 
             # 2. 转写文字
             transcript = self._transcribe_audio(
-                audio_file=audio_meta.file_path,
-                transcript_cache_file=transcript_cache_file,
+                audio_meta=audio_meta,
+                cache=cache,
+                task_id=task_id,
                 status_phase=TaskStatus.TRANSCRIBING,
             )
 
             # 3. GPT 总结
+            note_key = self._note_cache_key(
+                model_name=model_name,
+                provider_id=provider_id,
+                transcript=transcript,
+                link=link,
+                screenshot=screenshot,
+                formats=_format or [],
+                style=style,
+                extras=extras,
+                video_understanding=video_understanding,
+                video_interval=video_interval,
+                grid_size=grid_size,
+            )
             markdown = self._summarize_text(
                 audio_meta=audio_meta,
                 transcript=transcript,
                 gpt=gpt,
-                markdown_cache_file=markdown_cache_file,
+                cache=cache,
+                note_key=note_key,
+                task_id=task_id,
                 link=link,
                 screenshot=screenshot,
                 formats=_format or [],
                 style=style,
                 extras=extras,
-                video_img_urls=self.video_img_urls,
+                video_img_urls=ctx.video_img_urls,
             )
 
             # 4. 截图 & 链接替换
             if _format:
                 markdown = self._post_process_markdown(
                     markdown=markdown,
-                    video_path=self.video_path,
+                    video_path=ctx.video_path,
                     formats=_format,
                     audio_meta=audio_meta,
                     platform=platform,
@@ -197,39 +379,184 @@ class NoteGenerator:
             self._update_status(task_id, TaskStatus.FAILED, message=str(exc))
             return None
 
-    @staticmethod
-    def delete_note(video_id: str, platform: str) -> int:
+    async def _agenerate(
+        self,
+        video_url: Union[str, HttpUrl],
+        platform: str,
+        quality: DownloadQuality = DownloadQuality.medium,
+        task_id: Optional[str] = None,
+        model_name: Optional[str] = None,
+        provider_id: Optional[str] = None,
+        link: bool = False,
+        screenshot: bool = False,
+        _format: Optional[List[str]] = None,
+        style: Optional[str] = None,
+        extras: Optional[str] = None,
+        output_path: Optional[str] = None,
+        video_understanding: bool = False,
+        video_interval: int = 0,
+        grid_size: Optional[List[int]] = None,
+    ) -> NoteResult | None:
         """
-        删除数据库中对应 video_id 与 platform 的任务记录
-
-        :param video_id: 视频 ID
-        :param platform: 平台标识
-        :return: 删除的记录数
+        实际执行异步笔记生成流程（不做并发去重），步骤与 _generate 相同
         """
-        logger.info(f"删除笔记记录 (video_id={video_id}, platform={platform})")
-        return delete_task_by_video(video_id, platform)
+        if grid_size is None:
+            grid_size = []
 
-    # ---------------- 私有方法 ----------------
+        try:
+            logger.info(f"开始生成笔记（异步） (task_id={task_id})")
+            self._update_status(task_id, TaskStatus.PARSING)
+
+            downloader = self._get_downloader(platform)
+            model_name, provider_id = await run_blocking(self._resolve_model_config, model_name, provider_id)
+            gpt = await run_blocking(self._get_gpt, model_name, provider_id)
+
+            cache = get_artifact_cache()
+            video_id = extract_video_id(str(video_url), platform)
+            ctx = NoteTaskContext(task_id=task_id)
+
+            # 1. 下载音频/视频（yt-dlp + ffmpeg，阻塞任务线程池）
+            audio_meta = await run_blocking(
+                self._download_media,
+                downloader=downloader,
+                video_url=video_url,
+                quality=quality,
+                cache=cache,
+                video_id=video_id,
+                ctx=ctx,
+                status_phase=TaskStatus.DOWNLOADING,
+                platform=platform,
+                output_path=output_path,
+                screenshot=screenshot,
+                video_understanding=video_understanding,
+                video_interval=video_interval,
+                grid_size=grid_size,
+            )
+
+            # 2. 转写文字（异步客户端）
+            transcript = await self._atranscribe_audio(
+                audio_meta=audio_meta,
+                cache=cache,
+                task_id=task_id,
+                status_phase=TaskStatus.TRANSCRIBING,
+            )
+
+            # 3. GPT 总结（异步客户端）
+            note_key = self._note_cache_key(
+                model_name=model_name,
+                provider_id=provider_id,
+                transcript=transcript,
+                link=link,
+                screenshot=screenshot,
+                formats=_format or [],
+                style=style,
+                extras=extras,
+                video_understanding=video_understanding,
+                video_interval=video_interval,
+                grid_size=grid_size,
+            )
+            markdown = await self._asummarize_text(
+                audio_meta=audio_meta,
+                transcript=transcript,
+                gpt=gpt,
+                cache=cache,
+                note_key=note_key,
+                task_id=task_id,
+                link=link,
+                screenshot=screenshot,
+                formats=_format or [],
+                style=style,
+                extras=extras,
+                video_img_urls=ctx.video_img_urls,
+            )
+
+            # 4. 截图 & 链接替换（ffmpeg 截图，阻塞任务线程池）
+            if _format:
+                markdown = await run_blocking(
+                    self._post_process_markdown,
+                    markdown=markdown,
+                    video_path=ctx.video_path,
+                    formats=_format,
+                    audio_meta=audio_meta,
+                    platform=platform,
+                )
+
+            # 5. 保存记录到数据库
+            self._update_status(task_id, TaskStatus.SAVING)
+            await run_blocking(self._save_metadata, video_id=audio_meta.video_id, platform=platform, task_id=task_id)
+
+            # 6. 完成
+            self._update_status(task_id, TaskStatus.SUCCESS)
+            logger.info(f"笔记生成成功（异步） (task_id={task_id})")
+            return NoteResult(markdown=markdown, transcript=transcript, audio_meta=audio_meta)
+
+        except Exception as exc:
+            logger.error(f"生成笔记流程异常 (task_id={task_id})：{exc}", exc_info=True)
+            self._update_status(task_id, TaskStatus.FAILED, message=str(exc))
+            return None
 
     def _init_transcriber(self) -> Transcriber:
         """
-        根据环境变量 TRANSCRIBER_TYPE 动态获取并实例化转写器
+        根据环境变量 TRANSCRIBER_TYPE 动态获取并实例化转写器；
+        配置了 TRANSCRIBE_CHUNK_SECONDS 时，长音频切分为重叠分片并发转写
         """
         try:
             logger.info(f"使用转写器：{self.transcriber_type}")
-            return get_transcriber(transcriber_type=self.transcriber_type)
+            transcriber = get_transcriber(transcriber_type=self.transcriber_type)
+            # 离线替身按音频文件名读取夹具，不做分片
+            if self.config.transcribe_chunk_seconds > 0 and self.transcriber_type != "fixture":
+                transcriber = ChunkedTranscriber(
+                    transcriber,
+                    chunk_seconds=self.config.transcribe_chunk_seconds,
+                    overlap_seconds=self.config.transcribe_chunk_overlap,
+                    max_workers=self.config.transcribe_chunk_workers,
+                )
+            return transcriber
         except Exception as e:
             logger.error(f"初始化转写器失败：{self.transcriber_type}, 错误: {str(e)}")
             raise Exception(f"不支持的转写器：{self.transcriber_type}。错误: {str(e)}")
 
-    def _get_gpt(self, model_name: Optional[str], provider_id: Optional[str]) -> GPT:
+    def _transcript_cache_key(self, transcriber_type: Optional[str] = None) -> str:
         """
-        根据 provider_id 获取对应的 GPT 实例
+        转写缓存键：同一视频在不同转写器/转写模型/分片参数下的结果分别缓存
+
+        :param transcriber_type: 实际完成转写的后端，默认为配置的转写器类型
+        """
+        transcriber_type = transcriber_type or self.transcriber_type
+        chunked = self.config.transcribe_chunk_seconds > 0 and self.transcriber_type != "fixture"
+        return make_cache_key(
+            transcriber=transcriber_type,
+            model=self.config.model_for_transcriber(transcriber_type),
+            chunk_seconds=self.config.transcribe_chunk_seconds if chunked else 0,
+            chunk_overlap=self.config.transcribe_chunk_overlap if chunked else 0,
+        )
+
+    def _transcript_key_for(self, transcript: TranscriptResult) -> str:
+        """转写结果的缓存键：auto 路由时按结果中记录的实际后端计算"""
+        if self.transcriber_type != "auto":
+            return self._transcript_cache_key()
+        return self._transcript_cache_key((transcript.raw or {}).get("transcriber") or "auto")
+
+    def _get_cached_transcript(
+        self, cache: VideoArtifactCache, platform: str, video_id: str
+    ) -> Optional[TranscriptResult]:
+        """查找转写缓存：auto 路由时依次尝试各候选后端的缓存键"""
+        if self.transcriber_type != "auto":
+            return cache.get_transcript(platform, video_id, self._transcript_cache_key())
+        for transcriber_type in (*self.config.transcriber_backends, "auto"):
+            cached = cache.get_transcript(platform, video_id, self._transcript_cache_key(transcriber_type))
+            if cached:
+                return cached
+        return None
+
+    @staticmethod
+    def _resolve_model_config(model_name: Optional[str], provider_id: Optional[str]) -> Tuple[str, str]:
+        """
+        补全模型配置：model_name 或 provider_id 缺失时使用默认配置（优先 qwen）
         :param model_name: GPT 模型名称
         :param provider_id: 供应商 ID
-        :return: GPT 实例
+        :return: (model_name, provider_id)
         """
-        # 如果 model_name 或 provider_id 为 None，使用默认配置（优先 qwen）
         if not model_name or not provider_id:
             try:
                 # 尝试从 agent.utils.config_helper 导入（如果可用）
@@ -255,7 +582,31 @@ class NoteGenerator:
                         code=ProviderErrorEnum.WRONG_PARAMETER.code,
                         message=f"模型配置缺失：model_name={model_name}, provider_id={provider_id}，且无法获取默认配置"
                     )
-        
+        return model_name, provider_id
+
+    def _note_cache_key(self, model_name: str, provider_id: str, transcript: TranscriptResult, **options) -> str:
+        """
+        笔记缓存键：同一视频在不同模型、提示词版本、转写来源、转写压缩 / 分段生成配置和笔记选项下的笔记分别缓存
+
+        :param transcript: 生成笔记所用的转写结果，按其转写缓存键区分（切换转写器后不会复用旧笔记）
+        """
+        return make_cache_key(
+            model_name=model_name,
+            provider_id=provider_id,
+            prompt_version=PROMPT_VERSION,
+            transcript_key=self._transcript_key_for(transcript),
+            **self.config.note_prompt_options(),
+            **options,
+        )
+
+    def _get_gpt(self, model_name: Optional[str], provider_id: Optional[str]) -> GPT:
+        """
+        根据 provider_id 获取对应的 GPT 实例
+        :param model_name: GPT 模型名称
+        :param provider_id: 供应商 ID
+        :return: GPT 实例
+        """
+        model_name, provider_id = self._resolve_model_config(model_name, provider_id)
         provider = ProviderService.get_provider_by_id(provider_id)
         if not provider:
             logger.error(f"[get_gpt] 未找到模型供应商: provider_id={provider_id}")
@@ -320,42 +671,13 @@ class NoteGenerator:
 
     def _update_status(self, task_id: Optional[str], status: Union[str, TaskStatus], message: Optional[str] = None):
         """
-        创建或更新 {task_id}.status.json，记录当前任务状态
+        更新任务状态：写入内存状态存储并推送给订阅者，由后台线程批量写回数据库
 
         :param task_id: 任务唯一 ID
         :param status: TaskStatus 枚举或自定义状态字符串
         :param message: 可选消息，用于记录失败原因等
         """
-        if not task_id:
-            return
-
-        NOTE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        status_file = NOTE_OUTPUT_DIR / f"{task_id}.status.json"
-        print(f"写入状态文件: {status_file} 当前状态: {status}")
-        data = {"status": status.value if isinstance(status, TaskStatus) else status}
-        if message:
-            data["message"] = message
-
-        try:
-            # First create a temporary file
-            temp_file = status_file.with_suffix('.tmp')
-
-            # Write to temporary file
-            with temp_file.open('w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-
-            # Atomic rename operation
-            temp_file.replace(status_file)
-
-            print(f"状态文件写入成功: {status_file}")
-        except Exception as e:
-            logger.error(f"写入状态文件失败 (task_id={task_id})：{e}")
-            # Try to write error to file directly as fallback
-            try:
-                with status_file.open('w', encoding='utf-8') as f:
-                    f.write(f"Error writing status: {str(e)}")
-            except:
-                logger.error(f"写入错误  {e}")
+        get_task_status_store().update(task_id, status, message)
 
     def _handle_exception(self, task_id, exc):
         logger.error(f"任务异常 (task_id={task_id})", exc_info=True)
@@ -372,7 +694,9 @@ class NoteGenerator:
         downloader: Downloader,
         video_url: Union[str, HttpUrl],
         quality: DownloadQuality,
-        audio_cache_file: Path,
+        cache: VideoArtifactCache,
+        video_id: Optional[str],
+        ctx: NoteTaskContext,
         status_phase: TaskStatus,
         platform: str,
         output_path: Optional[str],
@@ -382,14 +706,16 @@ class NoteGenerator:
         grid_size: List[int],
     ) -> AudioDownloadResult | None:
         """
-        1. 检查音频缓存；若不存在，则根据需要下载音频或视频（若需截图/可视化）。
-        2. 如果需要视频，则先下载视频并生成缩略图集，再下载音频。
+        1. 如果需要视频（截图/可视化），优先复用带本地视频的缓存，否则一次下载视频并在本地分离音轨，生成缩略图集。
+        2. 否则检查音频缓存；若不存在，则只下载音频。
         3. 返回 AudioDownloadResult
 
         :param downloader: Downloader 实例
         :param video_url: 视频/音频链接
         :param quality: 音频下载质量
-        :param audio_cache_file: 本地缓存 JSON 文件路径
+        :param cache: 视频产物缓存
+        :param video_id: 从链接解析出的视频 ID（无法解析时为 None，跳过缓存查找）
+        :param ctx: 任务上下文（提供 task_id，并记录下载的视频路径与缩略图）
         :param status_phase: 对应的状态枚举，如 TaskStatus.DOWNLOADING
         :param platform: 平台标识
         :param output_path: 下载输出目录（可为 None）
@@ -399,24 +725,34 @@ class NoteGenerator:
         :param grid_size: 缩略图网格尺寸
         :return: AudioDownloadResult 对象
         """
-        task_id = audio_cache_file.stem.split("_")[0]
+        task_id = ctx.task_id
         self._update_status(task_id, status_phase)
 
-
-
         # 判断是否需要下载视频
         need_video = screenshot or video_understanding
         if need_video:
+            # 已缓存且视频文件仍在本地时直接复用（只下载过音频的缓存没有 video_path，仍需下载视频）
+            cached_audio = cache.get_audio(platform, video_id) if video_id else None
+            if cached_audio and not (cached_audio.video_path and os.path.exists(cached_audio.video_path)):
+                cached_audio = None
             try:
-                logger.info("开始下载视频")
-                video_path_str = downloader.download_video(video_url)
-                self.video_path = Path(video_path_str)
-                logger.info(f"视频下载完成：{self.video_path}")
+                if cached_audio:
+                    logger.info(f"命中音视频缓存 ({platform}/{video_id})，跳过下载")
+                    audio = cached_audio
+                else:
+                    logger.info("开始下载视频（音频从视频中分离）")
+                    audio = downloader.download_media(
+                        video_url=video_url,
+                        output_dir=output_path,
+                        quality=quality,
+                    )
+                ctx.video_path = Path(audio.video_path)
+                logger.info(f"视频下载完成：{ctx.video_path}")
 
                 # 若指定了 grid_size，则生成缩略图
                 if grid_size:
-                    self.video_img_urls=VideoReader(
-                        video_path=str(self.video_path),
+                    ctx.video_img_urls = VideoReader(
+                        video_path=str(ctx.video_path),
                         grid_size=tuple(grid_size),
                         frame_interval=video_interval,
                         unit_width=1280,
@@ -430,14 +766,16 @@ class NoteGenerator:
 
                 self._handle_exception(task_id, exc)
                 raise
-        # 已有缓存，尝试加载
-        if audio_cache_file.exists():
-            logger.info(f"检测到音频缓存 ({audio_cache_file})，直接读取")
-            try:
-                data = json.loads(audio_cache_file.read_text(encoding="utf-8"))
-                return AudioDownloadResult(**data)
-            except Exception as e:
-                logger.warning(f"读取音频缓存失败，将重新下载：{e}")
+            if not cached_audio:
+                cache.put_audio(platform, audio.video_id, audio)
+                logger.info(f"音频已从视频分离并缓存 ({platform}/{audio.video_id})")
+            return audio
+        # 已有缓存，直接复用
+        if video_id:
+            cached_audio = cache.get_audio(platform, video_id)
+            if cached_audio:
+                logger.info(f"命中音频缓存 ({platform}/{video_id})，跳过下载")
+                return cached_audio
         # 下载音频
         try:
             logger.info("开始下载音频")
@@ -447,9 +785,9 @@ class NoteGenerator:
                 output_dir=output_path,
                 need_video=need_video,
             )
-            # 缓存 audio 元信息到本地 JSON
-            audio_cache_file.write_text(json.dumps(asdict(audio), ensure_ascii=False, indent=2), encoding="utf-8")
-            logger.info(f"音频下载并缓存成功 ({audio_cache_file})")
+            # 以实际 video_id 缓存 audio 元信息
+            cache.put_audio(platform, audio.video_id, audio)
+            logger.info(f"音频下载并缓存成功 ({platform}/{audio.video_id})")
             return audio
         except Exception as exc:
             logger.error(f"音频下载失败：{exc}")
@@ -459,38 +797,64 @@ class NoteGenerator:
 
     def _transcribe_audio(
         self,
-        audio_file: str,
-        transcript_cache_file: Path,
+        audio_meta: AudioDownloadResult,
+        cache: VideoArtifactCache,
+        task_id: Optional[str],
         status_phase: TaskStatus,
+        audio_file: Optional[str] = None,
     ) -> TranscriptResult | None:
         """
-        1. 检查转写缓存；若存在则尝试加载，否则调用转写器生成并缓存。
+        1. 检查转写缓存（按视频 + 转写器/模型区分）；命中则直接返回，否则调用转写器生成并缓存。
         2. 返回 TranscriptResult 对象
 
-        :param audio_file: 音频文件本地路径
-        :param transcript_cache_file: 转写结果缓存路径
+        :param audio_meta: AudioDownloadResult 元信息（提供音频路径与 video_id）
+        :param cache: 视频产物缓存
+        :param task_id: 任务唯一 ID
         :param status_phase: 对应的状态枚举，如 TaskStatus.TRANSCRIBING
+        :param audio_file: 已预处理的音频路径（可选，默认使用 audio_meta.file_path）
         :return: TranscriptResult 对象
         """
-        task_id = transcript_cache_file.stem.split("_")[0]
         self._update_status(task_id, status_phase)
 
-        # 已有缓存，尝试加载
-        if transcript_cache_file.exists():
-            logger.info(f"检测到转写缓存 ({transcript_cache_file})，尝试读取")
-            try:
-                data = json.loads(transcript_cache_file.read_text(encoding="utf-8"))
-                segments = [TranscriptSegment(**seg) for seg in data.get("segments", [])]
-                return TranscriptResult(language=data["language"], full_text=data["full_text"], segments=segments)
-            except Exception as e:
-                logger.warning(f"加载转写缓存失败，将重新转写：{e}")
+        cached_transcript = self._get_cached_transcript(cache, audio_meta.platform, audio_meta.video_id)
+        if cached_transcript:
+            logger.info(f"命中转写缓存 ({audio_meta.platform}/{audio_meta.video_id})，跳过转写")
+            return cached_transcript
 
         # 调用转写器
         try:
             logger.info("开始转写音频")
-            transcript = self.transcriber.transcript(file_path=audio_file)
-            transcript_cache_file.write_text(json.dumps(asdict(transcript), ensure_ascii=False, indent=2), encoding="utf-8")
-            logger.info(f"转写并缓存成功 ({transcript_cache_file})")
+            transcript = self.transcriber.transcript(file_path=audio_file or audio_meta.file_path)
+            cache.put_transcript(audio_meta.platform, audio_meta.video_id, self._transcript_key_for(transcript), transcript)
+            logger.info(f"转写并缓存成功 ({audio_meta.platform}/{audio_meta.video_id})")
+            return transcript
+        except Exception as exc:
+            logger.error(f"音频转写失败：{exc}")
+            self._handle_exception(task_id, exc)
+            raise
+
+    async def _atranscribe_audio(
+        self,
+        audio_meta: AudioDownloadResult,
+        cache: VideoArtifactCache,
+        task_id: Optional[str],
+        status_phase: TaskStatus,
+    ) -> TranscriptResult | None:
+        """
+        _transcribe_audio 的异步版本：缓存未命中时调用转写器的 atranscript
+        """
+        self._update_status(task_id, status_phase)
+
+        cached_transcript = self._get_cached_transcript(cache, audio_meta.platform, audio_meta.video_id)
+        if cached_transcript:
+            logger.info(f"命中转写缓存 ({audio_meta.platform}/{audio_meta.video_id})，跳过转写")
+            return cached_transcript
+
+        try:
+            logger.info("开始转写音频（异步）")
+            transcript = await self.transcriber.atranscript(file_path=audio_meta.file_path)
+            cache.put_transcript(audio_meta.platform, audio_meta.video_id, self._transcript_key_for(transcript), transcript)
+            logger.info(f"转写并缓存成功 ({audio_meta.platform}/{audio_meta.video_id})")
             return transcript
         except Exception as exc:
             logger.error(f"音频转写失败：{exc}")
@@ -502,21 +866,25 @@ class NoteGenerator:
         audio_meta: AudioDownloadResult,
         transcript: TranscriptResult,
         gpt: GPT,
-        markdown_cache_file: Path,
+        cache: VideoArtifactCache,
+        note_key: str,
+        task_id: Optional[str],
         link: bool,
         screenshot: bool,
         formats: List[str],
         style: Optional[str],
         extras: Optional[str],
-            video_img_urls: List[str],
+        video_img_urls: List[str],
     ) -> str | None:
         """
-        调用 GPT 对转写结果进行总结，生成 Markdown 文本并缓存。
+        调用 GPT 对转写结果进行总结，生成 Markdown 文本并缓存；命中笔记缓存时不调用 GPT。
 
         :param audio_meta: AudioDownloadResult 元信息
         :param transcript: TranscriptResult 转写结果
         :param gpt: GPT 实例
-        :param markdown_cache_file: Markdown 缓存路径
+        :param cache: 视频产物缓存
+        :param note_key: 笔记缓存键（由模型、提示词版本与笔记选项计算）
+        :param task_id: 任务唯一 ID
         :param link: 是否在笔记中插入链接
         :param screenshot: 是否在笔记中生成截图占位
         :param formats: 包含 'link' 或 'screenshot' 的列表
@@ -524,9 +892,13 @@ class NoteGenerator:
         :param extras: GPT 额外参数
         :return: 生成的 Markdown 字符串
         """
-        task_id = markdown_cache_file.stem
         self._update_status(task_id, TaskStatus.SUMMARIZING)
 
+        cached_markdown = cache.get_note(audio_meta.platform, audio_meta.video_id, note_key)
+        if cached_markdown is not None:
+            logger.info(f"命中笔记缓存 ({audio_meta.platform}/{audio_meta.video_id})，跳过 GPT 总结")
+            return cached_markdown
+
         source = GPTSource(
             title=audio_meta.title,
             segment=transcript.segments,
@@ -541,8 +913,55 @@ class NoteGenerator:
 
         try:
             markdown = gpt.summarize(source)
-            markdown_cache_file.write_text(markdown, encoding="utf-8")
-            logger.info(f"GPT 总结并缓存成功 ({markdown_cache_file})")
+            cache.put_note(audio_meta.platform, audio_meta.video_id, note_key, markdown)
+            logger.info(f"GPT 总结并缓存成功 ({audio_meta.platform}/{audio_meta.video_id})")
+            return markdown
+        except Exception as exc:
+            logger.error(f"GPT 总结失败：{exc}")
+            self._handle_exception(task_id, exc)
+            raise
+
+    async def _asummarize_text(
+        self,
+        audio_meta: AudioDownloadResult,
+        transcript: TranscriptResult,
+        gpt: GPT,
+        cache: VideoArtifactCache,
+        note_key: str,
+        task_id: Optional[str],
+        link: bool,
+        screenshot: bool,
+        formats: List[str],
+        style: Optional[str],
+        extras: Optional[str],
+        video_img_urls: List[str],
+    ) -> str | None:
+        """
+        _summarize_text 的异步版本：缓存未命中时调用 gpt.asummarize
+        """
+        self._update_status(task_id, TaskStatus.SUMMARIZING)
+
+        cached_markdown = cache.get_note(audio_meta.platform, audio_meta.video_id, note_key)
+        if cached_markdown is not None:
+            logger.info(f"命中笔记缓存 ({audio_meta.platform}/{audio_meta.video_id})，跳过 GPT 总结")
+            return cached_markdown
+
+        source = GPTSource(
+            title=audio_meta.title,
+            segment=transcript.segments,
+            tags=audio_meta.raw_info.get("tags", []),
+            screenshot=screenshot,
+            video_img_urls=video_img_urls,
+            link=link,
+            _format=formats,
+            style=style,
+            extras=extras,
+        )
+
+        try:
+            markdown = await gpt.asummarize(source)
+            cache.put_note(audio_meta.platform, audio_meta.video_id, note_key, markdown)
+            logger.info(f"GPT 总结并缓存成功 ({audio_meta.platform}/{audio_meta.video_id})")
             return markdown
         except Exception as exc:
             logger.error(f"GPT 总结失败：{exc}")
@@ -633,4 +1052,18 @@ class NoteGenerator:
             insert_video_task(video_id=video_id, platform=platform, task_id=task_id)
             logger.info(f"已保存任务记录到数据库 (video_id={video_id}, platform={platform}, task_id={task_id})")
         except Exception as e:
-            logger.error(f"保存任务记录失败：{e}")
\ No newline at end of file
+            logger.error(f"保存任务记录失败：{e}")
+
+
+_note_generator: Optional[NoteGenerator] = None
+_note_generator_lock = threading.Lock()
+
+
+def get_note_generator() -> NoteGenerator:
+    """获取进程内共享的 NoteGenerator（单例，转写器只初始化一次）"""
+    global _note_generator
+    if _note_generator is None:
+        with _note_generator_lock:
+            if _note_generator is None:
+                _note_generator = NoteGenerator()
+    return _note_generator
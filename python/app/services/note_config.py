@@ -0,0 +1,128 @@
+"""
+笔记生成流程的不可变配置
+
+进程启动时从环境变量读取一次，之后只读。各请求不再通过修改 os.environ 来切换转写器/模型，
+NoteGenerator、转写器等共享同一份配置，避免并发请求之间互相覆盖。
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# 支持的转写器类型
+SUPPORTED_TRANSCRIBER_TYPES = ("groq", "fast-whisper", "fixture", "auto")
+# 转写器类型别名
+TRANSCRIBER_TYPE_ALIASES = {"whisper": "fast-whisper", "faster-whisper": "fast-whisper"}
+# 已下线的本地转写器类型，读取配置时统一切换为 groq
+LEGACY_TRANSCRIBER_TYPES = ("mlx-whisper",)
+
+
+@dataclass(frozen=True)
+class NotePipelineConfig:
+    transcriber_type: str = "groq"                      # 转写器类型
+    groq_transcriber_model: str = "whisper-large-v3"    # Groq 转写模型
+    transcribe_chunk_seconds: float = 300               # 分片转写的目标分片时长（秒），0 表示不分片
+    transcribe_chunk_overlap: float = 2                 # 相邻分片的重叠时长（秒）
+    transcribe_chunk_workers: int = 4                   # 单个音频同时转写的分片数
+    whisper_model_size: str = "base"                    # faster-whisper 模型名称或本地路径
+    whisper_device: str = "cpu"                         # faster-whisper 推理设备
+    whisper_compute_type: str = "int8"                  # faster-whisper 计算精度
+    whisper_cpu_threads: int = 0                        # 每个工作线程的 CPU 线程数（0 为自动）
+    whisper_num_workers: int = 1                        # 同时转写的文件数
+    whisper_batch_size: int = 8                         # 单个文件内批量推理的语音段数
+    transcriber_backends: Tuple[str, ...] = ("groq", "fast-whisper")  # auto 路由的候选后端（按优先级）
+    note_map_reduce_threshold_tokens: int = 24000       # 转写文本超过该 token 数时分段生成笔记再合并，0 表示不分段
+    note_map_chunk_tokens: int = 8000                   # 分段生成时每段转写文本的 token 预算
+    note_map_concurrency: int = 4                       # 进程内同时生成的分段笔记数（所有视频共享）
+    transcript_compaction: bool = True                  # 构建提示词前是否压缩转写文本
+    transcript_bucket_seconds: float = 30               # 压缩时合并为一个段落的最长时间跨度（秒）
+    transcript_max_tokens: int = 0                      # 压缩后转写文本的 token 预算，0 表示不限制
+
+    @property
+    def transcriber_model(self) -> str:
+        """当前转写器实际使用的模型（用于区分转写缓存）"""
+        return self.model_for_transcriber(self.transcriber_type)
+
+    def model_for_transcriber(self, transcriber_type: str) -> str:
+        """指定转写后端使用的模型；auto 表示由多个后端共同完成（分片分别路由到不同后端）"""
+        if transcriber_type == "fast-whisper":
+            return self.whisper_model_size
+        if transcriber_type == "auto":
+            return ",".join(self.transcriber_backends)
+        if transcriber_type == "fixture":
+            return "fixture"
+        return self.groq_transcriber_model
+
+    def note_prompt_options(self) -> Dict[str, Any]:
+        """影响笔记提示词的转写压缩与分段生成配置（用于区分笔记缓存，未启用的功能不参与）"""
+        options: Dict[str, Any] = {"compaction": None, "map_reduce": None}
+        if self.transcript_compaction:
+            options["compaction"] = [self.transcript_bucket_seconds, self.transcript_max_tokens]
+        if self.note_map_reduce_threshold_tokens > 0:
+            options["map_reduce"] = [self.note_map_reduce_threshold_tokens, self.note_map_chunk_tokens]
+        return options
+
+    @classmethod
+    def from_env(cls) -> "NotePipelineConfig":
+        transcriber_type = os.getenv("TRANSCRIBER_TYPE", "groq").lower()
+        transcriber_type = TRANSCRIBER_TYPE_ALIASES.get(transcriber_type, transcriber_type)
+        if transcriber_type in LEGACY_TRANSCRIBER_TYPES:
+            logger.warning(f"检测到旧的转录器类型 '{transcriber_type}'，已自动切换为 'groq'")
+            transcriber_type = "groq"
+        elif transcriber_type not in SUPPORTED_TRANSCRIBER_TYPES:
+            logger.warning(f"未知转录器类型 '{transcriber_type}'，使用 'groq'")
+            transcriber_type = "groq"
+        backends = []
+        for name in (part.strip().lower() for part in os.getenv("TRANSCRIBER_ROUTE_BACKENDS", "groq,fast-whisper").split(",")):
+            name = TRANSCRIBER_TYPE_ALIASES.get(name, name)
+            if not name or name == "auto" or name in backends:
+                continue
+            if name not in SUPPORTED_TRANSCRIBER_TYPES:
+                logger.warning(f"未知转写路由后端 '{name}'，已忽略")
+                continue
+            backends.append(name)
+        backends = tuple(backends) or ("groq",)
+        return cls(
+            transcriber_type=transcriber_type,
+            groq_transcriber_model=os.getenv("GROQ_TRANSCRIBER_MODEL") or "whisper-large-v3",
+            transcribe_chunk_seconds=float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "300")),
+            transcribe_chunk_overlap=float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP", "2")),
+            transcribe_chunk_workers=int(os.getenv("TRANSCRIBE_CHUNK_WORKERS", "4")),
+            whisper_model_size=os.getenv("WHISPER_MODEL_SIZE") or "base",
+            whisper_device=os.getenv("WHISPER_DEVICE", "cpu"),
+            whisper_compute_type=os.getenv("WHISPER_COMPUTE_TYPE", "int8"),
+            whisper_cpu_threads=int(os.getenv("WHISPER_CPU_THREADS", "0")),
+            whisper_num_workers=int(os.getenv("WHISPER_NUM_WORKERS", "1")),
+            whisper_batch_size=int(os.getenv("WHISPER_BATCH_SIZE", "8")),
+            transcriber_backends=backends,
+            note_map_reduce_threshold_tokens=int(os.getenv("NOTE_MAP_REDUCE_THRESHOLD_TOKENS", "24000")),
+            note_map_chunk_tokens=int(os.getenv("NOTE_MAP_CHUNK_TOKENS", "8000")),
+            note_map_concurrency=max(1, int(os.getenv("NOTE_MAP_CONCURRENCY", "4"))),
+            transcript_compaction=os.getenv("TRANSCRIPT_COMPACTION", "true").lower() in ("1", "true", "yes"),
+            transcript_bucket_seconds=float(os.getenv("TRANSCRIPT_BUCKET_SECONDS", "30")),
+            transcript_max_tokens=int(os.getenv("TRANSCRIPT_MAX_TOKENS", "0")),
+        )
+
+
+_note_config: Optional[NotePipelineConfig] = None
+_note_config_lock = threading.Lock()
+
+
+def get_note_config() -> NotePipelineConfig:
+    """获取进程内共享的笔记流程配置（首次调用时从环境变量读取）"""
+    global _note_config
+    if _note_config is None:
+        with _note_config_lock:
+            if _note_config is None:
+                _note_config = NotePipelineConfig.from_env()
+                logger.info(f"笔记流程配置: {_note_config}")
+    return _note_config
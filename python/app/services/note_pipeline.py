@@ -0,0 +1,588 @@
+"""
+分阶段流水线笔记生成引擎
+
+将单个视频的笔记生成拆分为 下载 → 音频预处理 → 转写 → 笔记 LLM → 元数据保存 五个阶段，
+每个阶段拥有独立的有界线程池和队列。这样网络密集的下载、上传密集的转写和 LLM 调用
+不再争抢同一批线程：视频 1 转写时，视频 2 可以同时下载。
+
+每个阶段统计排队数、运行数和占用率，可通过 NotePipeline.stats() 查询。
+
+流水线在应用级别共享（由 main.py 的 lifespan 创建和关闭），入口处有全局准入控制：
+    - 同时在流水线中的视频数不超过 NOTE_PIPELINE_MAX_INFLIGHT，其余进入等待队列
+    - 等待队列按请求分组（group）轮询出队，单个请求提交大量视频时不会饿死其他请求
+    - 等待总数超过 NOTE_PIPELINE_MAX_PENDING 时直接拒绝，避免排队时间无限增长
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.enmus.note_enums import DownloadQuality
+from app.enmus.task_status_enums import TaskStatus
+from app.exceptions.biz_exception import BizException
+from app.gpt.base import GPT
+from app.models.audio_model import AudioDownloadResult
+from app.models.notes_model import NoteResult, NoteTaskContext
+from app.models.transcriber_model import TranscriptResult
+from app.services.artifact_cache import get_artifact_cache
+from app.services.note import NoteGenerator, get_note_generator, note_flight
+from app.utils.logger import get_logger
+from app.utils.url_parser import extract_video_id
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+STAGE_DOWNLOAD = "download"
+STAGE_AUDIO_PREP = "audio_prep"
+STAGE_TRANSCRIBE = "transcribe"
+STAGE_NOTE = "note"
+STAGE_SAVE = "save"
+
+# 各阶段默认线程数，可通过 NOTE_PIPELINE_{STAGE}_WORKERS 环境变量覆盖
+DEFAULT_STAGE_WORKERS = {
+    STAGE_DOWNLOAD: 4,
+    STAGE_AUDIO_PREP: 2,
+    STAGE_TRANSCRIBE: 4,
+    STAGE_NOTE: 4,
+    STAGE_SAVE: 1,
+}
+# 阶段间交接队列的容量（每个阶段最多积压的任务数），队列满时上游阶段会等待
+DEFAULT_STAGE_QUEUE_SIZE = int(os.getenv("NOTE_PIPELINE_QUEUE_SIZE", "20"))
+# 全局准入控制：同时处理的视频数上限、等待队列上限
+DEFAULT_MAX_INFLIGHT = int(os.getenv("NOTE_PIPELINE_MAX_INFLIGHT", "8"))
+DEFAULT_MAX_PENDING = int(os.getenv("NOTE_PIPELINE_MAX_PENDING", "200"))
+
+
+# 标记流水线自己的线程（阶段线程池和交接调度线程），只有这些线程可以阻塞等待下游阶段的空位
+_pipeline_thread = threading.local()
+
+
+def _mark_pipeline_thread() -> None:
+    _pipeline_thread.active = True
+
+
+def stage_workers_from_env() -> Dict[str, int]:
+    """读取各阶段线程数配置"""
+    return {
+        stage: max(1, int(os.getenv(f"NOTE_PIPELINE_{stage.upper()}_WORKERS", default)))
+        for stage, default in DEFAULT_STAGE_WORKERS.items()
+    }
+
+
+@dataclass
+class NoteJob:
+    """流水线中单个视频的任务上下文，阶段之间通过它传递中间产物"""
+    video_url: str
+    platform: str
+    task_id: Optional[str]
+    model_name: Optional[str]
+    provider_id: Optional[str]
+    quality: DownloadQuality = DownloadQuality.medium
+    link: bool = False
+    screenshot: bool = False
+    _format: List[str] = field(default_factory=list)
+    style: Optional[str] = None
+    extras: Optional[str] = None
+    output_path: Optional[str] = None
+    video_understanding: bool = False
+    video_interval: int = 0
+    grid_size: List[int] = field(default_factory=list)
+    group: Optional[str] = None  # 所属请求，用于公平调度
+
+    generator: Optional[NoteGenerator] = None
+    ctx: NoteTaskContext = field(default_factory=NoteTaskContext)
+    gpt: Optional[GPT] = None
+    audio_meta: Optional[AudioDownloadResult] = None
+    audio_file: Optional[str] = None
+    transcript: Optional[TranscriptResult] = None
+    markdown: Optional[str] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class PipelineStage:
+    """
+    流水线中的一个阶段：固定大小的线程池 + 有界交接队列 + 运行统计
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int = DEFAULT_STAGE_QUEUE_SIZE):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"note-{name}", initializer=_mark_pipeline_thread
+        )
+        # 限制阶段内（排队 + 运行）的任务总数，实现上游背压
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, fn: Callable[[NoteJob], Any], job: NoteJob, block: bool = True) -> Future:
+        """
+        提交任务到本阶段
+
+        :param fn: 阶段处理函数
+        :param job: 任务上下文
+        :param block: 队列已满时是否等待（阶段间交接时等待，入口阶段不等待）
+        """
+        acquired = self._slots.acquire(blocking=block)
+        with self._lock:
+            self.queued += 1
+        try:
+            return self._executor.submit(self._run, fn, job, acquired)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            if acquired:
+                self._slots.release()
+            raise
+
+    def _run(self, fn: Callable[[NoteJob], Any], job: NoteJob, acquired: bool):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            result = fn(job)
+            with self._lock:
+                self.completed += 1
+            return result
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+            if acquired:
+                self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "occupancy": round(self.running / self.workers, 2) if self.workers else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+class FairAdmission:
+    """
+    全局准入控制：限制同时在流水线中的视频数，等待中的任务按请求分组轮询出队
+    """
+
+    def __init__(self, max_inflight: int = DEFAULT_MAX_INFLIGHT, max_pending: int = DEFAULT_MAX_PENDING):
+        self.max_inflight = max(1, max_inflight)
+        self.max_pending = max(0, max_pending)
+        self._lock = threading.Lock()
+        self._waiting: "OrderedDict[str, Deque[NoteJob]]" = OrderedDict()
+        self.inflight = 0
+        self.pending = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self, job: NoteJob) -> bool:
+        """
+        尝试让任务进入流水线
+
+        :return: True 表示立即放行；False 表示已进入等待队列，稍后由 release() 放行
+        :raises BizException: 等待队列已满
+        """
+        with self._lock:
+            if self.inflight < self.max_inflight and not self.pending:
+                self._admit_locked(job)
+                return True
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise BizException(code=503, message="笔记生成任务排队过多，请稍后再试")
+            self._waiting.setdefault(job.group or "", deque()).append(job)
+            self.pending += 1
+            return False
+
+    def release(self) -> Optional[NoteJob]:
+        """
+        一个任务离开流水线，返回下一个应放行的等待任务（没有则返回 None）
+        """
+        with self._lock:
+            self.inflight -= 1
+            if not self._waiting or self.inflight >= self.max_inflight:
+                return None
+            # 轮询：取队首分组的第一个任务，再把该分组移到队尾
+            group, jobs = next(iter(self._waiting.items()))
+            job = jobs.popleft()
+            if jobs:
+                self._waiting.move_to_end(group)
+            else:
+                del self._waiting[group]
+            self.pending -= 1
+            self._admit_locked(job)
+            return job
+
+    def drain(self) -> List[NoteJob]:
+        """取出所有等待中的任务（关闭时使用）"""
+        with self._lock:
+            jobs = [job for group_jobs in self._waiting.values() for job in group_jobs]
+            self._waiting.clear()
+            self.pending = 0
+            return jobs
+
+    def _admit_locked(self, job: NoteJob) -> None:
+        waited = time.monotonic() - job.enqueued_at
+        self.inflight += 1
+        self.admitted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_inflight": self.max_inflight,
+                "max_pending": self.max_pending,
+                "inflight": self.inflight,
+                "pending": self.pending,
+                "pending_groups": len(self._waiting),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_wait_seconds": round(self._wait_total / self.admitted, 3) if self.admitted else 0.0,
+                "max_wait_seconds": round(self._wait_max, 3),
+                "saturation": round(self.inflight / self.max_inflight, 2),
+            }
+
+
+class NotePipeline:
+    """
+    分阶段流水线笔记生成引擎
+    """
+
+    STAGES = (STAGE_DOWNLOAD, STAGE_AUDIO_PREP, STAGE_TRANSCRIBE, STAGE_NOTE, STAGE_SAVE)
+
+    def __init__(
+        self,
+        stage_workers: Optional[Dict[str, int]] = None,
+        queue_size: int = DEFAULT_STAGE_QUEUE_SIZE,
+        max_inflight: int = DEFAULT_MAX_INFLIGHT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        stage_workers = {**stage_workers_from_env(), **(stage_workers or {})}
+        self._stages: Dict[str, PipelineStage] = {
+            name: PipelineStage(name, stage_workers[name], queue_size) for name in self.STAGES
+        }
+        self._admission = FairAdmission(max_inflight=max_inflight, max_pending=max_pending)
+        # 在流水线线程之外完成的阶段交接由该线程执行，避免调用方线程（如事件循环）阻塞等待下游空位
+        self._dispatcher = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="note-dispatch", initializer=_mark_pipeline_thread
+        )
+        self._closed = False
+        self._handlers: Dict[str, Callable[[NoteJob], Optional[str]]] = {
+            STAGE_DOWNLOAD: self._download,
+            STAGE_AUDIO_PREP: self._prepare_audio,
+            STAGE_TRANSCRIBE: self._transcribe,
+            STAGE_NOTE: self._summarize,
+            STAGE_SAVE: self._save,
+        }
+        logger.info(
+            f"笔记流水线已创建，各阶段线程数: {stage_workers}，"
+            f"全局并发上限: {self._admission.max_inflight}，等待上限: {self._admission.max_pending}"
+        )
+
+    # ---------------- 公有方法 ----------------
+
+    def submit(
+        self,
+        video_url: str,
+        platform: str,
+        task_id: Optional[str] = None,
+        model_name: Optional[str] = None,
+        provider_id: Optional[str] = None,
+        quality: DownloadQuality = DownloadQuality.medium,
+        link: bool = False,
+        screenshot: bool = False,
+        _format: Optional[List[str]] = None,
+        style: Optional[str] = None,
+        extras: Optional[str] = None,
+        output_path: Optional[str] = None,
+        video_understanding: bool = False,
+        video_interval: int = 0,
+        grid_size: Optional[List[int]] = None,
+        group: Optional[str] = None,
+    ) -> Future:
+        """
+        提交一个视频的笔记生成任务，参数含义同 NoteGenerator.generate
+
+        :param group: 所属请求标识（如一次图运行的 ID），等待队列按它轮询出队；默认使用 task_id
+        :return: Future，完成后结果为 NoteResult；任一阶段失败时 Future 携带异常
+        :raises BizException: 流水线已关闭或等待队列已满
+        """
+        if self._closed:
+            raise BizException(code=503, message="笔记生成服务正在关闭")
+        job = NoteJob(
+            video_url=str(video_url),
+            platform=platform,
+            task_id=task_id,
+            model_name=model_name,
+            provider_id=provider_id,
+            quality=quality,
+            link=link,
+            screenshot=screenshot,
+            _format=_format or [],
+            style=style,
+            extras=extras,
+            output_path=output_path,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size or [],
+            group=group or task_id,
+            ctx=NoteTaskContext(task_id=task_id),
+        )
+        # 与 NoteGenerator.generate 共用 single-flight 注册表，并发请求同一视频时只执行一次
+        flight_key = NoteGenerator._flight_key(
+            video_url=job.video_url,
+            platform=platform,
+            quality=quality,
+            model_name=model_name,
+            provider_id=provider_id,
+            link=link,
+            screenshot=screenshot,
+            _format=_format,
+            style=style,
+            extras=extras,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size,
+        )
+        future, shared = note_flight.share(flight_key, lambda: self._enqueue(job))
+        if shared:
+            future.add_done_callback(lambda f: self._finish_shared(job, f))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """准入控制状态、各阶段的排队数/运行数/完成失败数/占用率，以及 single-flight 去重统计"""
+        return {
+            "admission": self._admission.stats(),
+            "stages": {name: stage.stats() for name, stage in self._stages.items()},
+            "single_flight": note_flight.stats(),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._closed = True
+        for job in self._admission.drain():
+            self._fail(job, "admission", BizException(code=503, message="笔记生成服务正在关闭"))
+        for stage in self._stages.values():
+            stage.shutdown(wait=wait)
+        self._dispatcher.shutdown(wait=wait)
+
+    # ---------------- 阶段调度 ----------------
+
+    def _enqueue(self, job: NoteJob) -> Future:
+        job.generator = get_note_generator()
+        admitted = self._admission.acquire(job)
+        job.generator._update_status(job.task_id, TaskStatus.PENDING)
+        if admitted:
+            self._start(job)
+        return job.future
+
+    def _on_job_done(self) -> None:
+        next_job = self._admission.release()
+        if next_job is not None:
+            self._start(next_job)
+
+    def _start(self, job: NoteJob) -> None:
+        # 已放行的任务离开流水线（成功或失败）时释放全局名额，并放行下一个等待任务
+        job.future.add_done_callback(lambda _: self._on_job_done())
+        self._advance(job, STAGE_DOWNLOAD, self._download, block=False)
+
+    def _advance(self, job: NoteJob, stage_name: str, fn: Callable[[NoteJob], Optional[str]], block: bool = True):
+        """
+        在指定阶段执行 fn；fn 返回下一阶段名称（None 表示流程结束）
+        """
+        try:
+            stage_future = self._stages[stage_name].submit(fn, job, block=block)
+        except Exception as exc:
+            self._fail(job, stage_name, exc)
+            return
+        stage_future.add_done_callback(lambda f: self._on_stage_done(job, stage_name, f))
+
+    def _on_stage_done(self, job: NoteJob, stage_name: str, stage_future: Future):
+        if stage_future.cancelled():
+            self._fail(job, stage_name, BizException(code=503, message="笔记生成服务正在关闭"))
+            return
+        exc = stage_future.exception()
+        if exc is not None:
+            self._fail(job, stage_name, exc)
+            return
+        next_stage = stage_future.result()
+        if next_stage is None:
+            job.future.set_result(NoteResult(markdown=job.markdown, transcript=job.transcript, audio_meta=job.audio_meta))
+            return
+        if getattr(_pipeline_thread, "active", False):
+            # 在上游阶段线程中阻塞等待下游空位，形成背压
+            self._advance(job, next_stage, self._handlers[next_stage])
+            return
+        # 阶段 Future 在 add_done_callback 之前就已完成时，回调在调用方线程中执行（入口阶段为事件循环），
+        # 交接转给调度线程，调用方不会阻塞
+        try:
+            self._dispatcher.submit(self._advance, job, next_stage, self._handlers[next_stage])
+        except RuntimeError as exc:
+            self._fail(job, next_stage, exc)
+
+    def _fail(self, job: NoteJob, stage_name: str, exc: BaseException):
+        logger.error(f"笔记流水线阶段 {stage_name} 失败 (task_id={job.task_id})：{exc}")
+        if job.generator:
+            job.generator._update_status(job.task_id, TaskStatus.FAILED, message=str(exc))
+        if not job.future.done():
+            job.future.set_exception(exc)
+
+    def _finish_shared(self, job: NoteJob, future: Future):
+        """挂靠到其他请求的任务完成后，为本请求的 task_id 记录状态和元数据"""
+        generator = get_note_generator()
+        if future.cancelled():
+            generator._update_status(job.task_id, TaskStatus.FAILED, message="请求已取消")
+            return
+        if future.exception() is not None:
+            generator._update_status(job.task_id, TaskStatus.FAILED, message="共享的笔记生成任务失败")
+            return
+        note_result: NoteResult = future.result()
+        generator._save_metadata(video_id=note_result.audio_meta.video_id, platform=job.platform, task_id=job.task_id)
+        generator._update_status(job.task_id, TaskStatus.SUCCESS)
+
+    # ---------------- 阶段处理函数 ----------------
+
+    def _download(self, job: NoteJob) -> Optional[str]:
+        generator = job.generator
+        generator._update_status(job.task_id, TaskStatus.PARSING)
+        downloader = generator._get_downloader(job.platform)
+        job.model_name, job.provider_id = generator._resolve_model_config(job.model_name, job.provider_id)
+        job.gpt = generator._get_gpt(job.model_name, job.provider_id)
+
+        job.audio_meta = generator._download_media(
+            downloader=downloader,
+            video_url=job.video_url,
+            quality=job.quality,
+            cache=get_artifact_cache(),
+            video_id=extract_video_id(job.video_url, job.platform),
+            ctx=job.ctx,
+            status_phase=TaskStatus.DOWNLOADING,
+            platform=job.platform,
+            output_path=job.output_path,
+            screenshot=job.screenshot,
+            video_understanding=job.video_understanding,
+            video_interval=job.video_interval,
+            grid_size=job.grid_size,
+        )
+        # 已有转写缓存时跳过音频预处理和转写排队
+        cached = generator._get_cached_transcript(
+            get_artifact_cache(), job.audio_meta.platform, job.audio_meta.video_id
+        )
+        if cached:
+            logger.info(f"命中转写缓存 ({job.audio_meta.platform}/{job.audio_meta.video_id})，跳过转写阶段")
+            job.transcript = cached
+            return STAGE_NOTE
+        return STAGE_AUDIO_PREP
+
+    def _prepare_audio(self, job: NoteJob) -> Optional[str]:
+        job.audio_file = job.generator.transcriber.prepare_audio(job.audio_meta.file_path)
+        return STAGE_TRANSCRIBE
+
+    def _transcribe(self, job: NoteJob) -> Optional[str]:
+        job.transcript = job.generator._transcribe_audio(
+            audio_meta=job.audio_meta,
+            cache=get_artifact_cache(),
+            task_id=job.task_id,
+            status_phase=TaskStatus.TRANSCRIBING,
+            audio_file=job.audio_file,
+        )
+        return STAGE_NOTE
+
+    def _summarize(self, job: NoteJob) -> Optional[str]:
+        generator = job.generator
+        note_key = generator._note_cache_key(
+            model_name=job.model_name,
+            provider_id=job.provider_id,
+            transcript=job.transcript,
+            link=job.link,
+            screenshot=job.screenshot,
+            formats=job._format,
+            style=job.style,
+            extras=job.extras,
+            video_understanding=job.video_understanding,
+            video_interval=job.video_interval,
+            grid_size=job.grid_size,
+        )
+        markdown = generator._summarize_text(
+            audio_meta=job.audio_meta,
+            transcript=job.transcript,
+            gpt=job.gpt,
+            cache=get_artifact_cache(),
+            note_key=note_key,
+            task_id=job.task_id,
+            link=job.link,
+            screenshot=job.screenshot,
+            formats=job._format,
+            style=job.style,
+            extras=job.extras,
+            video_img_urls=job.ctx.video_img_urls,
+        )
+        if job._format:
+            markdown = generator._post_process_markdown(
+                markdown=markdown,
+                video_path=job.ctx.video_path,
+                formats=job._format,
+                audio_meta=job.audio_meta,
+                platform=job.platform,
+            )
+        job.markdown = markdown
+        return STAGE_SAVE
+
+    def _save(self, job: NoteJob) -> Optional[str]:
+        generator = job.generator
+        generator._update_status(job.task_id, TaskStatus.SAVING)
+        generator._save_metadata(video_id=job.audio_meta.video_id, platform=job.platform, task_id=job.task_id)
+        generator._update_status(job.task_id, TaskStatus.SUCCESS)
+        logger.info(f"笔记生成成功 (task_id={job.task_id})")
+        return None
+
+
+_note_pipeline: Optional[NotePipeline] = None
+_note_pipeline_lock = threading.Lock()
+
+
+def get_note_pipeline() -> NotePipeline:
+    """获取进程内共享的笔记流水线（单例，未通过 lifespan 初始化时懒加载）"""
+    global _note_pipeline
+    if _note_pipeline is None:
+        with _note_pipeline_lock:
+            if _note_pipeline is None:
+                _note_pipeline = NotePipeline()
+    return _note_pipeline
+
+
+def init_note_pipeline() -> NotePipeline:
+    """应用启动时创建共享流水线"""
+    return get_note_pipeline()
+
+
+def shutdown_note_pipeline(wait: bool = False) -> None:
+    """应用关闭时停止共享流水线，未开始的任务会被取消"""
+    global _note_pipeline
+    with _note_pipeline_lock:
+        pipeline, _note_pipeline = _note_pipeline, None
+    if pipeline is not None:
+        pipeline.shutdown(wait=wait)
+        logger.info("笔记流水线已关闭")
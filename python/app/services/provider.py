@@ -4,12 +4,12 @@ from kombu import uuid
 from app.db.models.providers import Provider
 from app.db.provider_dao import (
     insert_provider,
-    get_all_providers,
     get_provider_by_name,
-    get_provider_by_id,
     update_provider,
-    delete_provider, get_enabled_providers,
+    delete_provider,
 )
+from app.gpt.client_pool import invalidate_provider_clients
+from app.services.config_cache import get_config_cache
 from app.gpt.gpt_factory import GPTFactory
 from app.models.model_config import ModelConfig
 
@@ -73,7 +73,9 @@ class ProviderService:
         try:
             id = uuid().lower()
             logo='custom'
-            return insert_provider(id, name, api_key, base_url, logo, type_, enabled)
+            result = insert_provider(id, name, api_key, base_url, logo, type_, enabled)
+            get_config_cache().invalidate()
+            return result
         except Exception as  e:
             print('创建模式失败',e)
     @staticmethod
@@ -90,16 +92,14 @@ class ProviderService:
         }
     @staticmethod
     def get_all_providers():
-        rows = get_all_providers()
-        if rows is None:
-            return []
-
-        return [ProviderService.serialize_provider(row) for row in rows] if rows else []
+        # 供应商配置读取走进程内缓存，写入时失效
+        return get_config_cache().get_providers()
     @staticmethod
     def get_all_providers_safe():
-        rows = get_all_providers()
-
-        return [ProviderService.serialize_provider(row) for row in rows] if (rows) else []
+        return get_config_cache().get_providers()
+    @staticmethod
+    def get_enabled_providers():
+        return get_config_cache().get_enabled_providers()
     @staticmethod
     def get_provider_by_name(name: str):
         row = get_provider_by_name(name)
@@ -107,13 +107,14 @@ class ProviderService:
 
     @staticmethod
     def get_provider_by_id(id: str):  # 已改为 str 类型
-        row = get_provider_by_id(id)
-        return ProviderService.serialize_provider(row)
+        return get_config_cache().get_provider(id)
 
     @staticmethod
     def get_provider_by_id_safe(id: str):  # 已改为 str 类型
-        row = get_provider_by_id(id)
-        return ProviderService.serialize_provider_safe(row)
+        provider = get_config_cache().get_provider(id)
+        if provider:
+            provider["api_key"] = ProviderService.mask_key(provider.get("api_key"))
+        return provider
             # all_models.extend(provider['models'])
 
     @staticmethod
@@ -122,7 +123,15 @@ class ProviderService:
         # 过滤掉空值
             filtered_data = {k: v for k, v in data.items() if v is not None and k != 'id'}
             print('更新模型供应商',filtered_data)
+            old = ProviderService.get_provider_by_id(id)
             update_provider(id, **filtered_data)
+            get_config_cache().invalidate()
+            # API Key 或 Base URL 变更后，旧配置创建的客户端不再可用
+            if old and (
+                filtered_data.get('api_key', old['api_key']) != old['api_key']
+                or filtered_data.get('base_url', old['base_url']) != old['base_url']
+            ):
+                invalidate_provider_clients(old['base_url'], old['api_key'])
             return id
 
         except Exception as e:
@@ -131,4 +140,9 @@ class ProviderService:
 
     @staticmethod
     def delete_provider(id: str):
-        return delete_provider(id)
+        old = ProviderService.get_provider_by_id(id)
+        result = delete_provider(id)
+        get_config_cache().invalidate()
+        if old:
+            invalidate_provider_clients(old['base_url'], old['api_key'])
+        return result
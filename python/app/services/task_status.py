@@ -0,0 +1,212 @@
+"""
+任务状态存储
+
+笔记生成的每个阶段都会更新任务状态。状态先写入内存注册表（立即可查），
+再由后台线程批量写回 SQLite（task_statuses 表，write-behind），不再为每次状态变化读写 JSON 文件。
+
+状态变化会通过 asyncio 队列推送给订阅者（如 SSE 接口），客户端无需轮询即可获得实时进度。
+状态更新可能来自任意线程（流水线线程池、阻塞任务线程池等），推送通过 loop.call_soon_threadsafe 投递到订阅者所在事件循环。
+
+注册表和推送都只在当前进程内有效：NOTE_ENGINE=celery 时状态在 worker 进程中更新，只能经数据库写回到达 API 进程，
+订阅者需要在没有推送时通过 get_persisted 读取数据库中的状态。
+
+配置（环境变量）：
+    TASK_STATUS_FLUSH_INTERVAL   写回数据库的间隔（秒，默认 1）
+    TASK_STATUS_MAX_ENTRIES      内存中保留的任务数上限（默认 10000，超出时淘汰最早完成的任务）
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+
+from app.db.task_status_dao import get_task_status, upsert_task_statuses
+from app.enmus.task_status_enums import TaskStatus
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+TASK_STATUS_FLUSH_INTERVAL = float(os.getenv("TASK_STATUS_FLUSH_INTERVAL", "1"))
+TASK_STATUS_MAX_ENTRIES = int(os.getenv("TASK_STATUS_MAX_ENTRIES", "10000"))
+# 每个订阅者队列的容量，消费过慢时丢弃最早的事件
+SUBSCRIBER_QUEUE_SIZE = 100
+
+FINAL_STATUSES = (TaskStatus.SUCCESS.value, TaskStatus.FAILED.value)
+
+
+class TaskStatusStore:
+    """内存任务状态注册表 + SQLite 写回 + asyncio 推送，线程安全"""
+
+    def __init__(
+        self,
+        flush_interval: float = TASK_STATUS_FLUSH_INTERVAL,
+        max_entries: int = TASK_STATUS_MAX_ENTRIES,
+    ):
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        # (事件循环, 队列, 订阅的 task_id；None 表示订阅全部任务)
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, Optional[str]]] = []
+        self._stop_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # ---------------- 状态读写 ----------------
+
+    def update(self, task_id: Optional[str], status: Union[str, TaskStatus], message: Optional[str] = None) -> None:
+        """
+        更新任务状态：立即写入内存并推送给订阅者，数据库由后台线程批量写回
+
+        :param task_id: 任务唯一 ID（为空时忽略）
+        :param status: TaskStatus 枚举或自定义状态字符串
+        :param message: 可选消息，用于记录失败原因等
+        """
+        if not task_id:
+            return
+        record = {
+            "task_id": task_id,
+            "status": status.value if isinstance(status, TaskStatus) else status,
+            "message": message,
+            "updated_at": time.time(),
+        }
+        with self._lock:
+            self._statuses[task_id] = record
+            self._statuses.move_to_end(task_id)
+            self._dirty[task_id] = record
+            self._evict_locked()
+            subscribers = list(self._subscribers)
+        logger.debug(f"任务状态更新 (task_id={task_id})：{record['status']}")
+        self._publish(record, subscribers)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务状态：优先读内存，未命中时读数据库"""
+        with self._lock:
+            record = self._statuses.get(task_id)
+        if record is not None:
+            return dict(record)
+        return get_task_status(task_id)
+
+    def get_persisted(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取数据库中的任务状态（其他进程写回的状态，如 Celery worker）
+
+        本进程还有该任务未写回的更新时返回 None，以内存中的状态为准
+        """
+        with self._lock:
+            if task_id in self._dirty:
+                return None
+        return get_task_status(task_id)
+
+    # ---------------- 订阅 ----------------
+
+    def subscribe(self, task_id: Optional[str] = None) -> asyncio.Queue:
+        """
+        订阅任务状态变化（必须在协程中调用）
+
+        :param task_id: 只订阅指定任务；为 None 时订阅全部任务
+        :return: 接收状态记录的 asyncio.Queue，使用完毕后需调用 unsubscribe
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue, task_id))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [sub for sub in self._subscribers if sub[1] is not queue]
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, record: Dict[str, Any]) -> None:
+        # 在订阅者的事件循环中执行；队列满时丢弃最早的事件，保证最新状态能送达
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(record)
+
+    def _publish(self, record: Dict[str, Any], subscribers) -> None:
+        for loop, queue, task_filter in subscribers:
+            if task_filter is not None and task_filter != record["task_id"]:
+                continue
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, dict(record))
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(queue)
+
+    # ---------------- 写回数据库 ----------------
+
+    def start(self) -> None:
+        """启动后台写回线程"""
+        if self._flusher and self._flusher.is_alive():
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="task-status-flusher", daemon=True)
+        self._flusher.start()
+        logger.info(f"任务状态写回线程已启动（间隔 {self.flush_interval}s）")
+
+    def stop(self) -> None:
+        """停止后台写回线程，并写回剩余的状态"""
+        self._stop_event.set()
+        if self._flusher:
+            self._flusher.join(timeout=self.flush_interval * 5)
+            self._flusher = None
+        self.flush()
+
+    def flush(self) -> int:
+        """把内存中变化过的状态写回数据库，返回写回条数"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+        try:
+            upsert_task_statuses(list(dirty.values()))
+        except Exception as e:
+            logger.error(f"任务状态写回数据库失败，将在下次重试：{e}")
+            with self._lock:
+                # 期间有更新的任务以新状态为准
+                for task_id, record in dirty.items():
+                    self._dirty.setdefault(task_id, record)
+            return 0
+        return len(dirty)
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def _evict_locked(self) -> None:
+        # 超出上限时优先淘汰已结束且已写回数据库的任务（OrderedDict 按最近更新排序）
+        overflow = len(self._statuses) - self.max_entries
+        if overflow <= 0:
+            return
+        for task_id in list(self._statuses.keys()):
+            if overflow <= 0:
+                break
+            record = self._statuses[task_id]
+            if record["status"] in FINAL_STATUSES and task_id not in self._dirty:
+                del self._statuses[task_id]
+                overflow -= 1
+
+
+_task_status_store: Optional[TaskStatusStore] = None
+_task_status_store_lock = threading.Lock()
+
+
+def get_task_status_store() -> TaskStatusStore:
+    """获取进程内共享的任务状态存储（单例，首次获取时启动写回线程）"""
+    global _task_status_store
+    if _task_status_store is None:
+        with _task_status_store_lock:
+            if _task_status_store is None:
+                store = TaskStatusStore()
+                store.start()
+                _task_status_store = store
+    return _task_status_store
@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
 
 from app.models.transcriber_model import TranscriptResult
+from app.utils.blocking_pool import run_blocking
 
 
 class Transcriber(ABC):
+    # 转写接口的上传大小限制（字节），本地转写器为 None
+    max_upload_bytes = None
+
     @abstractmethod
     def transcript(self,file_path:str)->TranscriptResult:
         '''
@@ -13,6 +17,22 @@ class Transcriber(ABC):
         '''
         pass
 
+    async def atranscript(self,file_path:str)->TranscriptResult:
+        '''
+        异步转写，默认在阻塞任务线程池中执行 transcript；基于 HTTP 接口的转写器可覆盖为原生异步实现
+        :param file_path:音频路径
+        :return: 返回一个 TranscriptResult 类
+        '''
+        return await run_blocking(self.transcript, file_path)
+
+    def prepare_audio(self, file_path: str) -> str:
+        '''
+        转写前的音频预处理（如压缩到接口上传限制以内），默认不做处理
+        :param file_path: 原始音频路径
+        :return: 实际用于转写的音频路径
+        '''
+        return file_path
+
     def on_finish(self,video_path:str,result: TranscriptResult)->None:
         '''
         当音频转录完成时调用
@@ -0,0 +1,215 @@
+"""
+分片并发转写
+
+长音频整段上传时只能串行识别，且受转写接口上传大小限制。ChunkedTranscriber 包装任意转写器：
+    1. 用 ffmpeg silencedetect 找到静音区间，在目标分片时长附近的静音处切分（找不到静音时按时长硬切）
+    2. 每个分片向两侧各扩展 overlap 秒，用 ffmpeg 直接拷贝出分片音频（不重新编码）
+    3. 用有界线程池（异步路径为信号量）并发转写各分片
+    4. 合并 TranscriptSegment：时间戳加上分片起点偏移；每个分片只保留中点落在自己负责区间内的片段，
+       重叠区域的重复识别结果因此只保留一份
+
+短于 chunk_seconds * 1.5 的音频不切分，直接交给内部转写器。
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.decorators.timeit import timeit
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.transcriber.base import Transcriber
+from app.utils.audio_prep import probe_duration
+from app.utils.blocking_pool import run_blocking
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 静音检测参数：低于 SILENCE_NOISE_DB 且持续 SILENCE_MIN_SECONDS 以上视为静音
+SILENCE_NOISE_DB = -30
+SILENCE_MIN_SECONDS = 0.4
+
+_SILENCE_START = re.compile(r"silence_start: (-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end: (-?[\d.]+)")
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    start: float        # 分片在原音频中的起点（含重叠，秒）
+    end: float          # 分片在原音频中的终点（含重叠，秒）
+    own_start: float    # 该分片负责的区间起点（不含重叠）
+    own_end: float      # 该分片负责的区间终点（不含重叠）
+
+
+def detect_silences(file_path: str) -> List[Tuple[float, float]]:
+    """返回音频中的静音区间 [(start, end), ...]"""
+    command = [
+        "ffmpeg",
+        "-i", file_path,
+        "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_SECONDS}",
+        "-f", "null",
+        "-",
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        logger.warning(f"静音检测失败，将按时长切分：{result.stderr[-500:]}")
+        return []
+    starts = [float(v) for v in _SILENCE_START.findall(result.stderr)]
+    ends = [float(v) for v in _SILENCE_END.findall(result.stderr)]
+    return list(zip(starts, ends))
+
+
+def plan_chunks(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    chunk_seconds: float,
+    overlap_seconds: float,
+) -> List[AudioChunk]:
+    """
+    规划分片：在每个目标切点（chunk_seconds 的整数倍）前后 chunk_seconds / 4 范围内，
+    选择离目标最近的静音中点作为切点
+    """
+    silence_points = [(start + end) / 2 for start, end in silences]
+    tolerance = chunk_seconds / 4
+    cuts = [0.0]
+    target = chunk_seconds
+    while target < duration - chunk_seconds / 2:
+        candidates = [p for p in silence_points if abs(p - target) <= tolerance and p > cuts[-1]]
+        cut = min(candidates, key=lambda p: abs(p - target)) if candidates else target
+        cuts.append(cut)
+        target = cut + chunk_seconds
+    cuts.append(duration)
+
+    chunks = []
+    for index, (own_start, own_end) in enumerate(zip(cuts, cuts[1:])):
+        chunks.append(AudioChunk(
+            index=index,
+            start=max(0.0, own_start - overlap_seconds),
+            end=min(duration, own_end + overlap_seconds),
+            own_start=own_start,
+            own_end=own_end,
+        ))
+    return chunks
+
+
+def extract_chunk(file_path: str, chunk: AudioChunk, output_dir: str) -> str:
+    """从原音频拷贝出一个分片（不重新编码），返回分片路径"""
+    ext = os.path.splitext(file_path)[1] or ".m4a"
+    chunk_path = os.path.join(output_dir, f"chunk_{chunk.index:03d}{ext}")
+    command = [
+        "ffmpeg",
+        "-ss", f"{chunk.start:.3f}",
+        "-i", file_path,
+        "-t", f"{chunk.end - chunk.start:.3f}",
+        "-vn",
+        "-c:a", "copy",
+        chunk_path,
+        "-y",
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout, stderr=result.stderr)
+    return chunk_path
+
+
+def merge_chunk_results(chunks: List[AudioChunk], results: List[TranscriptResult]) -> TranscriptResult:
+    """合并各分片的转写结果：修正时间偏移，并去掉重叠区域的重复片段"""
+    segments: List[TranscriptSegment] = []
+    language = None
+    for chunk, result in zip(chunks, results):
+        language = language or result.language
+        is_last = chunk.index == len(chunks) - 1
+        for seg in result.segments:
+            start = seg.start + chunk.start
+            end = seg.end + chunk.start
+            middle = (start + end) / 2
+            # 只保留落在本分片负责区间内的片段（最后一个分片包含终点）
+            if middle < chunk.own_start or middle > chunk.own_end or (middle == chunk.own_end and not is_last):
+                continue
+            segments.append(TranscriptSegment(start=start, end=end, text=seg.text))
+    segments.sort(key=lambda s: s.start)
+    raw = {"chunks": [{"start": c.start, "end": c.end} for c in chunks]}
+    # 保留路由器记录的转写后端；各分片由不同后端完成时记为 auto
+    backends = {(result.raw or {}).get("transcriber") for result in results}
+    if backends != {None}:
+        raw["transcriber"] = backends.pop() if len(backends) == 1 else "auto"
+    return TranscriptResult(
+        language=language,
+        full_text=" ".join(seg.text for seg in segments).strip(),
+        segments=segments,
+        raw=raw,
+    )
+
+
+class ChunkedTranscriber(Transcriber):
+    """把长音频切成重叠分片并发转写的包装转写器"""
+
+    def __init__(
+        self,
+        inner: Transcriber,
+        chunk_seconds: float = 300,
+        overlap_seconds: float = 2,
+        max_workers: int = 4,
+    ):
+        self.inner = inner
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_workers = max_workers
+
+    def prepare_audio(self, file_path: str) -> str:
+        # 整段音频不需要满足上传限制，各分片在内部转写器中单独准备
+        return file_path
+
+    def _plan(self, file_path: str) -> Optional[List[AudioChunk]]:
+        duration = probe_duration(file_path)
+        if not duration or duration < self.chunk_seconds * 1.5:
+            return None
+        chunks = plan_chunks(duration, detect_silences(file_path), self.chunk_seconds, self.overlap_seconds)
+        logger.info(f"音频时长 {duration:.0f}s，切分为 {len(chunks)} 个分片并发转写")
+        return chunks
+
+    @timeit
+    def transcript(self, file_path: str) -> TranscriptResult:
+        chunks = self._plan(file_path)
+        if not chunks:
+            return self.inner.transcript(file_path)
+
+        work_dir = tempfile.mkdtemp(prefix="asr_chunks_")
+        try:
+            def transcribe_chunk(chunk: AudioChunk) -> TranscriptResult:
+                chunk_path = extract_chunk(file_path, chunk, work_dir)
+                return self.inner.transcript(chunk_path)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="asr-chunk") as pool:
+                results = list(pool.map(transcribe_chunk, chunks))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return merge_chunk_results(chunks, results)
+
+    async def atranscript(self, file_path: str) -> TranscriptResult:
+        chunks = await run_blocking(self._plan, file_path)
+        if not chunks:
+            return await self.inner.atranscript(file_path)
+
+        work_dir = tempfile.mkdtemp(prefix="asr_chunks_")
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def transcribe_chunk(chunk: AudioChunk) -> TranscriptResult:
+            async with semaphore:
+                chunk_path = await run_blocking(extract_chunk, file_path, chunk, work_dir)
+                return await self.inner.atranscript(chunk_path)
+
+        try:
+            results = await asyncio.gather(*(transcribe_chunk(chunk) for chunk in chunks))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return merge_chunk_results(chunks, list(results))
+
+    def on_finish(self, video_path: str, result: TranscriptResult) -> None:
+        self.inner.on_finish(video_path, result)
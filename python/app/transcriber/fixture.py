@@ -0,0 +1,88 @@
+"""
+离线替身转写器（用于测试与基准测试）
+
+不访问网络、不加载模型，结果完全确定：
+    - 优先读取夹具目录中与音频同名的转写结果 {TRANSCRIBER_FIXTURE_DIR}/{音频文件名去扩展名}.json
+      （格式同 TranscriptResult：language / full_text / segments[{start, end, text}]）
+    - 没有夹具时，根据文件名生成固定的合成转写结果
+
+可通过 TRANSCRIBER_FIXTURE_DELAY 模拟每次转写的耗时，以便对笔记流水线做可复现的吞吐量测试。
+
+配置（环境变量）：
+    TRANSCRIBER_FIXTURE_DIR     夹具目录（默认 {DATA_DIR}/transcript_fixtures）
+    TRANSCRIBER_FIXTURE_DELAY   每次转写的模拟耗时（秒，默认 0）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.transcriber.base import Transcriber
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_data_dir
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+TRANSCRIBER_FIXTURE_DIR = os.getenv("TRANSCRIBER_FIXTURE_DIR") or os.path.join(get_data_dir(), "transcript_fixtures")
+TRANSCRIBER_FIXTURE_DELAY = float(os.getenv("TRANSCRIBER_FIXTURE_DELAY", "0"))
+# 合成转写结果的片段数与每段时长（秒）
+SYNTHETIC_SEGMENTS = 12
+SYNTHETIC_SEGMENT_SECONDS = 5.0
+
+
+class FixtureTranscriber(Transcriber):
+    def __init__(self, fixture_dir: Optional[str] = None, delay: Optional[float] = None):
+        self.fixture_dir = Path(fixture_dir or TRANSCRIBER_FIXTURE_DIR)
+        self.delay = TRANSCRIBER_FIXTURE_DELAY if delay is None else delay
+
+    def transcript(self, file_path: str) -> TranscriptResult:
+        if self.delay:
+            time.sleep(self.delay)
+        return self._load(file_path)
+
+    async def atranscript(self, file_path: str) -> TranscriptResult:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._load(file_path)
+
+    def _load(self, file_path: str) -> TranscriptResult:
+        stem = Path(file_path).name.split(".")[0]
+        fixture_path = self.fixture_dir / f"{stem}.json"
+        if fixture_path.exists():
+            data = json.loads(fixture_path.read_text(encoding="utf-8"))
+            segments = [TranscriptSegment(**seg) for seg in data.get("segments", [])]
+            return TranscriptResult(
+                language=data.get("language"),
+                full_text=data.get("full_text") or " ".join(seg.text for seg in segments),
+                segments=segments,
+                raw={"fixture": str(fixture_path)},
+            )
+        logger.info(f"未找到转写夹具 {fixture_path}，使用合成转写结果")
+        return self._synthetic(stem)
+
+    @staticmethod
+    def _synthetic(stem: str) -> TranscriptResult:
+        digest = hashlib.sha256(stem.encode("utf-8")).hexdigest()
+        segments = [
+            TranscriptSegment(
+                start=i * SYNTHETIC_SEGMENT_SECONDS,
+                end=(i + 1) * SYNTHETIC_SEGMENT_SECONDS,
+                text=f"{stem} 第 {i + 1} 段 {digest[i * 4:i * 4 + 4]}",
+            )
+            for i in range(SYNTHETIC_SEGMENTS)
+        ]
+        return TranscriptResult(
+            language="zh",
+            full_text=" ".join(seg.text for seg in segments),
+            segments=segments,
+            raw={"fixture": None},
+        )
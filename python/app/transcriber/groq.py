@@ -1,55 +1,77 @@
 from abc import ABC
 import os
+from typing import Optional
 
 from app.decorators.timeit import timeit
 from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.services.note_config import get_note_config
 from app.services.provider import ProviderService
 from app.transcriber.base import Transcriber
-from openai import OpenAI
-import ffmpeg
-import tempfile
+from app.gpt.client_pool import get_async_openai_client, get_openai_client
+from app.utils.audio_prep import prepare_asr_audio
+from app.utils.blocking_pool import run_blocking
 from dotenv import load_dotenv
 load_dotenv()
 MAX_SIZE_MB = 18
 MAX_SIZE_BYTES = MAX_SIZE_MB * 1024 * 1024
-def compress_audio(input_path: str, target_bitrate='64k') -> str:
-    output_fd, output_path = tempfile.mkstemp(suffix=".mp3")  # 临时输出文件
-    os.close(output_fd)  # 关闭文件描述符，ffmpeg 会用路径操作
-    ffmpeg.input(input_path).output(output_path, audio_bitrate=target_bitrate).run(quiet=True, overwrite_output=True)
-    return output_path
 
 class GroqTranscriber(Transcriber, ABC):
+    # Groq 转写接口的上传大小限制
+    max_upload_bytes = MAX_SIZE_BYTES
 
+    def __init__(self, model: Optional[str] = None):
+        # 转录模型来自进程启动时读取的配置，默认为 whisper-large-v3
+        self.model = model or get_note_config().groq_transcriber_model
 
-    @timeit
-    def transcript(self, file_path: str) -> TranscriptResult:
-        file_size = os.path.getsize(file_path)
-        if file_size > MAX_SIZE_BYTES:
-            print(f"文件超过 {MAX_SIZE_MB}MB，开始压缩（当前 {round(file_size / (1024 * 1024), 2)}MB）...")
-            file_path = compress_audio(file_path)
-            print(f"压缩完成，临时路径：{file_path}")
-        provider = ProviderService.get_provider_by_id('groq')
-
+    def prepare_audio(self, file_path: str) -> str:
+        # 能直传就直传，否则转为 16kHz 单声道低码率音频以满足上传限制（结果按源文件缓存）
+        return prepare_asr_audio(file_path, max_bytes=self.max_upload_bytes)
 
+    @staticmethod
+    def _get_provider() -> dict:
+        provider = ProviderService.get_provider_by_id('groq')
         if not provider:
             raise Exception("Groq 供应商未配置,请配置以后使用。")
-        client = OpenAI(
-            api_key=provider.get('api_key'),
-            base_url=provider.get('base_url')
-        )
+        return provider
+
+    @staticmethod
+    def _read_audio(file_path: str) -> bytes:
+        with open(file_path, "rb") as file:
+            return file.read()
+
+    @timeit
+    def transcript(self, file_path: str) -> TranscriptResult:
+        file_path = self.prepare_audio(file_path)
+        provider = self._get_provider()
+        client = get_openai_client(api_key=provider.get('api_key'), base_url=provider.get('base_url'))
         filename = file_path
 
-        # 获取 Groq 转录模型，默认为 whisper-large-v3
-        groq_model = os.getenv('GROQ_TRANSCRIBER_MODEL', 'whisper-large-v3')
-        
         with open(filename, "rb") as file:
             transcription = client.audio.transcriptions.create(
                 file=(filename, file.read()),
-                model=groq_model,
+                model=self.model,
                 response_format="verbose_json",
             )
             print(transcription.text)
         print(transcription)
+        return self._to_result(transcription)
+
+    async def atranscript(self, file_path: str) -> TranscriptResult:
+        # 压缩、读文件和查询供应商配置是阻塞操作，放到线程池；上传与识别走共享连接池的异步客户端
+        file_path = await run_blocking(self.prepare_audio, file_path)
+        provider = await run_blocking(self._get_provider)
+        client = get_async_openai_client(api_key=provider.get('api_key'), base_url=provider.get('base_url'))
+
+        audio_bytes = await run_blocking(self._read_audio, file_path)
+        transcription = await client.audio.transcriptions.create(
+            file=(file_path, audio_bytes),
+            model=self.model,
+            response_format="verbose_json",
+        )
+        return self._to_result(transcription)
+
+    @staticmethod
+    def _to_result(transcription) -> TranscriptResult:
         segments = []
         full_text = ""
 
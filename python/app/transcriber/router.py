@@ -0,0 +1,134 @@
+"""
+转写路由器（TRANSCRIBER_TYPE=auto）
+
+在多个已注册的转录器后端之间按文件选择后端：
+    1. 优先选择能直接接受该文件大小、且支持指定语言的后端
+    2. 同等条件下选择当前负载（进行中的转写数 / 并发上限）最低的后端，未满载的优先
+    3. 所选后端创建失败或转写出错时，按上述顺序回退到下一个后端
+
+后端列表由 TRANSCRIBER_ROUTE_BACKENDS 配置（逗号分隔，默认 groq,fast-whisper）。
+实际完成转写的后端记录在 TranscriptResult.raw["transcriber"] 中，转写缓存按它区分。
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.models.transcriber_model import TranscriptResult
+from app.transcriber.base import Transcriber
+from app.transcriber.transcriber_provider import get_capabilities, get_transcriber, list_transcribers
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _mark_backend(result: TranscriptResult, name: str) -> TranscriptResult:
+    """在转写结果中记录实际完成转写的后端"""
+    result.raw = {**(result.raw or {}), "transcriber": name}
+    return result
+
+
+class TranscriberRouter(Transcriber):
+    def __init__(self, backends: Sequence[str]):
+        # 未注册的后端（如配置拼写错误）会让 select 中的能力查询失败，创建时直接剔除
+        known = set(list_transcribers())
+        for name in backends:
+            if name not in known:
+                logger.warning(f"未注册的转写后端 {name}，已从路由中移除")
+        backends = [name for name in backends if name in known]
+        if not backends:
+            raise ValueError("转写路由器至少需要一个后端")
+        self.backends = list(backends)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, int] = {name: 0 for name in self.backends}
+        self._failures: Dict[str, int] = {name: 0 for name in self.backends}
+        # 创建失败的后端（例如未安装 faster-whisper），之后不再尝试
+        self._unavailable: set = set()
+        logger.info(f"转写路由器后端: {', '.join(self.backends)}")
+
+    def select(self, file_size: int, language: Optional[str] = None) -> List[str]:
+        """
+        按优先级返回候选后端列表
+
+        :param file_size: 音频文件大小（字节）
+        :param language: 音频语言（可选）
+        """
+        with self._lock:
+            inflight = dict(self._inflight)
+            unavailable = set(self._unavailable)
+
+        def rank(item):
+            index, name = item
+            caps = get_capabilities(name)
+            fits = caps.max_file_bytes is None or file_size <= caps.max_file_bytes
+            language_ok = language is None or caps.languages is None or language in caps.languages
+            load = inflight[name] / max(1, caps.max_concurrency)
+            return (not language_ok, not fits, load >= 1, load, index)
+
+        candidates = [(i, name) for i, name in enumerate(self.backends) if name not in unavailable]
+        return [name for _, name in sorted(candidates, key=rank)]
+
+    @contextmanager
+    def _track(self, name: str):
+        with self._lock:
+            self._inflight[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight[name] -= 1
+
+    def _backend(self, name: str) -> Optional[Transcriber]:
+        try:
+            return get_transcriber(name)
+        except Exception as e:
+            logger.error(f"转写后端 {name} 不可用，已从路由中移除: {e}")
+            with self._lock:
+                self._unavailable.add(name)
+            return None
+
+    def _record_failure(self, name: str, file_path: str, exc: Exception) -> None:
+        with self._lock:
+            self._failures[name] += 1
+        logger.warning(f"转写后端 {name} 处理 {file_path} 失败，尝试下一个后端: {exc}")
+
+    def transcript(self, file_path: str) -> TranscriptResult:
+        last_exc: Optional[Exception] = None
+        for name in self.select(os.path.getsize(file_path)):
+            backend = self._backend(name)
+            if backend is None:
+                continue
+            try:
+                with self._track(name):
+                    return _mark_backend(backend.transcript(file_path), name)
+            except Exception as e:
+                self._record_failure(name, file_path, e)
+                last_exc = e
+        raise last_exc or RuntimeError("没有可用的转写后端")
+
+    async def atranscript(self, file_path: str) -> TranscriptResult:
+        last_exc: Optional[Exception] = None
+        for name in self.select(os.path.getsize(file_path)):
+            backend = self._backend(name)
+            if backend is None:
+                continue
+            try:
+                with self._track(name):
+                    return _mark_backend(await backend.atranscript(file_path), name)
+            except Exception as e:
+                self._record_failure(name, file_path, e)
+                last_exc = e
+        raise last_exc or RuntimeError("没有可用的转写后端")
+
+    def stats(self) -> Dict[str, Any]:
+        """各后端的进行中转写数、失败次数和可用状态"""
+        with self._lock:
+            return {
+                name: {
+                    "inflight": self._inflight[name],
+                    "failures": self._failures[name],
+                    "available": name not in self._unavailable,
+                }
+                for name in self.backends
+            }
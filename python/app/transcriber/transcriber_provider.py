@@ -1,45 +1,161 @@
 """
 转录器提供者/工厂模块
 管理不同类型的转录器实例，提供统一的获取接口
-目前只支持 Groq 转录器
+
+转录器以名称注册到注册表中，并声明能力（直接接受的文件大小上限、并发上限、支持语言等）：
+    groq          云端 API（Groq）
+    fast-whisper  本地 CPU 转写（faster-whisper，仅在使用时导入）
+    fixture       离线替身，读取夹具转写结果，用于测试与基准测试
+    auto          路由器：按文件大小和各后端当前负载选择后端，失败时回退到下一个后端
 """
 
+import os
+import threading
+from dataclasses import dataclass
 from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
 
-from app.transcriber.groq import GroqTranscriber
+from app.services.note_config import get_note_config
+from app.transcriber.groq import GroqTranscriber, MAX_SIZE_BYTES
 from app.transcriber.base import Transcriber
 from app.utils.logger import get_logger
 
+load_dotenv()
+
 logger = get_logger(__name__)
 
+# Groq 接口同时转写的请求数上限（供路由器计算负载）
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+
 class TranscriberType(str, Enum):
     """转录器类型枚举"""
     GROQ = "groq"
+    FAST_WHISPER = "fast-whisper"
+    FIXTURE = "fixture"
+    AUTO = "auto"
+
+
+@dataclass(frozen=True)
+class TranscriberCapabilities:
+    """转录器能力声明"""
+    max_file_bytes: Optional[int] = None              # 不经预处理可直接接受的最大文件（None 为不限）
+    max_concurrency: int = 1                          # 同时转写的文件数上限
+    languages: Optional[Tuple[str, ...]] = None       # 支持的语言（None 为不限）
+    local: bool = False                               # 是否为本地转写（不依赖网络）
+
+
+@dataclass(frozen=True)
+class TranscriberSpec:
+    name: str
+    factory: Callable[[], Transcriber]
+    capabilities: TranscriberCapabilities
+
 
 logger.info('初始化转录服务提供器')
 
-# 转录器单例缓存
-_transcribers = {
-    TranscriberType.GROQ: None,
-}
+# 转录器注册表：名称 -> 创建方式与能力
+_registry: Dict[str, TranscriberSpec] = {}
+# 转录器单例缓存：名称 -> 实例
+_transcribers: Dict[str, Optional[Transcriber]] = {}
+_transcribers_lock = threading.Lock()
+
+
+def register_transcriber(name: str, factory: Callable[[], Transcriber], capabilities: TranscriberCapabilities) -> None:
+    """
+    注册一个转录器后端（同名注册会覆盖之前的注册和已创建的实例）
+
+    参数:
+        name: 转录器类型名称
+        factory: 无参的创建函数，首次使用时调用
+        capabilities: 能力声明
+    """
+    with _transcribers_lock:
+        _registry[name] = TranscriberSpec(name=name, factory=factory, capabilities=capabilities)
+        _transcribers[name] = None
+
+
+def get_capabilities(name: str) -> TranscriberCapabilities:
+    """获取已注册转录器的能力声明"""
+    return _get_spec(name).capabilities
+
+
+def list_transcribers() -> List[str]:
+    """返回所有已注册的转录器名称"""
+    return list(_registry.keys())
+
+
+def _get_spec(name: str) -> TranscriberSpec:
+    spec = _registry.get(name)
+    if spec is None:
+        raise ValueError(f'未知转录器类型 "{name}"，可用类型: {", ".join(_registry)}')
+    return spec
+
 
 # 公共实例初始化函数
-def _init_transcriber(key: TranscriberType, cls, *args, **kwargs):
-    """初始化转录器实例（单例模式）"""
-    if _transcribers[key] is None:
-        logger.info(f'创建 {cls.__name__} 实例: {key}')
-        try:
-            _transcribers[key] = cls(*args, **kwargs)
-            logger.info(f'{cls.__name__} 创建成功')
-        except Exception as e:
-            logger.error(f"{cls.__name__} 创建失败: {e}")
-            raise
-    return _transcribers[key]
+def _init_transcriber(name: str) -> Transcriber:
+    """初始化转录器实例（单例模式，本地模型只加载一次）"""
+    if _transcribers.get(name) is None:
+        spec = _get_spec(name)
+        with _transcribers_lock:
+            if _transcribers.get(name) is None:
+                logger.info(f'创建转录器实例: {name}')
+                try:
+                    _transcribers[name] = spec.factory()
+                    logger.info(f'{type(_transcribers[name]).__name__} 创建成功')
+                except Exception as e:
+                    logger.error(f"转录器 {name} 创建失败: {e}")
+                    raise
+    return _transcribers[name]
+
+
+def _create_fast_whisper() -> Transcriber:
+    # 仅在使用时导入 faster-whisper
+    from app.transcriber.whisper import FasterWhisperTranscriber
+    return FasterWhisperTranscriber()
+
+
+def _create_fixture() -> Transcriber:
+    from app.transcriber.fixture import FixtureTranscriber
+    return FixtureTranscriber()
+
+
+def _create_router() -> Transcriber:
+    from app.transcriber.router import TranscriberRouter
+    return TranscriberRouter(get_note_config().transcriber_backends)
+
+
+register_transcriber(
+    TranscriberType.GROQ.value,
+    GroqTranscriber,
+    TranscriberCapabilities(max_file_bytes=MAX_SIZE_BYTES, max_concurrency=GROQ_MAX_CONCURRENCY),
+)
+register_transcriber(
+    TranscriberType.FAST_WHISPER.value,
+    _create_fast_whisper,
+    TranscriberCapabilities(max_concurrency=max(1, get_note_config().whisper_num_workers), local=True),
+)
+register_transcriber(
+    TranscriberType.FIXTURE.value,
+    _create_fixture,
+    TranscriberCapabilities(max_concurrency=64, local=True),
+)
+register_transcriber(
+    TranscriberType.AUTO.value,
+    _create_router,
+    TranscriberCapabilities(max_concurrency=GROQ_MAX_CONCURRENCY + max(1, get_note_config().whisper_num_workers)),
+)
+
 
 # 各类型获取方法
 def get_groq_transcriber():
     """获取 Groq 转录器实例"""
-    return _init_transcriber(TranscriberType.GROQ, GroqTranscriber)
+    return _init_transcriber(TranscriberType.GROQ.value)
+
+def get_fast_whisper_transcriber():
+    """获取 faster-whisper 本地转录器实例"""
+    return _init_transcriber(TranscriberType.FAST_WHISPER.value)
 
 # 通用入口
 def get_transcriber(transcriber_type: str = "groq") -> Transcriber:
@@ -47,22 +163,13 @@ def get_transcriber(transcriber_type: str = "groq") -> Transcriber:
     获取指定类型的转录器实例
     
     参数:
-        transcriber_type: 转录器类型，目前只支持 "groq"
+        transcriber_type: 转录器类型，见 list_transcribers()
     
     返回:
         对应类型的转录器实例
+    
+    异常:
+        ValueError: 未注册的转录器类型
     """
     logger.info(f'请求转录器类型: {transcriber_type}')
-    
-    # 统一转换为小写
-    transcriber_type = transcriber_type.lower()
-    
-    # 如果请求的是 groq 或未知类型，都使用 Groq
-    if transcriber_type == "groq" or transcriber_type not in [t.value for t in TranscriberType]:
-        if transcriber_type != "groq":
-            logger.warning(f'未知转录器类型 "{transcriber_type}"，使用 Groq 作为默认')
-        return get_groq_transcriber()
-    
-    # 理论上不会到达这里，但为了完整性保留
-    logger.warning(f'未识别转录器类型 "{transcriber_type}"，使用 Groq 作为默认')
-    return get_groq_transcriber()
+    return _init_transcriber(transcriber_type.lower())
@@ -0,0 +1,114 @@
+"""
+本地 CPU 转写（faster-whisper / CTranslate2）
+
+模型在创建转写器时加载一次（默认 int8 量化），之后常驻内存。
+转写请求进入队列，由 num_workers 个工作线程取出执行：CTranslate2 支持多个线程同时调用同一模型，
+每个文件内部再用 BatchedInferencePipeline 把 VAD 切出的语音段按 batch_size 成批推理。
+不依赖网络，不受 API 限流和按分钟计费影响，也可用于离线基准测试。
+
+配置（环境变量）：
+    WHISPER_MODEL_SIZE      模型名称或本地路径（默认 base）
+    WHISPER_DEVICE          cpu（默认）/ cuda / auto
+    WHISPER_COMPUTE_TYPE    计算精度（默认 int8）
+    WHISPER_CPU_THREADS     每个工作线程使用的 CPU 线程数（默认 0，由 CTranslate2 决定）
+    WHISPER_NUM_WORKERS     同时转写的文件数（默认 1）
+    WHISPER_BATCH_SIZE      单个文件内批量推理的语音段数（默认 8，1 表示不批量）
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+from app.decorators.timeit import timeit
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.services.note_config import get_note_config
+from app.transcriber.base import Transcriber
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_model_dir
+
+logger = get_logger(__name__)
+
+
+class FasterWhisperTranscriber(Transcriber):
+    def __init__(
+        self,
+        model_size: Optional[str] = None,
+        device: Optional[str] = None,
+        compute_type: Optional[str] = None,
+        cpu_threads: Optional[int] = None,
+        num_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        config = get_note_config()
+        self.model_size = model_size or config.whisper_model_size
+        self.batch_size = batch_size or config.whisper_batch_size
+        self.num_workers = max(1, num_workers or config.whisper_num_workers)
+
+        logger.info(f"加载 faster-whisper 模型: {self.model_size}（{compute_type or config.whisper_compute_type}）")
+        self.model = WhisperModel(
+            self.model_size,
+            device=device or config.whisper_device,
+            compute_type=compute_type or config.whisper_compute_type,
+            cpu_threads=cpu_threads if cpu_threads is not None else config.whisper_cpu_threads,
+            num_workers=self.num_workers,
+            download_root=get_model_dir("whisper"),
+        )
+        self.pipeline = BatchedInferencePipeline(model=self.model) if self.batch_size > 1 else None
+
+        # 待转写的 (文件路径, Future) 队列
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"whisper-worker-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        logger.info(f"faster-whisper 已就绪（工作线程 {self.num_workers}，batch_size {self.batch_size}）")
+
+    def submit(self, file_path: str) -> Future:
+        """提交一个转写请求，返回结果为 TranscriptResult 的 Future"""
+        future: Future = Future()
+        self._queue.put((file_path, future))
+        return future
+
+    @timeit
+    def transcript(self, file_path: str) -> TranscriptResult:
+        return self.submit(file_path).result()
+
+    async def atranscript(self, file_path: str) -> TranscriptResult:
+        # 推理在工作线程中进行，这里只等待 Future，不占用阻塞任务线程池
+        return await asyncio.wrap_future(self.submit(file_path))
+
+    def _worker_loop(self) -> None:
+        while True:
+            file_path, future = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._run(file_path))
+            except BaseException as exc:
+                logger.error(f"faster-whisper 转写失败 ({file_path}): {exc}")
+                future.set_exception(exc)
+
+    def _run(self, file_path: str) -> TranscriptResult:
+        if self.pipeline:
+            segments_iter, info = self.pipeline.transcribe(file_path, batch_size=self.batch_size)
+        else:
+            segments_iter, info = self.model.transcribe(file_path, vad_filter=True)
+
+        segments = []
+        for seg in segments_iter:
+            text = seg.text.strip()
+            if text:
+                segments.append(TranscriptSegment(start=seg.start, end=seg.end, text=text))
+
+        return TranscriptResult(
+            language=info.language,
+            full_text=" ".join(seg.text for seg in segments),
+            segments=segments,
+            raw={"language_probability": info.language_probability, "duration": info.duration},
+        )
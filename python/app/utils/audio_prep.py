@@ -0,0 +1,146 @@
+"""
+转写前的音频准备
+
+下载得到的音频（通常是 B 站原始 m4a）在转写前只处理一次，产出一个适合 ASR 的音频文件：
+    - passthrough：格式转写接口可直接接受且大小在上传限制以内时，原样使用，不调用 ffmpeg
+    - 转码：否则转为单声道、16 kHz、低码率的 Opus（ogg）或 AAC（m4a），码率按时长计算以保证不超过上传限制
+
+转码结果保存在源文件旁（{stem}.asr.ogg / {stem}.asr.m4a），同一视频再次转写时直接复用，
+每个源文件的选择结果同时缓存在进程内（按最近使用保留有限条数），避免重复探测时长。
+
+配置（环境变量）：
+    ASR_AUDIO_MODE       auto（默认，能直传就直传）或 always（总是转码为低码率音频，减少上传字节）
+    ASR_AUDIO_CODEC      转码格式：opus（默认）或 aac
+    ASR_AUDIO_BITRATE    转码目标码率（kbps，默认 24；超长音频会自动降低以满足上传限制）
+"""
+
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+ASR_AUDIO_MODE = os.getenv("ASR_AUDIO_MODE", "auto").lower()
+ASR_AUDIO_CODEC = os.getenv("ASR_AUDIO_CODEC", "opus").lower()
+ASR_AUDIO_BITRATE = int(os.getenv("ASR_AUDIO_BITRATE", "24"))
+# Opus 在语音场景下可用的最低码率（kbps）
+MIN_BITRATE_KBPS = 6
+# 为容器开销预留的余量
+SIZE_SAFETY_RATIO = 0.9
+
+# 转写接口可直接接受的音频格式
+PASSTHROUGH_EXTENSIONS = (".m4a", ".mp3", ".ogg", ".opus", ".wav", ".webm", ".flac")
+
+# codec -> (ffmpeg 编码器, 文件扩展名)
+CODECS = {
+    "opus": ("libopus", ".ogg"),
+    "aac": ("aac", ".m4a"),
+}
+
+# (源文件绝对路径, 源文件大小, 上传限制) -> 实际用于转写的音频路径，按最近使用保留 MAX_CHOICES 条
+# （分片转写的每个分片都是新的临时文件，不限制数量会随运行时间无限增长）
+_choices: "OrderedDict[Tuple[str, int, Optional[int]], str]" = OrderedDict()
+_choices_lock = threading.Lock()
+MAX_CHOICES = 1024
+
+
+def prepare_asr_audio(file_path: str, max_bytes: Optional[int] = None, duration: Optional[float] = None) -> str:
+    """
+    返回用于转写的音频路径（原文件或转码后的文件）
+
+    :param file_path: 下载得到的音频路径
+    :param max_bytes: 转写接口的上传大小限制（None 表示不限制）
+    :param duration: 音频时长（秒，可选；未提供时用 ffprobe 读取）
+    :return: 实际用于转写的音频路径
+    """
+    source = os.path.abspath(file_path)
+    key = (source, os.path.getsize(source), max_bytes)
+    with _choices_lock:
+        chosen = _choices.get(key)
+        if chosen:
+            _choices.move_to_end(key)
+    if chosen and os.path.exists(chosen):
+        return chosen
+
+    chosen = _choose(source, max_bytes, duration)
+    with _choices_lock:
+        _choices[key] = chosen
+        _choices.move_to_end(key)
+        while len(_choices) > MAX_CHOICES:
+            _choices.popitem(last=False)
+    return chosen
+
+
+def _choose(source: str, max_bytes: Optional[int], duration: Optional[float]) -> str:
+    size = os.path.getsize(source)
+    fits = max_bytes is None or size <= max_bytes
+    # 已经是转码产物（例如预处理阶段之后转写器再次调用）时不重复转码
+    is_artifact = any(source.endswith(f".asr{ext}") for _, ext in CODECS.values())
+    if fits and (is_artifact or (ASR_AUDIO_MODE != "always" and source.lower().endswith(PASSTHROUGH_EXTENSIONS))):
+        logger.info(f"音频直接用于转写（{round(size / (1024 * 1024), 2)}MB）：{source}")
+        return source
+
+    encoder, ext = CODECS.get(ASR_AUDIO_CODEC, CODECS["opus"])
+    target = str(Path(source).with_suffix(f".asr{ext}"))
+    # 之前已转码过且满足当前上传限制，直接复用
+    if os.path.exists(target) and (max_bytes is None or os.path.getsize(target) <= max_bytes):
+        return target
+
+    bitrate = ASR_AUDIO_BITRATE
+    if max_bytes is not None:
+        duration = duration or probe_duration(source)
+        if duration:
+            max_kbps = int(max_bytes * 8 * SIZE_SAFETY_RATIO / duration / 1000)
+            bitrate = max(MIN_BITRATE_KBPS, min(bitrate, max_kbps))
+
+    logger.info(f"转码音频用于转写（{encoder}, 16kHz 单声道, {bitrate}kbps）：{source}")
+    _transcode(source, target, encoder, bitrate)
+    logger.info(f"音频转码完成：{round(size / (1024 * 1024), 2)}MB -> {round(os.path.getsize(target) / (1024 * 1024), 2)}MB")
+    return target
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """用 ffprobe 读取音频时长（秒），失败时返回 None"""
+    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        logger.warning(f"读取音频时长失败：{result.stderr}")
+        return None
+    try:
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+def _transcode(source: str, target: str, encoder: str, bitrate: int) -> None:
+    # 先写临时文件再改名，避免并发或中断时留下不完整的产物；
+    # 临时文件名带进程和线程标识，同一源文件被并发转码时互不覆盖
+    tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.part"
+    command = [
+        "ffmpeg",
+        "-i", source,
+        "-vn",
+        "-ac", "1",
+        "-ar", "16000",
+        "-c:a", encoder,
+        "-b:a", f"{bitrate}k",
+        "-f", "ogg" if target.endswith(".ogg") else "mp4",
+        tmp_path,
+        "-y",
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout, stderr=result.stderr)
+    os.replace(tmp_path, target)
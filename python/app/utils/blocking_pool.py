@@ -0,0 +1,64 @@
+"""
+阻塞任务线程池
+
+yt-dlp 下载、ffmpeg 转码/截图、数据库读写等阻塞操作不能直接在事件循环中执行。
+异步流程统一通过 run_blocking() 把它们提交到一个有界线程池，
+线程数（BLOCKING_POOL_WORKERS，默认 8）即同时运行的下载/ffmpeg 子进程上限。
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+BLOCKING_POOL_WORKERS = int(os.getenv("BLOCKING_POOL_WORKERS", "8"))
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """获取进程内共享的阻塞任务线程池（单例）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, BLOCKING_POOL_WORKERS),
+                    thread_name_prefix="blocking",
+                )
+                logger.info(f"阻塞任务线程池已创建，线程数: {BLOCKING_POOL_WORKERS}")
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    在共享线程池中执行阻塞函数并等待结果
+
+    :param fn: 阻塞函数
+    :return: fn 的返回值；fn 抛出的异常会原样抛出
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_blocking_executor(wait: bool = False) -> None:
+    """应用关闭时停止线程池"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+        logger.info("阻塞任务线程池已关闭")
@@ -1,5 +1,6 @@
 from typing import Optional
 from app.models.model_config import ModelConfig
+from app.services.config_cache import get_config_cache
 from app.services.provider import ProviderService
 from app.gpt.gpt_factory import GPTFactory
 from app.utils.logger import get_logger
@@ -11,7 +12,8 @@ async def generate_conversation_title(
     question: str,
     answer: str,
     model_name: Optional[str] = None,
-    provider_id: Optional[str] = None
+    provider_id: Optional[str] = None,
+    use_cache: bool = True
 ) -> str:
     """
     使用LLM生成对话标题（10-20字）
@@ -21,6 +23,7 @@ async def generate_conversation_title(
         answer: 助手回答（只使用前200字符）
         model_name: 模型名称（可选）
         provider_id: 提供商ID（可选）
+        use_cache: 是否使用 LLM 响应缓存（默认 True）
         
     Returns:
         str: 生成的标题（如果生成失败，返回默认标题）
@@ -60,16 +63,12 @@ async def generate_conversation_title(
             except Exception as e:
                 logger.warning(f"[generate_conversation_title] 获取默认配置失败: {e}，将尝试使用其他方式")
         
-        # 获取提供商
-        providers = ProviderService.get_all_providers_safe()
-        provider = None
-        
-        if provider_id:
-            provider = next((p for p in providers if p.get("id") == provider_id), None)
+        # 获取提供商（读取进程内配置缓存）
+        provider = ProviderService.get_provider_by_id(provider_id) if provider_id else None
         
         # 如果找不到指定的provider，优先选择 qwen，否则使用第一个enabled的provider
         if not provider:
-            enabled_providers = [p for p in providers if p.get("enabled", 1) == 1]
+            enabled_providers = ProviderService.get_enabled_providers()
             if enabled_providers:
                 # 优先选择 qwen 提供商
                 qwen_provider = next((p for p in enabled_providers if p.get("id", "").lower() == "qwen"), None)
@@ -77,24 +76,16 @@ async def generate_conversation_title(
                     provider = qwen_provider
                     # 如果没有指定 model_name，尝试使用 qwen 相关的模型
                     if not model_name:
-                        # 尝试从数据库中获取 qwen 的模型
-                        from app.db.engine import get_db
-                        from sqlalchemy import text
-                        db = next(get_db())
+                        # 尝试从配置缓存中获取 qwen 的模型
                         try:
-                            qwen_models = db.execute(
-                                text("SELECT model_name FROM models WHERE provider_id = :provider_id ORDER BY id LIMIT 1"),
-                                {"provider_id": "qwen"}
-                            ).fetchall()
+                            qwen_models = get_config_cache().get_models("qwen")
                             if qwen_models:
-                                model_name = qwen_models[0][0]
+                                model_name = qwen_models[0]["model_name"]
                             else:
                                 model_name = "qwen-max"  # 默认 qwen 模型
                         except Exception as e:
                             logger.warning(f"获取 qwen 模型失败: {e}，使用默认模型")
                             model_name = "qwen-max"
-                        finally:
-                            db.close()
                 else:
                     provider = enabled_providers[0]
                     model_name = model_name or "gpt-3.5-turbo"  # 默认模型
@@ -129,16 +120,16 @@ async def generate_conversation_title(
         # 获取GPT实例
         gpt = GPTFactory.from_config(config)
         
-        # 直接使用client发送请求
+        # 相同的问答再次生成标题时直接读取 LLM 响应缓存
         messages = [{"role": "user", "content": prompt}]
-        response = gpt.client.chat.completions.create(
-            model=gpt.model,
-            messages=messages,
+        title = await gpt.acomplete(
+            messages,
             temperature=0.7,
+            use_cache=use_cache,
+            usage_scope="title",
             max_tokens=50  # 标题不需要太多token
         )
         
-        title = response.choices[0].message.content.strip()
         logger.info(f"[generate_conversation_title] ✓ 生成的标题: {title}")
         # 移除可能的markdown格式
         title = title.lstrip('#').strip()
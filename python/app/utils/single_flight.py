@@ -0,0 +1,183 @@
+"""
+Single-flight 去重工具
+
+同一个 key 的调用在执行期间只会真正执行一次：第一个调用者负责执行，
+执行期间到达的其他调用者直接等待同一个 Future 的结果，而不是重复执行。
+执行结束后 key 会被移除，之后的调用会重新执行（跨请求的结果复用由产物缓存负责）。
+
+SingleFlight 用于线程，AsyncSingleFlight 用于同一事件循环内的协程。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    """线程安全的 single-flight 注册表"""
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.executed = 0  # 实际执行次数
+        self.shared = 0  # 挂靠到已有执行上的次数
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        执行 fn(*args, **kwargs)；若相同 key 正在执行，则等待其结果
+
+        :param key: 去重键
+        :param fn: 需要执行的函数
+        :return: (结果, 是否为共享结果)；fn 抛出的异常会原样传递给所有等待者
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            logger.info(f"[{self.name}] 挂靠到执行中的任务: {key}")
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result, False
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    self._inflight.pop(key, None)
+
+    def share(self, key: Hashable, start: Callable[[], Future]) -> Tuple[Future, bool]:
+        """
+        异步版本：start() 负责提交任务并返回 Future；若相同 key 正在执行，则挂靠到执行中的任务
+
+        每个调用者拿到各自的代理 Future：某个调用者取消自己的 Future（如客户端断开）
+        不会影响执行中的任务，也不会影响其他调用者
+
+        :param key: 去重键
+        :param start: 提交任务的函数，仅在没有执行中的相同 key 时被调用
+        :return: (代理 Future, 是否为共享结果)
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                logger.info(f"[{self.name}] 挂靠到执行中的任务: {key}")
+                return _proxy(future), True
+            future = Future()
+            self._inflight[key] = future
+            self.executed += 1
+
+        def _release():
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    self._inflight.pop(key, None)
+
+        def _on_done(inner: Future):
+            _release()
+            if future.done():
+                return
+            _copy_state(inner, future)
+
+        try:
+            inner_future = start()
+        except BaseException as exc:
+            _release()
+            future.set_exception(exc)
+            raise
+        proxy = _proxy(future)
+        inner_future.add_done_callback(_on_done)
+        return proxy, False
+
+    def inflight_count(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "inflight": len(self._inflight),
+                "executed": self.executed,
+                "shared": self.shared,
+            }
+
+
+class AsyncSingleFlight:
+    """协程版本的 single-flight 注册表（只能在同一个事件循环中使用）"""
+
+    def __init__(self, name: str = "async_single_flight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        执行 await fn(*args, **kwargs)；若相同 key 正在执行，则等待其结果
+
+        fn 在注册表自己创建的 Task 中执行，所有调用者（包括第一个）都通过 shield 等待：
+        任何一个调用者被取消都不会取消执行中的任务，也不会影响其他调用者
+
+        :return: (结果, 是否为共享结果)
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+            logger.info(f"[{self.name}] 挂靠到执行中的任务: {key}")
+        else:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            self.executed += 1
+            task.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(task), shared
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key, None)
+        # 所有等待者都已取消时避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "executed": self.executed,
+            "shared": self.shared,
+        }
+
+
+def _copy_state(source: Future, target: Future) -> None:
+    """把 source 的结果 / 异常 / 取消状态复制到 target（target 已完成时忽略）"""
+    try:
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+    except InvalidStateError:
+        # target 已被调用者取消
+        pass
+
+
+def _proxy(source: Future) -> Future:
+    """创建跟随 source 完成的代理 Future；取消代理不会影响 source"""
+    proxy = Future()
+    source.add_done_callback(lambda done: _copy_state(done, proxy))
+    return proxy
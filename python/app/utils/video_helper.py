@@ -1,3 +1,4 @@
+import asyncio
 import shutil
 from pathlib import Path
 
@@ -5,6 +6,8 @@ from dotenv import load_dotenv
 import subprocess
 import os
 import uuid
+
+from app.utils.blocking_pool import run_blocking
 load_dotenv()
 api_path = os.getenv("API_BASE_URL", "http://localhost")
 BACKEND_PORT= os.getenv("BACKEND_PORT", 8483)
@@ -12,10 +15,7 @@ BACKEND_PORT= os.getenv("BACKEND_PORT", 8483)
 BACKEND_BASE_URL = f"{api_path}:{BACKEND_PORT}"
 
 from typing import Optional
-def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index: int) -> str:
-    """
-    使用 ffmpeg 生成截图，返回生成图片路径
-    """
+def _screenshot_command(video_path: str, output_dir: str, index: int, timestamp: int):
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -31,6 +31,14 @@ def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index:
         str(output_path),
         "-y"
     ]
+    return command, output_path
+
+
+def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index: int) -> str:
+    """
+    使用 ffmpeg 生成截图，返回生成图片路径
+    """
+    command, output_path = _screenshot_command(video_path, output_dir, index, timestamp)
 
     print("Running command:", command)
     result = subprocess.run(command, capture_output=True, text=True, check=False)
@@ -43,6 +51,35 @@ def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index:
     return str(output_path)
 
 
+async def agenerate_screenshot(video_path: str, output_dir: str, timestamp: int, index: int) -> str:
+    """
+    generate_screenshot 的异步版本：以异步子进程运行 ffmpeg，不阻塞事件循环
+    当前事件循环不支持子进程时（如 Windows 的 SelectorEventLoop），退回到阻塞任务线程池中执行
+    """
+    command, output_path = _screenshot_command(video_path, output_dir, index, timestamp)
+
+    print("Running command:", command)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except NotImplementedError:
+        return await run_blocking(generate_screenshot, video_path, output_dir, timestamp, index)
+
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        stderr_text = stderr.decode("utf-8", errors="replace")
+        print(f"ffmpeg 执行失败 (返回码: {process.returncode}): {stderr_text}")
+        raise subprocess.CalledProcessError(
+            process.returncode, command,
+            output=stdout.decode("utf-8", errors="replace"), stderr=stderr_text,
+        )
+
+    return str(output_path)
+
+
 
 def save_cover_to_static(local_cover_path: str, subfolder: Optional[str] = "cover") -> str:
     """
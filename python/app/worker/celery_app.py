@@ -0,0 +1,95 @@
+"""
+Celery 应用（可选的笔记生成 worker 层）
+
+NOTE_ENGINE=celery 时，note_generation_node 把每个视频的笔记生成任务发送到 Celery worker，
+下载、转写和 LLM 调用都在 worker 进程中执行，API 进程只等待结果，可以按需横向扩展 worker。
+
+配置（环境变量）：
+    CELERY_BROKER_URL        消息代理，默认 filesystem://（本地测试用，基于目录交换消息）；
+                             生产环境可使用 redis://... 或 amqp://...；
+                             memory:// 仅在 API 与 worker 位于同一进程时可用
+    CELERY_RESULT_BACKEND    结果存储，默认 file://{CELERY_DATA_DIR}/results
+    CELERY_DATA_DIR          filesystem 代理和文件结果存储的目录，默认 {NOTE_OUTPUT_DIR}/celery
+    CELERY_NOTE_QUEUE        笔记任务队列名，默认 notes
+
+任务结果只是指向产物缓存的指针，笔记、转写等内容写入 ARTIFACT_CACHE_DIR；
+多机部署时 API 与 worker 需要共享该目录（以及数据库）。
+
+启动 worker（在 python 目录下）：
+    celery -A app.worker.celery_app worker -Q notes -l info
+"""
+
+import os
+from pathlib import Path
+
+from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+CELERY_DATA_DIR = Path(
+    os.getenv("CELERY_DATA_DIR", os.path.join(os.getenv("NOTE_OUTPUT_DIR", "note_results"), "celery"))
+).resolve()
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "filesystem://")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", f"file://{CELERY_DATA_DIR / 'results'}")
+CELERY_NOTE_QUEUE = os.getenv("CELERY_NOTE_QUEUE", "notes")
+
+celery_app = Celery(
+    "framescope",
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
+    include=["app.worker.tasks"],
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_default_queue=CELERY_NOTE_QUEUE,
+    # 笔记任务耗时长：worker 崩溃时任务重新投递，每个进程一次只预取一个任务
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    result_expires=24 * 3600,
+)
+
+if CELERY_BROKER_URL.startswith("filesystem://"):
+    broker_dir = CELERY_DATA_DIR / "broker"
+    (broker_dir / "out").mkdir(parents=True, exist_ok=True)
+    (broker_dir / "processed").mkdir(parents=True, exist_ok=True)
+    celery_app.conf.broker_transport_options = {
+        "data_folder_in": str(broker_dir / "out"),
+        "data_folder_out": str(broker_dir / "out"),
+        "processed_folder": str(broker_dir / "processed"),
+        "store_processed": False,
+    }
+
+if CELERY_RESULT_BACKEND.startswith("file://"):
+    Path(CELERY_RESULT_BACKEND[len("file://"):]).mkdir(parents=True, exist_ok=True)
+
+
+@worker_process_init.connect
+def _warm_up_worker(**_):
+    """worker 子进程启动时初始化数据库并预热共享的 NoteGenerator"""
+    from app.db.init_db import init_db
+    from app.services.note import get_note_generator
+    from app.services.task_status import get_task_status_store
+
+    init_db()
+    # worker 中的任务状态写回共享数据库，API 通过 /api/task_status 查询
+    get_task_status_store()
+    get_note_generator()
+    logger.info("Celery worker 进程已就绪")
+
+
+@worker_process_shutdown.connect
+def _flush_worker_status(**_):
+    """worker 子进程退出前写回剩余的任务状态"""
+    from app.services.task_status import get_task_status_store
+
+    get_task_status_store().stop()
@@ -0,0 +1,148 @@
+"""
+Celery 笔记生成任务
+
+worker 侧执行完整的 NoteGenerator.generate 流程，音频元信息、转写结果和笔记都写入产物缓存，
+任务返回值只是一个很小的指针（platform / video_id / 缓存键），避免大段文本经过消息代理和结果存储。
+API 侧通过 agenerate_note_via_worker 提交任务、异步等待完成，再按指针从产物缓存读取 NoteResult。
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from celery.result import AsyncResult
+from dotenv import load_dotenv
+
+from app.enmus.note_enums import DownloadQuality
+from app.models.notes_model import NoteResult
+from app.services.artifact_cache import get_artifact_cache
+from app.services.note import get_note_generator
+from app.utils.blocking_pool import run_blocking
+from app.utils.logger import get_logger
+from app.worker.celery_app import celery_app, CELERY_NOTE_QUEUE
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# API 侧等待单个笔记任务的超时时间（秒）与轮询间隔
+CELERY_NOTE_TIMEOUT = float(os.getenv("CELERY_NOTE_TIMEOUT", "1800"))
+CELERY_POLL_INTERVAL = float(os.getenv("CELERY_POLL_INTERVAL", "1"))
+
+
+@celery_app.task(name="notes.generate")
+def generate_note_task(
+    video_url: str,
+    platform: str,
+    task_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    provider_id: Optional[str] = None,
+    quality: str = DownloadQuality.medium.value,
+    video_understanding: bool = False,
+    video_interval: int = 0,
+    grid_size: Optional[List[int]] = None,
+) -> Dict[str, Any]:
+    """
+    在 worker 中生成单个视频的笔记
+
+    :return: 指向产物缓存的指针 {"platform", "video_id", "transcript_key", "note_key", "task_id"}
+    """
+    generator = get_note_generator()
+    # 先补全模型配置，保证 worker 计算的笔记缓存键与实际生成时一致
+    model_name, provider_id = generator._resolve_model_config(model_name, provider_id)
+    note_result = generator.generate(
+        video_url=video_url,
+        platform=platform,
+        quality=DownloadQuality(quality),
+        task_id=task_id,
+        model_name=model_name,
+        provider_id=provider_id,
+        video_understanding=video_understanding,
+        video_interval=video_interval,
+        grid_size=grid_size,
+    )
+    if not note_result:
+        raise RuntimeError(f"笔记生成失败: {video_url}")
+
+    return {
+        "platform": note_result.audio_meta.platform,
+        "video_id": note_result.audio_meta.video_id,
+        "transcript_key": generator._transcript_key_for(note_result.transcript),
+        "note_key": generator._note_cache_key(
+            model_name=model_name,
+            provider_id=provider_id,
+            transcript=note_result.transcript,
+            link=False,
+            screenshot=False,
+            formats=[],
+            style=None,
+            extras=None,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size or [],
+        ),
+        "task_id": task_id,
+    }
+
+
+def load_note_result(pointer: Dict[str, Any]) -> NoteResult:
+    """
+    根据任务返回的指针从产物缓存读取 NoteResult
+
+    :raises RuntimeError: 缓存中缺少对应产物（例如 API 与 worker 未共享 ARTIFACT_CACHE_DIR）
+    """
+    cache = get_artifact_cache()
+    platform, video_id = pointer["platform"], pointer["video_id"]
+    # 音频文件可能只存在于 worker 机器上，这里只需要元信息
+    audio_meta = cache.get_audio(platform, video_id, require_file=False)
+    transcript = cache.get_transcript(platform, video_id, pointer["transcript_key"])
+    markdown = cache.get_note(platform, video_id, pointer["note_key"])
+    if audio_meta is None or transcript is None or markdown is None:
+        raise RuntimeError(f"产物缓存中缺少笔记结果 ({platform}/{video_id})，请确认 API 与 worker 共享 ARTIFACT_CACHE_DIR")
+    return NoteResult(markdown=markdown, transcript=transcript, audio_meta=audio_meta)
+
+
+async def agenerate_note_via_worker(
+    video_url: str,
+    platform: str,
+    task_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    provider_id: Optional[str] = None,
+    quality: DownloadQuality = DownloadQuality.medium,
+    video_understanding: bool = False,
+    timeout: float = CELERY_NOTE_TIMEOUT,
+) -> NoteResult:
+    """
+    提交笔记任务到 Celery worker 并异步等待完成（不阻塞事件循环）
+
+    :raises TimeoutError: 超过 timeout 秒仍未完成
+    :raises Exception: worker 中的任务失败
+    """
+    # 提交任务和查询结果都是同步的网络调用（消息代理 / 结果存储），统一放到阻塞任务线程池中执行
+    async_result: AsyncResult = await run_blocking(
+        generate_note_task.apply_async,
+        kwargs={
+            "video_url": video_url,
+            "platform": platform,
+            "task_id": task_id,
+            "model_name": model_name,
+            "provider_id": provider_id,
+            "quality": DownloadQuality(quality).value,
+            "video_understanding": video_understanding,
+        },
+        queue=CELERY_NOTE_QUEUE,
+    )
+    logger.info(f"笔记任务已提交到 worker (celery_id={async_result.id}, task_id={task_id})")
+
+    deadline = time.monotonic() + timeout
+    # Celery 结果查询是同步接口，这里在线程池中轮询 ready()，等待期间让出事件循环
+    while not await run_blocking(async_result.ready):
+        if time.monotonic() > deadline:
+            await run_blocking(async_result.revoke)
+            raise TimeoutError(f"笔记任务超时 ({timeout:.0f}s): {video_url}")
+        await asyncio.sleep(CELERY_POLL_INTERVAL)
+
+    pointer = await run_blocking(async_result.get, propagate=True)
+    await run_blocking(async_result.forget)
+    return await run_blocking(load_note_result, pointer)
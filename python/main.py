@@ -2,13 +2,16 @@ import os
 import sys
 import uuid
 import re
+import json
+import asyncio
 import traceback
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 
 import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, field_validator
@@ -21,7 +24,15 @@ from app.exceptions.exception_handlers import register_exception_handlers
 # from app.db.provider_dao import init_provider_table
 from app.utils.logger import get_logger
 from app import create_app
-from app.transcriber.transcriber_provider import get_transcriber
+from app.services.config_cache import get_config_cache
+from app.services.note import get_note_generator
+from app.services.task_status import get_task_status_store
+from app.services.note_pipeline import init_note_pipeline, shutdown_note_pipeline, get_note_pipeline
+from app.gpt.client_pool import aclose_async_clients, client_pool_stats, close_clients
+from app.gpt.llm_cache import llm_cache_stats
+from app.gpt.transcript_compactor import compaction_stats
+from app.gpt.usage_metrics import usage_stats
+from app.utils.blocking_pool import get_blocking_executor, shutdown_blocking_executor
 from ffmpeg_helper import ensure_ffmpeg_or_raise
 
 # 添加 agent 目录到路径，以便导入 agent 模块
@@ -31,6 +42,15 @@ sys.path.insert(0, str(agent_path))
 from agent.graphs.agent_graph import build_multi_video_graph, build_example_video_graph
 from agent.graphs.node.video_search_node import video_search_node
 from agent.graphs.state import AIState
+from agent.utils.stream_events import (
+    EVENT_SEARCH_RESULTS,
+    EVENT_NOTE_DONE,
+    EVENT_NOTE_FAILED,
+    EVENT_SUMMARY_TOKEN,
+    EVENT_SUMMARY_SECTION,
+    EVENT_KEYFRAME,
+    TAG_NO_STREAM,
+)
 from app.db.conversation_dao import create_conversation, get_conversation_by_id, update_conversation_title
 from app.db.message_dao import create_message, get_messages_by_conversation_id
 from app.utils.conversation_helper import generate_conversation_title
@@ -60,9 +80,23 @@ if not os.path.exists(out_dir):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    get_transcriber(transcriber_type=os.getenv("TRANSCRIBER_TYPE", "groq"))
+    # 任务状态存储（内存注册表 + 后台写回数据库），需在数据库初始化之后启动
+    task_status_store = get_task_status_store()
+    # 预热共享的 NoteGenerator（读取一次流程配置并初始化转写器）
+    get_note_generator()
     seed_default_providers()
+    # 供应商 / 模型配置缓存，之后的请求不再逐次查询数据库
+    get_config_cache().refresh()
+    # 应用级共享的笔记生成流水线（全局并发上限、公平排队），所有请求共用
+    init_note_pipeline()
+    # 异步笔记引擎（NOTE_ENGINE=async）使用的阻塞任务线程池
+    get_blocking_executor()
     yield
+    shutdown_note_pipeline()
+    shutdown_blocking_executor()
+    await aclose_async_clients()
+    close_clients()
+    task_status_store.stop()
 
 app = create_app(lifespan=lifespan)
 
@@ -186,38 +220,23 @@ class ExampleVideoRequest(BaseModel):
         return v
 
 
-async def run_multi_video_query(
-    question: str,
+def load_conversation_context(
+    conversation_id: Optional[int],
     user_id: int,
-    session_id: str = None,
-    conversation_id: Optional[int] = None,
-    model_name: str = None,
-    provider_id: str = None,
-    max_videos: int = 5,
-    video_urls: Optional[List[str]] = None,
-    prefetched_videos: Optional[List[Dict[str, Any]]] = None,
-    search_query: Optional[str] = None,
-) -> MultiVideoState:
+    extract_previous_summary: bool = True,
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
     """
-    运行多视频搜索和总结查询
+    加载对话历史；没有 conversation_id 时创建新对话
     
     Args:
-        question: 用户问题
+        conversation_id: 对话ID（可选）
         user_id: 用户ID
-        session_id: 会话ID（可选）
-        conversation_id: 对话ID（可选，如果提供则加载历史消息）
-        model_name: 模型名称（可选）
-        provider_id: 提供商ID（可选）
+        extract_previous_summary: 是否从历史消息中提取之前的视频总结
         
     Returns:
-        MultiVideoState: 包含答案、笔记结果等信息的最终状态
+        (history, 当前对话ID, 之前的视频总结)
     """
-    if session_id is None:
-        session_id = str(uuid.uuid4())
-    
-    # 处理对话历史
     history = []
-    current_conversation_id = conversation_id
     previous_summary = None  # 用于存储之前的视频总结
     
     if conversation_id:
@@ -231,25 +250,86 @@ async def run_multi_video_query(
         
         # 从历史消息中提取第一次的总结（通常是第一条 assistant 消息，包含完整的视频总结）
         # 查找第一条 assistant 消息，如果它看起来像视频总结（包含关键帧、视频链接等），就作为 previous_summary
-        for msg in messages:
-            if msg.role == "assistant":
-                content = msg.content
-                # 判断是否是视频总结：包含关键帧图片链接或视频链接
-                if "![关键帧" in content or "查看原片" in content or "bilibili.com/video" in content:
-                    previous_summary = content
-                    logger.info(f"从历史消息中提取到之前的视频总结（长度: {len(content)} 字符）")
-                    break
-    else:
-        # 创建新对话（标题暂为空，后续自动生成）
-        conversation = create_conversation(user_id=user_id, title="")
-        current_conversation_id = conversation.id
-        logger.info(f"创建新对话: conversation_id={current_conversation_id}")
-    
-    # Build graph
-    graph = build_multi_video_graph()
+        if extract_previous_summary:
+            for msg in messages:
+                if msg.role == "assistant":
+                    content = msg.content
+                    # 判断是否是视频总结：包含关键帧图片链接或视频链接
+                    if "![关键帧" in content or "查看原片" in content or "bilibili.com/video" in content:
+                        previous_summary = content
+                        logger.info(f"从历史消息中提取到之前的视频总结（长度: {len(content)} 字符）")
+                        break
+        return history, conversation_id, previous_summary
     
-    # Initialize state
-    initial_state: MultiVideoState = {
+    # 创建新对话（标题暂为空，后续自动生成）
+    conversation = create_conversation(user_id=user_id, title="")
+    logger.info(f"创建新对话: conversation_id={conversation.id}")
+    return history, conversation.id, previous_summary
+
+
+async def save_conversation_turn(
+    conversation_id: Optional[int],
+    user_id: int,
+    question: str,
+    answer: str,
+    model_name: Optional[str] = None,
+    provider_id: Optional[str] = None,
+) -> None:
+    """
+    保存一轮问答到数据库，对话标题为空时自动生成标题
+    """
+    if not conversation_id or not answer:
+        return
+    try:
+        # 保存用户消息
+        create_message(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            role="user",
+            content=question
+        )
+        # 保存助手回复
+        create_message(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            role="assistant",
+            content=answer
+        )
+        logger.info(f"消息已保存到对话: conversation_id={conversation_id}")
+        
+        # 如果对话标题为空，自动生成标题
+        conversation = get_conversation_by_id(conversation_id)
+        if conversation and not conversation.title:
+            try:
+                title = await generate_conversation_title(
+                    question=question,
+                    answer=answer,
+                    model_name=model_name,
+                    provider_id=provider_id
+                )
+                update_conversation_title(conversation_id, title)
+                logger.info(f"对话标题已生成: {title}")
+            except Exception as e:
+                logger.error(f"生成对话标题失败: {e}")
+    except Exception as e:
+        logger.error(f"保存消息失败: {e}")
+        traceback.print_exc()
+
+
+def build_multi_video_state(
+    question: str,
+    user_id: int,
+    session_id: str,
+    history: List[Dict[str, Any]],
+    previous_summary: Optional[str],
+    model_name: Optional[str],
+    provider_id: Optional[str],
+    max_videos: int,
+    prefetched_videos: Optional[List[Dict[str, Any]]],
+    search_query: Optional[str],
+) -> MultiVideoState:
+    """构建多视频图的初始状态"""
+    return {
         "question": question,
         "user_id": user_id,
         "session_id": session_id,
@@ -267,6 +347,56 @@ async def run_multi_video_query(
         "trace_data": None,
         "max_videos": max_videos,  # 传递最大视频数量
     }
+
+
+async def run_multi_video_query(
+    question: str,
+    user_id: int,
+    session_id: str = None,
+    conversation_id: Optional[int] = None,
+    model_name: str = None,
+    provider_id: str = None,
+    max_videos: int = 5,
+    video_urls: Optional[List[str]] = None,
+    prefetched_videos: Optional[List[Dict[str, Any]]] = None,
+    search_query: Optional[str] = None,
+) -> MultiVideoState:
+    """
+    运行多视频搜索和总结查询
+    
+    Args:
+        question: 用户问题
+        user_id: 用户ID
+        session_id: 会话ID（可选）
+        conversation_id: 对话ID（可选，如果提供则加载历史消息）
+        model_name: 模型名称（可选）
+        provider_id: 提供商ID（可选）
+        
+    Returns:
+        MultiVideoState: 包含答案、笔记结果等信息的最终状态
+    """
+    if session_id is None:
+        session_id = str(uuid.uuid4())
+    
+    # 处理对话历史
+    history, current_conversation_id, previous_summary = load_conversation_context(conversation_id, user_id)
+    
+    # Build graph
+    graph = build_multi_video_graph()
+    
+    # Initialize state
+    initial_state = build_multi_video_state(
+        question=question,
+        user_id=user_id,
+        session_id=session_id,
+        history=history,
+        previous_summary=previous_summary,
+        model_name=model_name,
+        provider_id=provider_id,
+        max_videos=max_videos,
+        prefetched_videos=prefetched_videos,
+        search_query=search_query,
+    )
     
     # Run graph (异步)
     logger.info(f"Starting Multi-Video Graph - User ID: {user_id}, Conversation ID: {current_conversation_id}, Question: {question}, Max Videos: {max_videos}")
@@ -274,42 +404,14 @@ async def run_multi_video_query(
     result = await graph.ainvoke(initial_state)
     
     # 保存消息到数据库
-    answer = result.get("answer", "")
-    if current_conversation_id and answer:
-        try:
-            # 保存用户消息
-            create_message(
-                user_id=user_id,
-                conversation_id=current_conversation_id,
-                role="user",
-                content=question
-            )
-            # 保存助手回复
-            create_message(
-                user_id=user_id,
-                conversation_id=current_conversation_id,
-                role="assistant",
-                content=answer
-            )
-            logger.info(f"消息已保存到对话: conversation_id={current_conversation_id}")
-            
-            # 如果对话标题为空，自动生成标题
-            conversation = get_conversation_by_id(current_conversation_id)
-            if conversation and not conversation.title:
-                try:
-                    title = await generate_conversation_title(
-                        question=question,
-                        answer=answer,
-                        model_name=model_name,
-                        provider_id=provider_id
-                    )
-                    update_conversation_title(current_conversation_id, title)
-                    logger.info(f"对话标题已生成: {title}")
-                except Exception as e:
-                    logger.error(f"生成对话标题失败: {e}")
-        except Exception as e:
-            logger.error(f"保存消息失败: {e}")
-            traceback.print_exc()
+    await save_conversation_turn(
+        conversation_id=current_conversation_id,
+        user_id=user_id,
+        question=question,
+        answer=result.get("answer", ""),
+        model_name=model_name,
+        provider_id=provider_id,
+    )
     
     return result
 
@@ -422,6 +524,148 @@ async def multi_video_endpoint(
         return R.error(code=500, msg=f"处理失败: {error_detail}")
 
 
+# 流式接口的 SSE 心跳间隔（秒）
+MULTI_VIDEO_SSE_HEARTBEAT_SECONDS = 15
+# 总结 token 来自这些节点中的 LLM 流式输出
+STREAMING_ANSWER_NODES = ("summary", "chat")
+# 节点通过自定义事件上报、直接转发给前端的事件
+FORWARDED_CUSTOM_EVENTS = (EVENT_NOTE_DONE, EVENT_NOTE_FAILED, EVENT_SUMMARY_SECTION, EVENT_KEYFRAME)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _map_graph_event(event: Dict[str, Any]) -> Optional[str]:
+    """把 graph.astream_events 的事件转换为 SSE 消息，不需要推送的事件返回 None"""
+    kind = event.get("event")
+    name = event.get("name")
+    data = event.get("data") or {}
+    node = (event.get("metadata") or {}).get("langgraph_node")
+    
+    if kind == "on_custom_event" and name in FORWARDED_CUSTOM_EVENTS:
+        return _sse(name, data)
+    if kind == "on_chain_end" and name == "video_search" and node == "video_search":
+        output = data.get("output") or {}
+        return _sse(EVENT_SEARCH_RESULTS, {
+            "video_urls": output.get("video_urls") or [],
+            "search_query": output.get("search_query"),
+        })
+    if kind == "on_chat_model_stream" and node in STREAMING_ANSWER_NODES and TAG_NO_STREAM not in (event.get("tags") or []):
+        chunk = data.get("chunk")
+        text = getattr(chunk, "content", None)
+        if isinstance(text, str) and text:
+            return _sse(EVENT_SUMMARY_TOKEN, {"text": text})
+    return None
+
+
+async def stream_multi_video_query(
+    request: MultiVideoRequest,
+    user_id: int,
+) -> AsyncIterator[str]:
+    """
+    流式运行多视频工作流，按阶段产出 SSE 消息
+    
+    事件顺序：start → search_results → note_done / note_failed（每个视频一条）
+    → summary_token（模型原始增量文本）/ summary_section（去重后的完整章节）
+    → keyframe（每张关键帧）→ done；出错时发送 error
+    """
+    history, current_conversation_id, previous_summary = load_conversation_context(
+        request.conversation_id, user_id
+    )
+    yield _sse("start", {"conversation_id": current_conversation_id})
+    
+    graph = build_multi_video_graph()
+    initial_state = build_multi_video_state(
+        question=request.question,
+        user_id=user_id,
+        session_id=request.session_id or f"session_{user_id}",
+        history=history,
+        previous_summary=previous_summary,
+        model_name=request.model_name,
+        provider_id=request.provider_id,
+        max_videos=request.max_videos if request.max_videos is not None else 5,
+        prefetched_videos=request.prefetched_videos,
+        search_query=request.search_query,
+    )
+    logger.info(f"Starting Multi-Video Graph (stream) - User ID: {user_id}, Conversation ID: {current_conversation_id}, Question: {request.question}")
+    
+    # 图在后台任务中运行，事件经队列转发；队列空闲时发送心跳，避免代理断开长连接
+    queue: asyncio.Queue = asyncio.Queue()
+    final_state: Dict[str, Any] = {}
+    
+    async def produce():
+        try:
+            async for event in graph.astream_events(initial_state, version="v2"):
+                # 顶层图结束事件携带最终状态
+                if event.get("event") == "on_chain_end" and not event.get("parent_ids"):
+                    final_state.update((event.get("data") or {}).get("output") or {})
+                    continue
+                message = _map_graph_event(event)
+                if message:
+                    await queue.put(message)
+        except Exception as e:
+            logger.error(f"多视频流式工作流失败: {e}")
+            traceback.print_exc()
+            await queue.put(_sse("error", {"message": f"处理失败: {str(e)}"}))
+        finally:
+            await queue.put(None)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=MULTI_VIDEO_SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        # 客户端断开时停止工作流
+        if not producer.done():
+            producer.cancel()
+    
+    if not final_state:
+        return
+    
+    answer = final_state.get("answer") or ""
+    await save_conversation_turn(
+        conversation_id=current_conversation_id,
+        user_id=user_id,
+        question=request.question,
+        answer=answer,
+        model_name=request.model_name,
+        provider_id=request.provider_id,
+    )
+    yield _sse("done", {
+        "answer": answer or "抱歉，暂时无法生成总结内容。",
+        "metadata": final_state.get("metadata"),
+        "video_urls": final_state.get("video_urls"),
+        "search_query": final_state.get("search_query"),
+        "conversation_id": current_conversation_id,
+    })
+
+
+@app.post("/api/multi_video/stream")
+async def multi_video_stream_endpoint(
+    request: MultiVideoRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    多视频搜索和总结的流式接口（需要认证），以 Server-Sent Events 推送中间结果
+    
+    与 /api/multi_video 流程相同，但搜索结果、每个视频的笔记、总结文本和关键帧在产生时立即推送，
+    最后一条 done 事件包含与 /api/multi_video 相同的完整结果
+    """
+    return StreamingResponse(
+        stream_multi_video_query(request, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 async def run_example_video_query(
     question: str,
     video_ids: List[str],
@@ -450,22 +694,9 @@ async def run_example_video_query(
         session_id = str(uuid.uuid4())
     
     # 处理对话历史
-    history = []
-    current_conversation_id = conversation_id
-    
-    if conversation_id:
-        # 加载历史消息
-        messages = get_messages_by_conversation_id(conversation_id)
-        history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in messages
-        ]
-        logger.info(f"加载对话历史: conversation_id={conversation_id}, 消息数={len(history)}")
-    else:
-        # 创建新对话（标题暂为空，后续自动生成）
-        conversation = create_conversation(user_id=user_id, title="")
-        current_conversation_id = conversation.id
-        logger.info(f"创建新对话: conversation_id={current_conversation_id}")
+    history, current_conversation_id, _ = load_conversation_context(
+        conversation_id, user_id, extract_previous_summary=False
+    )
     
     # Build graph（使用example视频图）
     graph = build_example_video_graph()
@@ -496,42 +727,14 @@ async def run_example_video_query(
     result = await graph.ainvoke(initial_state)
     
     # 保存消息到数据库
-    answer = result.get("answer", "")
-    if current_conversation_id and answer:
-        try:
-            # 保存用户消息
-            create_message(
-                user_id=user_id,
-                conversation_id=current_conversation_id,
-                role="user",
-                content=question
-            )
-            # 保存助手回复
-            create_message(
-                user_id=user_id,
-                conversation_id=current_conversation_id,
-                role="assistant",
-                content=answer
-            )
-            logger.info(f"消息已保存到对话: conversation_id={current_conversation_id}")
-            
-            # 如果对话标题为空，自动生成标题
-            conversation = get_conversation_by_id(current_conversation_id)
-            if conversation and not conversation.title:
-                try:
-                    title = await generate_conversation_title(
-                        question=question,
-                        answer=answer,
-                        model_name=model_name,
-                        provider_id=provider_id
-                    )
-                    update_conversation_title(current_conversation_id, title)
-                    logger.info(f"对话标题已生成: {title}")
-                except Exception as e:
-                    logger.error(f"生成对话标题失败: {e}")
-        except Exception as e:
-            logger.error(f"保存消息失败: {e}")
-            traceback.print_exc()
+    await save_conversation_turn(
+        conversation_id=current_conversation_id,
+        user_id=user_id,
+        question=question,
+        answer=result.get("answer", ""),
+        model_name=model_name,
+        provider_id=provider_id,
+    )
     
     return result
 
@@ -610,6 +813,52 @@ async def health_check():
     }
 
 
+@app.get("/api/metrics/note_pipeline")
+async def note_pipeline_metrics():
+    """
+    笔记生成流水线的饱和度指标
+    包含全局准入（运行中/等待中/拒绝数、平均与最大等待时间）和各阶段的排队数、运行数、占用率
+    以及转写文本压缩累计节省的 token 数
+    """
+    return R.success(data={**get_note_pipeline().stats(), "transcript_compaction": compaction_stats()})
+
+
+@app.get("/api/metrics/http_clients")
+async def http_client_metrics():
+    """
+    OpenAI 兼容客户端池指标
+    包含是否启用 HTTP/2，以及同步/异步客户端的数量、复用命中数、新建数和因供应商变更失效的数量
+    """
+    return R.success(data=client_pool_stats())
+
+
+@app.get("/api/metrics/config_cache")
+async def config_cache_metrics():
+    """
+    供应商 / 模型配置缓存指标
+    包含缓存的供应商数和模型数、快照年龄，以及命中、加载和失效次数
+    """
+    return R.success(data=get_config_cache().stats())
+
+
+@app.get("/api/metrics/llm_cache")
+async def llm_cache_metrics():
+    """
+    LLM 响应缓存指标
+    包含当前条目数和总大小，以及命中、未命中、命中率、写入和淘汰次数
+    """
+    return R.success(data=llm_cache_stats())
+
+
+@app.get("/api/metrics/llm_usage")
+async def llm_usage_metrics():
+    """
+    LLM token 用量指标
+    按调用场景（note / title / agent）和模型汇总输入、输出 token 数，以及命中供应商提示词前缀缓存的输入 token 数和占比
+    """
+    return R.success(data=usage_stats())
+
+
 
 
 
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# 添加 backend（python 目录）到路径，测试中按 app.* 导入
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
@@ -0,0 +1,59 @@
+"""视频产物缓存的淘汰"""
+
+import os
+import time
+
+from app.models.audio_model import AudioDownloadResult
+from app.services.artifact_cache import VideoArtifactCache
+
+
+def put_video(cache: VideoArtifactCache, media_dir, video_id: str, with_video: bool = False) -> AudioDownloadResult:
+    audio_path = media_dir / f"{video_id}.m4a"
+    audio_path.write_bytes(b"audio")
+    (media_dir / f"{video_id}.asr.ogg").write_bytes(b"asr")
+    video_path = None
+    if with_video:
+        video_path = media_dir / f"{video_id}.mp4"
+        video_path.write_bytes(b"video")
+    audio = AudioDownloadResult(
+        file_path=str(audio_path),
+        title=video_id,
+        duration=1,
+        cover_url=None,
+        platform="bilibili",
+        video_id=video_id,
+        raw_info={},
+        video_path=str(video_path) if video_path else None,
+    )
+    cache.put_audio("bilibili", video_id, audio)
+    return audio
+
+
+def test_evict_removes_media_files(tmp_path):
+    media_dir = tmp_path / "data"
+    media_dir.mkdir()
+    cache = VideoArtifactCache(root=tmp_path / "artifacts", max_videos=1, ttl_days=0)
+
+    put_video(cache, media_dir, "BV1", with_video=True)
+    old = time.time() - 100
+    os.utime(tmp_path / "artifacts" / "bilibili" / "BV1", (old, old))
+    put_video(cache, media_dir, "BV2")
+
+    assert cache.evict(force=True) == 1
+    assert sorted(p.name for p in media_dir.iterdir()) == ["BV2.asr.ogg", "BV2.m4a"]
+    assert cache.get_audio("bilibili", "BV1") is None
+    assert cache.get_audio("bilibili", "BV2") is not None
+
+
+def test_evict_expired_tolerates_missing_files(tmp_path):
+    media_dir = tmp_path / "data"
+    media_dir.mkdir()
+    cache = VideoArtifactCache(root=tmp_path / "artifacts", max_videos=10, ttl_days=1)
+
+    audio = put_video(cache, media_dir, "BV1")
+    os.remove(audio.file_path)
+    old = time.time() - 2 * 24 * 3600
+    os.utime(tmp_path / "artifacts" / "bilibili" / "BV1", (old, old))
+
+    assert cache.evict(force=True) == 1
+    assert list(media_dir.iterdir()) == []
@@ -0,0 +1,34 @@
+"""转写前音频准备的选择结果缓存"""
+
+from app.utils import audio_prep
+
+
+def test_choices_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_prep, "MAX_CHOICES", 3)
+    monkeypatch.setattr(audio_prep, "_choices", audio_prep.OrderedDict())
+
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"chunk_{index:03d}.m4a"
+        path.write_bytes(b"audio")
+        paths.append(str(path))
+        # m4a 且大小在限制内，直接使用原文件，不调用 ffmpeg
+        assert audio_prep.prepare_asr_audio(str(path), max_bytes=1024) == str(path)
+
+    assert len(audio_prep._choices) == 3
+    assert [key[0] for key in audio_prep._choices] == paths[2:]
+
+
+def test_recently_used_choice_is_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_prep, "MAX_CHOICES", 2)
+    monkeypatch.setattr(audio_prep, "_choices", audio_prep.OrderedDict())
+
+    first, second, third = (tmp_path / name for name in ("a.m4a", "b.m4a", "c.m4a"))
+    for path in (first, second, third):
+        path.write_bytes(b"audio")
+    audio_prep.prepare_asr_audio(str(first))
+    audio_prep.prepare_asr_audio(str(second))
+    audio_prep.prepare_asr_audio(str(first))
+    audio_prep.prepare_asr_audio(str(third))
+
+    assert [key[0] for key in audio_prep._choices] == [str(first), str(third)]
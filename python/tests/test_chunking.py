@@ -0,0 +1,122 @@
+"""分片转写的切分规划与结果合并"""
+
+import pytest
+
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.transcriber.chunking import AudioChunk, merge_chunk_results, plan_chunks
+
+
+def segment(start: float, end: float, text: str) -> TranscriptSegment:
+    return TranscriptSegment(start=start, end=end, text=text)
+
+
+def result(*segments: TranscriptSegment, **raw) -> TranscriptResult:
+    return TranscriptResult(
+        language="zh",
+        full_text=" ".join(seg.text for seg in segments),
+        segments=list(segments),
+        raw=raw or None,
+    )
+
+
+def test_plan_chunks_cuts_at_nearest_silence():
+    # 目标切点 100s 附近有两段静音，选择中点离目标更近的 98s；
+    # 下一个目标 198s 附近没有静音，按时长硬切
+    chunks = plan_chunks(260, [(90, 91), (97.5, 98.5), (230, 231)], chunk_seconds=100, overlap_seconds=2)
+
+    assert [(c.own_start, c.own_end) for c in chunks] == [(0.0, 98.0), (98.0, 198.0), (198.0, 260)]
+    assert [(c.start, c.end) for c in chunks] == [(0.0, 100.0), (96.0, 200.0), (196.0, 260)]
+    assert [c.index for c in chunks] == [0, 1, 2]
+
+
+def test_plan_chunks_hard_cut_without_silence():
+    chunks = plan_chunks(260, [], chunk_seconds=100, overlap_seconds=0)
+    assert [(c.own_start, c.own_end) for c in chunks] == [(0.0, 100), (100, 200), (200, 260)]
+
+
+def test_plan_chunks_merges_short_tail():
+    # 剩余不足半个分片时并入最后一个分片
+    chunks = plan_chunks(240, [], chunk_seconds=100, overlap_seconds=0)
+    assert [(c.own_start, c.own_end) for c in chunks] == [(0.0, 100), (100, 240)]
+
+
+def test_plan_chunks_owned_ranges_cover_audio():
+    chunks = plan_chunks(1234.5, [(290, 291), (610, 612)], chunk_seconds=300, overlap_seconds=3)
+    assert chunks[0].own_start == 0
+    assert chunks[-1].own_end == 1234.5
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.own_end == nxt.own_start
+        assert prev.end - prev.own_end <= 3
+        assert nxt.own_start - nxt.start <= 3
+
+
+def test_merge_offsets_and_deduplicates_overlap():
+    chunks = [
+        AudioChunk(index=0, start=0, end=12, own_start=0, own_end=10),
+        AudioChunk(index=1, start=8, end=20, own_start=10, own_end=20),
+    ]
+    first = result(
+        segment(0, 4, "一"),
+        segment(4, 9, "二"),
+        # 中点 10.5 属于第二个分片，这里丢弃
+        segment(9, 12, "三"),
+    )
+    second = result(
+        # 分片内时间 0~2 对应原音频 8~10，中点 9 属于第一个分片，这里丢弃
+        segment(0, 2, "二"),
+        segment(1, 4, "三"),
+        segment(4, 12, "四"),
+    )
+
+    merged = merge_chunk_results(chunks, [first, second])
+
+    assert [(s.start, s.end, s.text) for s in merged.segments] == [
+        (0, 4, "一"),
+        (4, 9, "二"),
+        (9, 12, "三"),
+        (12, 20, "四"),
+    ]
+    assert merged.full_text == "一 二 三 四"
+    assert merged.language == "zh"
+    assert merged.raw["chunks"] == [{"start": 0, "end": 12}, {"start": 8, "end": 20}]
+
+
+def test_merge_boundary_midpoint_belongs_to_next_chunk():
+    chunks = [
+        AudioChunk(index=0, start=0, end=12, own_start=0, own_end=10),
+        AudioChunk(index=1, start=8, end=20, own_start=10, own_end=20),
+    ]
+    # 中点恰好落在切点 10s：只由后一个分片保留
+    first = result(segment(9, 11, "边界"))
+    second = result(segment(1, 3, "边界"), segment(10, 12, "结尾"))
+
+    merged = merge_chunk_results(chunks, [first, second])
+
+    assert [(s.start, s.text) for s in merged.segments] == [(9, "边界"), (18, "结尾")]
+
+
+def test_merge_last_chunk_keeps_segment_at_end():
+    chunks = [AudioChunk(index=0, start=0, end=10, own_start=0, own_end=10)]
+    merged = merge_chunk_results(chunks, [result(segment(10, 10, "尾"))])
+    assert [s.text for s in merged.segments] == ["尾"]
+
+
+@pytest.mark.parametrize(
+    "backends, expected",
+    [
+        (("groq", "groq"), "groq"),
+        (("groq", "fast-whisper"), "auto"),
+        ((None, None), None),
+    ],
+)
+def test_merge_records_transcriber_backend(backends, expected):
+    chunks = [
+        AudioChunk(index=0, start=0, end=12, own_start=0, own_end=10),
+        AudioChunk(index=1, start=8, end=20, own_start=10, own_end=20),
+    ]
+    results = [
+        result(segment(0, 1, "a"), **({"transcriber": name} if name else {}))
+        for name in backends
+    ]
+    merged = merge_chunk_results(chunks, results)
+    assert merged.raw.get("transcriber") == expected
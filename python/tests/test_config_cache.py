@@ -0,0 +1,143 @@
+"""供应商 / 模型配置缓存：TTL、写入失效与跨进程同步"""
+
+import pytest
+
+from app.services import config_cache, provider as provider_module
+from app.services.config_cache import ConfigCache, _Snapshot
+from app.services.provider import ProviderService
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """用字典代替 providers / models 表，记录加载次数"""
+    state = {
+        "providers": {
+            "p1": {"id": "p1", "name": "one", "type": "openai", "api_key": "key-1",
+                   "base_url": "https://one.example/v1", "enabled": 1},
+        },
+        "models": [{"id": 1, "provider_id": "p1", "model_name": "m1"}],
+        "loads": 0,
+    }
+
+    def load():
+        state["loads"] += 1
+        return _Snapshot(
+            providers={k: dict(v) for k, v in state["providers"].items()},
+            models=[dict(m) for m in state["models"]],
+        )
+
+    monkeypatch.setattr(ConfigCache, "_load", staticmethod(load))
+    return state
+
+
+def test_reads_are_served_from_snapshot(db):
+    cache = ConfigCache(ttl=60, stamp_file="")
+
+    assert cache.get_provider("p1")["name"] == "one"
+    assert cache.get_models("p1")[0]["model_name"] == "m1"
+    assert cache.get_providers()[0]["id"] == "p1"
+    assert db["loads"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_returned_dicts_do_not_leak_into_snapshot(db):
+    cache = ConfigCache(ttl=60, stamp_file="")
+
+    cache.get_provider("p1")["api_key"] = "****"
+    assert cache.get_provider("p1")["api_key"] == "key-1"
+
+
+def test_expired_snapshot_is_reloaded(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(config_cache.time, "monotonic", lambda: now[0])
+    cache = ConfigCache(ttl=10, stamp_file="")
+
+    cache.get_providers()
+    now[0] += 5
+    cache.get_providers()
+    assert db["loads"] == 1
+
+    db["providers"]["p1"]["name"] = "renamed"
+    now[0] += 10
+    assert cache.get_provider("p1")["name"] == "renamed"
+    assert db["loads"] == 2
+
+
+def test_invalidate_forces_reload(db):
+    cache = ConfigCache(ttl=60, stamp_file="")
+    cache.get_providers()
+
+    del db["providers"]["p1"]
+    assert cache.get_provider("p1") is not None
+
+    cache.invalidate()
+    assert cache.get_provider("p1") is None
+    assert db["loads"] == 2
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_stamp_file_invalidates_other_processes(db, tmp_path):
+    stamp = str(tmp_path / "sync" / "config_cache.stamp")
+    writer = ConfigCache(ttl=60, stamp_file=stamp)
+    reader = ConfigCache(ttl=60, stamp_file=stamp)
+
+    reader.get_providers()
+    reader.get_providers()
+    assert db["loads"] == 1
+
+    db["providers"]["p1"]["base_url"] = "https://new.example/v1"
+    writer.invalidate()
+
+    assert reader.get_provider("p1")["base_url"] == "https://new.example/v1"
+    assert db["loads"] == 2
+
+
+@pytest.fixture
+def service(db, monkeypatch):
+    """ProviderService 写库走字典，记录被失效的客户端"""
+    cache = ConfigCache(ttl=60, stamp_file="")
+    dropped = []
+
+    def update(id, **fields):
+        db["providers"][id].update(fields)
+
+    def delete(id):
+        return db["providers"].pop(id, None) is not None
+
+    monkeypatch.setattr(provider_module, "get_config_cache", lambda: cache)
+    monkeypatch.setattr(provider_module, "update_provider", update)
+    monkeypatch.setattr(provider_module, "delete_provider", delete)
+    monkeypatch.setattr(provider_module, "invalidate_provider_clients",
+                        lambda base_url, api_key: dropped.append((base_url, api_key)))
+    return cache, dropped
+
+
+def test_update_provider_invalidates_cache_and_clients(db, service):
+    cache, dropped = service
+    assert ProviderService.get_provider_by_id("p1")["api_key"] == "key-1"
+
+    assert ProviderService.update_provider("p1", {"api_key": "key-2", "name": None}) == "p1"
+
+    assert ProviderService.get_provider_by_id("p1")["api_key"] == "key-2"
+    assert dropped == [("https://one.example/v1", "key-1")]
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_update_without_credential_change_keeps_clients(db, service):
+    cache, dropped = service
+
+    ProviderService.update_provider("p1", {"name": "renamed"})
+
+    assert ProviderService.get_provider_by_id("p1")["name"] == "renamed"
+    assert dropped == []
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_delete_provider_invalidates_cache_and_clients(db, service):
+    cache, dropped = service
+    ProviderService.get_provider_by_id("p1")
+
+    assert ProviderService.delete_provider("p1") is True
+
+    assert ProviderService.get_provider_by_id("p1") is None
+    assert dropped == [("https://one.example/v1", "key-1")]
@@ -0,0 +1,85 @@
+"""总结证据选择：BM25 相关度排序、token 预算与均匀采样补齐"""
+
+import sys
+from pathlib import Path
+
+# agent 内部按 utils.* / graphs.* 导入，需把 agent 目录加入路径
+agent_path = Path(__file__).parent.parent / "agent"
+sys.path.insert(0, str(agent_path))
+
+from utils.evidence_selector import BM25Index, select_evidence, tokenize
+from app.gpt.token_utils import estimate_tokens
+
+FILLER = ["开场介绍今天的安排", "讲一下背景和动机", "回顾上一期的内容", "感谢大家的支持", "预告下一期的主题"]
+
+
+def segments(texts):
+    return [{"start": i * 10, "text": text} for i, text in enumerate(texts)]
+
+
+def starts(selected):
+    return [seg["start"] for seg in selected]
+
+
+def test_tokenize_cjk_bigrams_and_english_words():
+    assert tokenize("缓存淘汰") == ["缓存", "存淘", "淘汰"]
+    assert tokenize("的 LRU cache is fast") == ["的", "lru", "cache", "fast"]
+
+
+def test_bm25_ranks_matching_documents_first():
+    scores = BM25Index(["缓存淘汰策略", "音频转码流程", "缓存和并发，缓存淘汰"]).score("缓存淘汰")
+
+    assert scores[1] == 0
+    assert scores[0] > 0 and scores[2] > 0
+    # 未出现的查询词不影响得分
+    assert BM25Index(["缓存淘汰策略"]).score("缓存淘汰 完全无关") == BM25Index(["缓存淘汰策略"]).score("缓存淘汰")
+
+
+def test_relevant_segments_selected_in_time_order():
+    texts = FILLER * 4
+    texts[7] = "这里讲 LRU 缓存淘汰的实现"
+    texts[15] = "LRU 缓存淘汰的性能测量"
+
+    selected = select_evidence(segments(texts), "LRU 缓存淘汰怎么实现", top_k=2)
+
+    assert starts(selected) == [70, 150]
+
+
+def test_uniform_sampling_fills_remaining_slots():
+    texts = FILLER * 4
+    texts[7] = "这里讲 LRU 缓存淘汰的实现"
+
+    selected = select_evidence(segments(texts), "LRU 缓存淘汰", top_k=4)
+
+    # 相关片段优先，其余名额按步长 20 // 4 = 5 均匀采样
+    assert starts(selected) == [0, 50, 70, 100]
+
+
+def test_without_question_samples_uniformly():
+    selected = select_evidence(segments(FILLER * 4), "  ", top_k=5)
+    assert starts(selected) == [0, 40, 80, 120, 160]
+
+
+def test_token_budget_skips_segments_that_do_not_fit():
+    long_text = "LRU 缓存淘汰" + "细节" * 200
+    texts = ["LRU 缓存淘汰的简介", long_text, "缓存淘汰的测量", "", "无关的内容"]
+    budget = estimate_tokens(texts[0]) + estimate_tokens(texts[2]) + estimate_tokens(texts[4])
+
+    selected = select_evidence(segments(texts), "LRU 缓存淘汰", top_k=10, max_tokens=budget, max_chars=1000)
+
+    # 超长片段放不下时跳过，继续选择后面能放下的片段；空片段不选
+    assert starts(selected) == [0, 20, 40]
+    assert sum(estimate_tokens(seg["text"]) for seg in selected) <= budget
+
+
+def test_long_segment_is_budgeted_by_truncated_text():
+    texts = ["LRU 缓存淘汰" + "细节" * 200]
+    budget = estimate_tokens(texts[0][:150])
+
+    assert starts(select_evidence(segments(texts), "LRU", top_k=1, max_tokens=budget)) == [0]
+    assert select_evidence(segments(texts), "LRU", top_k=1, max_tokens=budget, max_chars=1000) == []
+
+
+def test_empty_input():
+    assert select_evidence([], "问题") == []
+    assert select_evidence(segments(FILLER), "问题", top_k=0) == []
@@ -0,0 +1,62 @@
+"""笔记流水线的全局准入：按请求轮询出队与排队上限"""
+
+import pytest
+
+from app.exceptions.biz_exception import BizException
+from app.services.note_pipeline import FairAdmission, NoteJob
+
+
+def make_job(group: str, index: int) -> NoteJob:
+    return NoteJob(
+        video_url=f"https://example.com/{group}/{index}",
+        platform="bilibili",
+        task_id=f"{group}-{index}",
+        model_name=None,
+        provider_id=None,
+        group=group,
+    )
+
+
+def test_admission_round_robin_between_groups():
+    admission = FairAdmission(max_inflight=1, max_pending=10)
+    assert admission.acquire(make_job("a", 0))
+
+    # 请求 a 一次提交了 3 个视频，请求 b 随后提交 2 个
+    for index in range(1, 4):
+        assert not admission.acquire(make_job("a", index))
+    for index in range(2):
+        assert not admission.acquire(make_job("b", index))
+
+    order = []
+    while True:
+        job = admission.release()
+        if job is None:
+            break
+        order.append(job.task_id)
+    assert order == ["a-1", "b-0", "a-2", "b-1", "a-3"]
+    assert admission.pending == 0
+
+
+def test_admission_rejects_when_pending_full():
+    admission = FairAdmission(max_inflight=1, max_pending=2)
+    assert admission.acquire(make_job("a", 0))
+    assert not admission.acquire(make_job("a", 1))
+    assert not admission.acquire(make_job("b", 0))
+
+    with pytest.raises(BizException) as exc_info:
+        admission.acquire(make_job("c", 0))
+    assert exc_info.value.code == 503
+    assert admission.rejected == 1
+    assert admission.pending == 2
+
+
+def test_admission_drain_returns_waiting_jobs():
+    admission = FairAdmission(max_inflight=1, max_pending=10)
+    admission.acquire(make_job("a", 0))
+    admission.acquire(make_job("a", 1))
+    admission.acquire(make_job("b", 0))
+
+    drained = admission.drain()
+    assert sorted(job.task_id for job in drained) == ["a-1", "b-0"]
+    assert admission.pending == 0
+    assert admission.release() is None
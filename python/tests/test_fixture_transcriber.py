@@ -0,0 +1,32 @@
+"""离线替身转写器"""
+
+import json
+
+from app.transcriber.fixture import SYNTHETIC_SEGMENTS, FixtureTranscriber
+
+
+def test_reads_fixture_by_audio_name(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    fixtures.mkdir()
+    (fixtures / "BV1.json").write_text(json.dumps({
+        "language": "zh",
+        "segments": [{"start": 0, "end": 2, "text": "你好"}, {"start": 2, "end": 4, "text": "世界"}],
+    }), encoding="utf-8")
+
+    # 转码产物 BV1.asr.ogg 与原音频共用同一个夹具
+    result = FixtureTranscriber(fixture_dir=str(fixtures), delay=0).transcript(str(tmp_path / "BV1.asr.ogg"))
+
+    assert result.language == "zh"
+    assert result.full_text == "你好 世界"
+    assert [(s.start, s.text) for s in result.segments] == [(0, "你好"), (2, "世界")]
+
+
+def test_synthetic_result_is_deterministic(tmp_path):
+    transcriber = FixtureTranscriber(fixture_dir=str(tmp_path), delay=0)
+    first = transcriber.transcript(str(tmp_path / "BV2.m4a"))
+    second = transcriber.transcript(str(tmp_path / "BV2.m4a"))
+    other = transcriber.transcript(str(tmp_path / "BV3.m4a"))
+
+    assert len(first.segments) == SYNTHETIC_SEGMENTS
+    assert first.full_text == second.full_text
+    assert first.full_text != other.full_text
@@ -0,0 +1,166 @@
+"""LLM 响应缓存：过期、LRU 淘汰与缓存键规范化"""
+
+import pytest
+
+from app.gpt import llm_cache
+from app.gpt.llm_cache import LLMCache, make_llm_cache_key
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_cache.time, "time", fake)
+    return fake
+
+
+def make_cache(tmp_path, **kwargs) -> LLMCache:
+    options = {"ttl_hours": 1, "max_entries": 100, "max_mb": 10}
+    options.update(kwargs)
+    return LLMCache(path=str(tmp_path / "llm_cache.db"), **options)
+
+
+def test_put_and_get(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    assert cache.get("k") is None
+    cache.put("k", "响应", model="m", provider="p")
+    assert cache.get("k") == "响应"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (1, 1, 1, 1)
+
+
+def test_empty_response_is_not_cached(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put("k", "")
+    assert cache.stats()["entries"] == 0
+
+
+def test_entry_expires_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_hours=1)
+    cache.put("k", "value")
+
+    clock.advance(3599)
+    assert cache.get("k") == "value"
+
+    # 读取不会延长有效期：过期按写入时间计算
+    clock.advance(2)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_zero_ttl_never_expires(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_hours=0)
+    cache.put("k", "value")
+    clock.advance(10 * 365 * 24 * 3600)
+    assert cache.get("k") == "value"
+
+
+def test_put_removes_expired_entries(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_hours=1)
+    cache.put("old", "value")
+    clock.advance(3601)
+    cache.put("new", "value")
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_entry_cap(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("a", "1")
+    clock.advance(1)
+    cache.put("b", "2")
+    clock.advance(1)
+    # 访问 a 后，b 成为最久未访问的条目
+    assert cache.get("a") == "1"
+    clock.advance(1)
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_size_cap(tmp_path, clock):
+    # 上限 2KB，每条 1000 字节
+    cache = make_cache(tmp_path, max_mb=2048 / (1024 * 1024))
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 1000)
+        clock.advance(1)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["size_bytes"] == 2000
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_size_counts_utf8_bytes(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put("k", "中文")
+    assert cache.stats()["size_bytes"] == 6
+
+
+def test_cache_persists_across_instances(tmp_path, clock):
+    make_cache(tmp_path).put("k", "value")
+    assert make_cache(tmp_path).get("k") == "value"
+
+
+def test_key_ignores_whitespace_differences():
+    messages = [
+        {"role": "system", "content": "你是助手"},
+        {"role": "user", "content": "第一行\n第二行"},
+    ]
+    noisy = [
+        {"role": "system", "content": "\n你是助手   \n"},
+        {"role": "user", "content": "第一行  \r\n第二行\t\r\n\n"},
+    ]
+    assert make_llm_cache_key("m", "https://api.example.com/v1", messages, 0.7) == make_llm_cache_key(
+        "m", "https://api.example.com/v1/", noisy, 0.7
+    )
+
+
+def test_key_normalizes_multimodal_text_parts():
+    image = {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}
+    messages = [{"role": "user", "content": [{"type": "text", "text": "描述图片"}, image]}]
+    noisy = [{"role": "user", "content": [{"type": "text", "text": "描述图片 \r\n"}, image]}]
+    assert make_llm_cache_key("m", "p", messages) == make_llm_cache_key("m", "p", noisy)
+
+
+def test_key_normalizes_string_prompt():
+    assert make_llm_cache_key("m", "p", "提示词\r\n") == make_llm_cache_key("m", "p", "提示词")
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"model": "other"},
+        {"provider": "https://other.example.com"},
+        {"messages": [{"role": "user", "content": "另一个问题"}]},
+        {"messages": [{"role": "system", "content": "问题"}]},
+        {"temperature": 0.2},
+        {"max_tokens": 100},
+    ],
+)
+def test_key_distinguishes_meaningful_differences(changes):
+    base = {
+        "model": "m",
+        "provider": "https://api.example.com",
+        "messages": [{"role": "user", "content": "问题"}],
+        "temperature": 0.7,
+    }
+    assert make_llm_cache_key(**base) != make_llm_cache_key(**{**base, **changes})
+
+
+def test_key_keeps_inner_whitespace():
+    assert make_llm_cache_key("m", "p", "a  b") != make_llm_cache_key("m", "p", "a b")
@@ -0,0 +1,183 @@
+"""长转写分段生成（map-reduce）：按 token 预算切分、分段提示词与合并时保留时间标记"""
+
+import asyncio
+import re
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.gpt import universal_gpt
+from app.gpt.token_utils import estimate_tokens, split_segments_by_tokens
+from app.gpt.universal_gpt import UniversalGPT
+from app.models.gpt_model import GPTSource
+from app.models.transcriber_model import TranscriptSegment
+from app.services.note_config import NotePipelineConfig
+
+MAP_MARKER = "补充说明（分段生成）"
+
+
+def segments(count: int, seconds: int = 60):
+    return [
+        TranscriptSegment(start=i * seconds, end=(i + 1) * seconds, text=f"第{i}段讲解的内容，包括若干细节和例子")
+        for i in range(count)
+    ]
+
+
+def prompt_text(messages) -> str:
+    return messages[0]["content"][0]["text"]
+
+
+def _reply(messages) -> str:
+    text = prompt_text(messages)
+    if MAP_MARKER not in text:
+        return "合并后的笔记"
+    # 局部笔记：用本部分第一条转写的时间作为章节时间标记
+    first = re.search(r"^(\d{2}:\d{2}) - ", text, re.M).group(1)
+    return f"## 部分 {first} *Content-[{first}]"
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, messages):
+        with self._lock:
+            self.calls.append(messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=_reply(messages)))],
+            usage=None,
+        )
+
+    def create(self, model, messages, temperature, **params):
+        return self._record(messages)
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, model, messages, temperature, **params):
+        return self._record(messages)
+
+
+def fake_client(completions):
+    return SimpleNamespace(
+        base_url="https://llm.example/v1",
+        api_key="key",
+        chat=SimpleNamespace(completions=completions),
+    )
+
+
+def render(seg: TranscriptSegment) -> str:
+    return UniversalGPT(None, "m")._render_segment(seg)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """每段预算容纳两条转写，总量超过阈值即分段"""
+    segs = segments(6)
+    per_line = max(estimate_tokens(render(seg)) + 1 for seg in segs)
+    cfg = NotePipelineConfig(
+        note_map_reduce_threshold_tokens=per_line * 3,
+        note_map_chunk_tokens=per_line * 2,
+        transcript_compaction=False,
+    )
+    monkeypatch.setattr(universal_gpt, "get_note_config", lambda: cfg)
+    return cfg
+
+
+def source(segs, **kwargs):
+    return GPTSource(
+        segment=segs,
+        title="长视频",
+        tags="",
+        _format=["toc", "link", "screenshot"],
+        video_img_urls=["https://img.example/grid.jpg"],
+        use_cache=False,
+        **kwargs,
+    )
+
+
+def test_split_keeps_order_and_budget():
+    segs = segments(7)
+    budget = max(estimate_tokens(render(seg)) + 1 for seg in segs) * 3
+
+    groups = split_segments_by_tokens(segs, budget, render=render)
+
+    assert [seg for group in groups for seg in group] == segs
+    assert [len(group) for group in groups] == [3, 3, 1]
+    for group in groups:
+        assert sum(estimate_tokens(render(seg)) + 1 for seg in group) <= budget
+
+
+def test_split_puts_oversized_segment_alone():
+    segs = segments(3)
+    big = TranscriptSegment(start=30, end=40, text="很长的一段" * 50)
+    budget = estimate_tokens(render(segs[0])) * 2 + 2
+
+    groups = split_segments_by_tokens([segs[0], big, segs[1], segs[2]], budget, render=render)
+
+    assert groups == [[segs[0]], [big], [segs[1], segs[2]]]
+
+
+def test_short_transcript_is_not_split(config):
+    gpt = UniversalGPT(None, "m")
+    assert gpt._plan_map_reduce(segments(3)) is None
+    assert len(gpt._plan_map_reduce(segments(6))) == 3
+
+
+def test_map_reduce_disabled_by_zero_threshold(monkeypatch):
+    cfg = NotePipelineConfig(note_map_reduce_threshold_tokens=0)
+    monkeypatch.setattr(universal_gpt, "get_note_config", lambda: cfg)
+    assert UniversalGPT(None, "m")._plan_map_reduce(segments(500)) is None
+
+
+def _check_map_reduce(calls, result):
+    maps = [prompt_text(m) for m in calls if MAP_MARKER in prompt_text(m)]
+    merges = [m for m in calls if MAP_MARKER not in prompt_text(m)]
+    assert len(maps) == 3 and len(merges) == 1
+    assert result == "合并后的笔记"
+
+    for text in maps:
+        # 分段只保留时间标记要求，目录和截图留到合并阶段
+        assert "*Content-[mm:ss]" in text
+        assert "**目录**" not in text
+        assert "*Screenshot-[mm:ss]" not in text
+    assert sorted(re.search(r"第 (\d)/3 部分", t).group(1) for t in maps) == ["1", "2", "3"]
+    assert any("第 2/3 部分（02:00 - 04:00）" in t for t in maps)
+
+    # 合并提示词按时间顺序原样带上各部分的时间标记，截图只随合并请求发送
+    merge = merges[0][0]["content"]
+    merge_text = merge[0]["text"]
+    positions = [merge_text.index(f"*Content-[{t}]") for t in ("00:00", "02:00", "04:00")]
+    assert positions == sorted(positions)
+    assert "原样保留" in merge_text and "**目录**" in merge_text
+    assert [part["type"] for part in merge] == ["text", "image_url"]
+    for messages in calls:
+        if messages is not merges[0]:
+            assert len(messages[0]["content"]) == 1
+
+
+def test_summarize_maps_chunks_and_keeps_time_markers(config):
+    completions = FakeCompletions()
+    gpt = UniversalGPT(fake_client(completions), "m")
+
+    result = gpt.summarize(source(segments(6)))
+
+    _check_map_reduce(completions.calls, result)
+
+
+def test_asummarize_maps_chunks_and_keeps_time_markers(config):
+    completions = FakeAsyncCompletions()
+    gpt = UniversalGPT(fake_client(FakeCompletions()), "m", async_client=fake_client(completions))
+
+    result = asyncio.run(gpt.asummarize(source(segments(6))))
+
+    _check_map_reduce(completions.calls, result)
+
+
+def test_short_transcript_is_one_request(config):
+    completions = FakeCompletions()
+    gpt = UniversalGPT(fake_client(completions), "m")
+
+    assert gpt.summarize(source(segments(2))) == "合并后的笔记"
+    assert len(completions.calls) == 1
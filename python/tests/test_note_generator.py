@@ -0,0 +1,26 @@
+"""NoteGenerator 的去重键与缓存键"""
+
+from app.services.note import NoteGenerator
+
+
+def flight_key(url: str, **options) -> str:
+    defaults = {"model_name": "qwen-plus", "provider_id": "qwen", "link": False, "screenshot": False}
+    return NoteGenerator._flight_key(video_url=url, platform="bilibili", **{**defaults, **options})
+
+
+def test_flight_key_uses_video_id_not_url():
+    assert flight_key("https://www.bilibili.com/video/BV1vc411b7Wa") == flight_key(
+        "https://www.bilibili.com/video/BV1vc411b7Wa/?spm_id_from=333.1007&vd_source=abc"
+    )
+
+
+def test_flight_key_distinguishes_videos_and_options():
+    base = flight_key("https://www.bilibili.com/video/BV1vc411b7Wa")
+    assert base != flight_key("https://www.bilibili.com/video/BV1xx411c7mD")
+    assert base != flight_key("https://www.bilibili.com/video/BV1vc411b7Wa", screenshot=True)
+    assert base != flight_key("https://www.bilibili.com/video/BV1vc411b7Wa", model_name="deepseek-chat")
+
+
+def test_flight_key_falls_back_to_url():
+    key = flight_key("https://example.com/watch/123")
+    assert key.startswith("bilibili:https://example.com/watch/123:")
@@ -0,0 +1,121 @@
+"""笔记流水线的阶段背压"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from app.services.note_pipeline import STAGE_AUDIO_PREP, STAGE_DOWNLOAD, NoteJob, NotePipeline, PipelineStage
+
+
+def make_job(group: str, index: int) -> NoteJob:
+    return NoteJob(
+        video_url=f"https://example.com/{group}/{index}",
+        platform="bilibili",
+        task_id=f"{group}-{index}",
+        model_name=None,
+        provider_id=None,
+        group=group,
+    )
+
+
+def test_stage_backpressure_blocks_upstream():
+    stage = PipelineStage("test", workers=1, queue_size=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        release.wait(timeout=5)
+        return job.task_id
+
+    try:
+        first = stage.submit(work, make_job("a", 0))
+        started.wait(timeout=5)
+        second = stage.submit(work, make_job("a", 1))
+
+        # 1 个运行 + 1 个排队后阶段已满，阻塞提交需要等待空位
+        submitted = threading.Event()
+        results = []
+
+        def submit_third():
+            results.append(stage.submit(work, make_job("a", 2)))
+            submitted.set()
+
+        producer = threading.Thread(target=submit_third)
+        producer.start()
+        assert not submitted.wait(timeout=0.2)
+
+        release.set()
+        assert submitted.wait(timeout=5)
+        producer.join(timeout=5)
+        assert [f.result(timeout=5) for f in (first, second, results[0])] == ["a-0", "a-1", "a-2"]
+        assert stage.stats()["completed"] == 3
+    finally:
+        release.set()
+        stage.shutdown()
+
+
+def test_stage_non_blocking_submit_does_not_wait():
+    stage = PipelineStage("test", workers=1, queue_size=0)
+    release = threading.Event()
+
+    try:
+        first = stage.submit(lambda job: release.wait(timeout=5), make_job("a", 0))
+        # 入口阶段不等待：阶段已满时仍立即提交，且不占用槽位
+        second = stage.submit(lambda job: job.task_id, make_job("a", 1), block=False)
+        release.set()
+        assert first.result(timeout=5) is True
+        assert second.result(timeout=5) == "a-1"
+
+        # 未占用槽位的任务完成后不会多释放槽位
+        third = stage.submit(lambda job: job.task_id, make_job("a", 2))
+        assert third.result(timeout=5) == "a-2"
+    finally:
+        release.set()
+        stage.shutdown()
+
+
+def test_stage_counts_failures():
+    stage = PipelineStage("test", workers=1, queue_size=1)
+
+    def fail(job):
+        raise RuntimeError("boom")
+
+    try:
+        with pytest.raises(RuntimeError):
+            stage.submit(fail, make_job("a", 0)).result(timeout=5)
+        stats = stage.stats()
+        assert stats["failed"] == 1
+        assert stats["running"] == 0
+    finally:
+        stage.shutdown()
+
+
+def test_handoff_outside_pipeline_threads_does_not_block():
+    pipeline = NotePipeline(stage_workers={name: 1 for name in NotePipeline.STAGES}, queue_size=0)
+    release = threading.Event()
+    ran = threading.Event()
+    pipeline._handlers[STAGE_AUDIO_PREP] = lambda job: ran.set()
+
+    try:
+        # 下游阶段已满
+        blocker = pipeline._stages[STAGE_AUDIO_PREP].submit(lambda job: release.wait(timeout=5), make_job("a", 0))
+
+        # 入口阶段在 add_done_callback 之前就已完成：回调在调用方线程（如事件循环）中执行
+        done = Future()
+        done.set_result(STAGE_AUDIO_PREP)
+        job = make_job("b", 0)
+        started = time.monotonic()
+        pipeline._on_stage_done(job, STAGE_DOWNLOAD, done)
+        assert time.monotonic() - started < 0.5
+        assert not ran.is_set()
+
+        release.set()
+        assert blocker.result(timeout=5) is True
+        assert ran.wait(timeout=5)
+        assert job.future.result(timeout=5).markdown is None
+    finally:
+        release.set()
+        pipeline.shutdown()
@@ -0,0 +1,275 @@
+"""single-flight 去重：结果共享、取消与异常传递"""
+
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future
+
+import pytest
+
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_share_runs_once_and_shares_result():
+    flight = SingleFlight("test")
+    inner = Future()
+    starts = []
+
+    def start():
+        starts.append(1)
+        return inner
+
+    leader, leader_shared = flight.share("k", start)
+    follower, follower_shared = flight.share("k", start)
+    assert (leader_shared, follower_shared) == (False, True)
+    assert len(starts) == 1
+
+    inner.set_result(42)
+    assert leader.result(timeout=1) == 42
+    assert follower.result(timeout=1) == 42
+    assert flight.inflight_count() == 0
+
+
+def test_cancelling_one_caller_does_not_affect_others():
+    flight = SingleFlight("test")
+    inner = Future()
+    leader, _ = flight.share("k", lambda: inner)
+    follower, _ = flight.share("k", lambda: inner)
+
+    assert follower.cancel()
+    assert not inner.cancelled()
+    assert not leader.done()
+
+    inner.set_result("ok")
+    assert leader.result(timeout=1) == "ok"
+    assert follower.cancelled()
+
+
+def test_cancelling_leader_keeps_followers_waiting():
+    flight = SingleFlight("test")
+    inner = Future()
+    leader, _ = flight.share("k", lambda: inner)
+    follower, _ = flight.share("k", lambda: inner)
+
+    assert leader.cancel()
+    inner.set_result("ok")
+    assert follower.result(timeout=1) == "ok"
+
+
+def test_exception_propagates_to_all_callers():
+    flight = SingleFlight("test")
+    inner = Future()
+    leader, _ = flight.share("k", lambda: inner)
+    follower, _ = flight.share("k", lambda: inner)
+
+    inner.set_exception(ValueError("boom"))
+    for future in (leader, follower):
+        with pytest.raises(ValueError, match="boom"):
+            future.result(timeout=1)
+    assert flight.inflight_count() == 0
+
+
+def test_inner_cancellation_propagates():
+    flight = SingleFlight("test")
+    inner = Future()
+    leader, _ = flight.share("k", lambda: inner)
+    follower, _ = flight.share("k", lambda: inner)
+
+    inner.cancel()
+    for future in (leader, follower):
+        with pytest.raises(CancelledError):
+            future.result(timeout=1)
+
+
+def test_start_failure_is_raised_and_key_released():
+    flight = SingleFlight("test")
+
+    def start():
+        raise RuntimeError("submit failed")
+
+    with pytest.raises(RuntimeError):
+        flight.share("k", start)
+    assert flight.inflight_count() == 0
+
+    inner = Future()
+    future, shared = flight.share("k", lambda: inner)
+    assert not shared
+    inner.set_result(1)
+    assert future.result(timeout=1) == 1
+
+
+def test_new_flight_after_completion():
+    flight = SingleFlight("test")
+    first = Future()
+    flight.share("k", lambda: first)
+    first.set_result(1)
+
+    second = Future()
+    future, shared = flight.share("k", lambda: second)
+    assert not shared
+    second.set_result(2)
+    assert future.result(timeout=1) == 2
+    assert flight.stats()["executed"] == 2
+
+
+def test_do_shares_result_between_threads():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "done"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(timeout=5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    follower.start()
+    while flight.stats()["shared"] == 0:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert len(calls) == 1
+    assert sorted(results, key=lambda r: r[1]) == [("done", False), ("done", True)]
+
+
+def test_do_propagates_exception_to_followers_and_releases_key():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("download failed")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", work)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(timeout=5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.stats()["shared"] == 0:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert errors == ["download failed", "download failed"]
+    assert flight.inflight_count() == 0
+    # 失败后下一次调用重新执行
+    assert flight.do("k", lambda: "retry") == ("retry", False)
+
+
+def test_do_runs_different_keys_independently():
+    flight = SingleFlight("test")
+    barrier = threading.Barrier(2, timeout=5)
+
+    def work(value):
+        # 两个 key 必须同时执行才能通过 barrier
+        barrier.wait()
+        return value
+
+    results = []
+    threads = [threading.Thread(target=lambda v=v: results.append(flight.do(v, work, v))) for v in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert sorted(results) == [("a", False), ("b", False)]
+    assert flight.stats()["executed"] == 2
+
+
+def test_async_do_shares_one_execution():
+    flight = AsyncSingleFlight("test")
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work, 21) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert calls == [21]
+    assert sorted(results, key=lambda r: r[1]) == [(42, False), (42, True), (42, True)]
+    assert flight.stats() == {"inflight": 0, "executed": 1, "shared": 2}
+
+
+def test_async_leader_cancellation_does_not_cancel_followers():
+    flight = AsyncSingleFlight("test")
+    release = None
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == ("done", True)
+
+
+def test_async_exception_propagates_and_key_is_released():
+    flight = AsyncSingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        retry = await flight.do("k", asyncio.sleep, 0, "ok")
+        return results, retry
+
+    results, retry = asyncio.run(main())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert retry == ("ok", False)
+
+
+def test_async_work_finishes_after_all_callers_cancel():
+    flight = AsyncSingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.01)
+        finished.append(True)
+        return "done"
+
+    async def main():
+        caller = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        return flight.stats()["inflight"]
+
+    assert asyncio.run(main()) == 0
+    assert finished == [True]
@@ -0,0 +1,169 @@
+"""任务状态存储：写回、淘汰与跨线程推送"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.enmus.task_status_enums import TaskStatus
+from app.services import task_status
+from app.services.task_status import TaskStatusStore
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """用字典代替 task_statuses 表"""
+    rows = {}
+
+    def upsert(records):
+        for record in records:
+            rows[record["task_id"]] = dict(record)
+
+    monkeypatch.setattr(task_status, "upsert_task_statuses", upsert)
+    monkeypatch.setattr(task_status, "get_task_status", lambda task_id: rows.get(task_id))
+    return rows
+
+
+def test_update_is_written_behind(db):
+    store = TaskStatusStore(flush_interval=60)
+    store.update("t1", TaskStatus.DOWNLOADING)
+    store.update("t1", TaskStatus.TRANSCRIBING)
+
+    assert store.get("t1")["status"] == TaskStatus.TRANSCRIBING.value
+    assert db == {}
+
+    assert store.flush() == 1
+    assert db["t1"]["status"] == TaskStatus.TRANSCRIBING.value
+    assert store.flush() == 0
+
+
+def test_failed_flush_is_retried_without_losing_newer_state(db, monkeypatch):
+    store = TaskStatusStore(flush_interval=60)
+    store.update("t1", TaskStatus.DOWNLOADING)
+
+    def fail(records):
+        store.update("t1", TaskStatus.TRANSCRIBING)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(task_status, "upsert_task_statuses", fail)
+    assert store.flush() == 0
+
+    monkeypatch.setattr(task_status, "upsert_task_statuses", lambda records: db.update({r["task_id"]: r for r in records}))
+    assert store.flush() == 1
+    assert db["t1"]["status"] == TaskStatus.TRANSCRIBING.value
+
+
+def test_get_falls_back_to_database(db):
+    db["old"] = {"task_id": "old", "status": TaskStatus.SUCCESS.value, "message": None, "updated_at": None}
+    store = TaskStatusStore(flush_interval=60)
+    assert store.get("old")["status"] == TaskStatus.SUCCESS.value
+    assert store.get("missing") is None
+
+
+def test_eviction_keeps_unflushed_entries(db):
+    store = TaskStatusStore(flush_interval=60, max_entries=2)
+    store.update("a", TaskStatus.SUCCESS)
+    store.update("b", TaskStatus.FAILED)
+    store.update("c", TaskStatus.SUCCESS)
+
+    # 都还没写回数据库，淘汰会丢失状态，因此暂时超出上限
+    assert all(store.get(task_id) for task_id in ("a", "b", "c"))
+    assert set(db) == set()
+
+    store.flush()
+    store.update("d", TaskStatus.DOWNLOADING)
+    # 写回后淘汰最早完成的任务，进行中的任务和未写回的任务保留
+    with store._lock:
+        assert list(store._statuses) == ["c", "d"]
+    assert store.get("a")["status"] == TaskStatus.SUCCESS.value  # 从数据库读取
+
+
+def test_eviction_keeps_running_tasks(db):
+    store = TaskStatusStore(flush_interval=60, max_entries=1)
+    store.update("a", TaskStatus.DOWNLOADING)
+    store.flush()
+    store.update("b", TaskStatus.DOWNLOADING)
+    store.flush()
+    with store._lock:
+        assert list(store._statuses) == ["a", "b"]
+
+
+def test_get_persisted_prefers_unflushed_memory(db):
+    store = TaskStatusStore(flush_interval=60)
+    # 其他进程（如 Celery worker）写回的状态
+    db["t1"] = {"task_id": "t1", "status": TaskStatus.SUCCESS.value, "message": None, "updated_at": None}
+    assert store.get_persisted("t1")["status"] == TaskStatus.SUCCESS.value
+
+    store.update("t1", TaskStatus.FAILED)
+    assert store.get_persisted("t1") is None
+    store.flush()
+    assert store.get_persisted("t1")["status"] == TaskStatus.FAILED.value
+
+
+def test_publish_from_other_thread(db):
+    store = TaskStatusStore(flush_interval=60)
+
+    async def main():
+        only_t1 = store.subscribe("t1")
+        everything = store.subscribe()
+        worker = threading.Thread(target=lambda: [
+            store.update("t2", TaskStatus.DOWNLOADING),
+            store.update("t1", TaskStatus.SUCCESS, "done"),
+        ])
+        worker.start()
+        worker.join()
+        try:
+            record = await asyncio.wait_for(only_t1.get(), timeout=1)
+            received = [await asyncio.wait_for(everything.get(), timeout=1) for _ in range(2)]
+        finally:
+            store.unsubscribe(only_t1)
+            store.unsubscribe(everything)
+        return record, received
+
+    record, received = asyncio.run(main())
+    assert (record["task_id"], record["status"], record["message"]) == ("t1", TaskStatus.SUCCESS.value, "done")
+    assert [r["task_id"] for r in received] == ["t2", "t1"]
+
+
+def test_slow_subscriber_keeps_latest_state(db, monkeypatch):
+    monkeypatch.setattr(task_status, "SUBSCRIBER_QUEUE_SIZE", 2)
+    store = TaskStatusStore(flush_interval=60)
+
+    async def main():
+        queue = store.subscribe("t1")
+        for status in (TaskStatus.DOWNLOADING, TaskStatus.TRANSCRIBING, TaskStatus.SUCCESS):
+            store.update("t1", status)
+        await asyncio.sleep(0)
+        items = []
+        while not queue.empty():
+            items.append(queue.get_nowait()["status"])
+        store.unsubscribe(queue)
+        return items
+
+    assert asyncio.run(main()) == [TaskStatus.TRANSCRIBING.value, TaskStatus.SUCCESS.value]
+
+
+def test_background_flusher_writes_back_and_stop_flushes_rest(db):
+    store = TaskStatusStore(flush_interval=0.01)
+    store.start()
+    try:
+        store.update("t1", TaskStatus.DOWNLOADING)
+        for _ in range(200):
+            if "t1" in db:
+                break
+            threading.Event().wait(0.01)
+        assert db["t1"]["status"] == TaskStatus.DOWNLOADING.value
+    finally:
+        store.stop()
+
+    # 停止后的剩余状态由 stop() 写回
+    store.update("t2", TaskStatus.SUCCESS)
+    store.stop()
+    assert db["t2"]["status"] == TaskStatus.SUCCESS.value
+
+
+def test_update_without_task_id_is_ignored(db):
+    store = TaskStatusStore(flush_interval=60)
+    store.update(None, TaskStatus.SUCCESS)
+    store.update("", TaskStatus.SUCCESS)
+    assert store.flush() == 0
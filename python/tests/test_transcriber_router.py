@@ -0,0 +1,132 @@
+"""转写路由器的后端选择与回退"""
+
+import asyncio
+
+import pytest
+
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.services.note_config import NotePipelineConfig
+from app.transcriber import router as router_module
+from app.transcriber.base import Transcriber
+from app.transcriber.router import TranscriberRouter
+from app.transcriber.transcriber_provider import TranscriberCapabilities
+
+
+class FakeTranscriber(Transcriber):
+    def __init__(self, name: str, error: Exception = None):
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    def transcript(self, file_path: str) -> TranscriptResult:
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return TranscriptResult(language="zh", full_text=self.name, segments=[TranscriptSegment(start=0, end=1, text=self.name)])
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """用假的后端替换转写器注册表：groq 只能直接接受 25 字节以内的文件，fast-whisper 为本地后端"""
+    capabilities = {
+        "groq": TranscriberCapabilities(max_file_bytes=25, max_concurrency=2),
+        "fast-whisper": TranscriberCapabilities(max_concurrency=1, local=True),
+    }
+    instances = {name: FakeTranscriber(name) for name in capabilities}
+    monkeypatch.setattr(router_module, "list_transcribers", lambda: list(capabilities))
+    monkeypatch.setattr(router_module, "get_capabilities", lambda name: capabilities[name])
+    monkeypatch.setattr(router_module, "get_transcriber", lambda name: instances[name])
+    return instances
+
+
+def test_unknown_backends_are_dropped(backends):
+    router = TranscriberRouter(["whisper-cpp", "groq", "fast-whisper"])
+    assert router.backends == ["groq", "fast-whisper"]
+    assert router.select(10) == ["groq", "fast-whisper"]
+
+
+def test_no_known_backends_raises(backends):
+    with pytest.raises(ValueError):
+        TranscriberRouter(["whisper-cpp"])
+
+
+def test_config_drops_unknown_route_backends(monkeypatch):
+    monkeypatch.setenv("TRANSCRIBER_ROUTE_BACKENDS", "groq, whisper-cpp, faster-whisper, auto, groq")
+    assert NotePipelineConfig.from_env().transcriber_backends == ("groq", "fast-whisper")
+
+    monkeypatch.setenv("TRANSCRIBER_ROUTE_BACKENDS", "whisper-cpp")
+    assert NotePipelineConfig.from_env().transcriber_backends == ("groq",)
+
+
+@pytest.fixture
+def audio(tmp_path):
+    def make(size: int) -> str:
+        path = tmp_path / f"audio_{size}.m4a"
+        path.write_bytes(b"x" * size)
+        return str(path)
+    return make
+
+
+def test_selects_backend_that_accepts_file_size(backends, audio):
+    router = TranscriberRouter(["groq", "fast-whisper"])
+    assert router.select(10) == ["groq", "fast-whisper"]
+    # 超过 groq 的上传限制时优先本地后端
+    assert router.select(100) == ["fast-whisper", "groq"]
+
+    result = router.transcript(audio(100))
+    assert result.full_text == "fast-whisper"
+    assert result.raw == {"transcriber": "fast-whisper"}
+
+
+def test_prefers_less_loaded_backend(backends):
+    router = TranscriberRouter(["groq", "fast-whisper"])
+    with router._track("groq"), router._track("groq"):
+        # groq 已满载（2/2），fast-whisper 空闲
+        assert router.select(10) == ["fast-whisper", "groq"]
+    assert router.select(10) == ["groq", "fast-whisper"]
+
+
+def test_falls_back_on_backend_error(backends, audio):
+    backends["groq"].error = RuntimeError("rate limited")
+    router = TranscriberRouter(["groq", "fast-whisper"])
+
+    result = router.transcript(audio(10))
+
+    assert result.full_text == "fast-whisper"
+    assert result.raw["transcriber"] == "fast-whisper"
+    assert backends["groq"].calls == 1
+    stats = router.stats()
+    assert stats["groq"]["failures"] == 1
+    assert stats["groq"]["inflight"] == 0
+
+
+def test_async_falls_back_on_backend_error(backends, audio):
+    backends["groq"].error = RuntimeError("rate limited")
+    router = TranscriberRouter(["groq", "fast-whisper"])
+
+    result = asyncio.run(router.atranscript(audio(10)))
+
+    assert result.raw["transcriber"] == "fast-whisper"
+
+
+def test_raises_last_error_when_all_backends_fail(backends, audio):
+    backends["groq"].error = RuntimeError("rate limited")
+    backends["fast-whisper"].error = RuntimeError("model missing")
+    router = TranscriberRouter(["groq", "fast-whisper"])
+
+    with pytest.raises(RuntimeError, match="model missing"):
+        router.transcript(audio(10))
+
+
+def test_backend_that_fails_to_create_is_removed(backends, audio, monkeypatch):
+    def get_transcriber(name):
+        if name == "groq":
+            raise ImportError("groq sdk missing")
+        return backends[name]
+
+    monkeypatch.setattr(router_module, "get_transcriber", get_transcriber)
+    router = TranscriberRouter(["groq", "fast-whisper"])
+
+    assert router.transcript(audio(10)).full_text == "fast-whisper"
+    assert router.select(10) == ["fast-whisper"]
+    assert router.stats()["groq"]["available"] is False
@@ -0,0 +1,117 @@
+"""转写文本压缩：填充词、重复片段、时间桶合并与 token 预算"""
+
+import pytest
+
+from app.gpt.transcript_compactor import compact_segments
+from app.gpt.token_utils import estimate_tokens
+from app.models.transcriber_model import TranscriptSegment
+
+
+def render(seg: TranscriptSegment) -> str:
+    # 与 UniversalGPT._render_segment 相同的行格式
+    minutes, seconds = divmod(int(seg.start), 60)
+    return f"{minutes:02d}:{seconds:02d} - {seg.text}"
+
+
+def rendered_tokens(segments) -> int:
+    return sum(estimate_tokens(render(seg)) + 1 for seg in segments)
+
+
+TOPICS = ["缓存淘汰策略", "并发控制", "音频转码", "分片转写", "提示词压缩", "流式总结", "证据检索", "任务调度"]
+
+
+def long_segments(count: int = 20):
+    return [
+        TranscriptSegment(
+            start=i * 60,
+            end=i * 60 + 50,
+            text="".join(f"第{i}段第{j}句介绍{TOPICS[(i + j) % len(TOPICS)]}的实现和测量结果。" for j in range(1 + i % 4)),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("max_tokens", [200, 400, 800])
+def test_budget_is_respected_including_line_overhead(max_tokens):
+    result = compact_segments(long_segments(), bucket_seconds=0, max_tokens=max_tokens, render=render)
+
+    assert result.truncated
+    assert result.compacted_tokens <= max_tokens
+    assert rendered_tokens(result.segments) == result.compacted_tokens
+    # 段落和时间锚点全部保留
+    assert [seg.start for seg in result.segments] == [seg.start for seg in long_segments()]
+
+
+def test_budget_smaller_than_anchors_keeps_anchors_only():
+    result = compact_segments(long_segments(), bucket_seconds=0, max_tokens=10, render=render)
+    assert len(result.segments) == 20
+    assert all(seg.text == "…" for seg in result.segments)
+
+
+def test_within_budget_is_not_truncated():
+    segments = long_segments(2)
+    result = compact_segments(segments, bucket_seconds=0, max_tokens=10_000, render=render)
+    assert not result.truncated
+    assert [seg.text for seg in result.segments] == [seg.text for seg in segments]
+
+
+def seg(start: float, text: str, length: float = 2) -> TranscriptSegment:
+    return TranscriptSegment(start=start, end=start + length, text=text)
+
+
+def test_filler_only_segments_are_dropped():
+    segments = [
+        seg(0, "嗯嗯"),
+        seg(2, "那个，啊……"),
+        seg(4, "Um, uh, you know"),
+        seg(6, "好的"),
+        seg(8, "   "),
+        seg(10, "那个缓存要先加锁"),
+    ]
+    result = compact_segments(segments, bucket_seconds=0, render=render)
+
+    # 含有实际内容的片段原样保留，不删除其中的填充词
+    assert [(s.start, s.text) for s in result.segments] == [(10, "那个缓存要先加锁")]
+    assert result.dropped == 5
+
+
+def test_repeated_recognition_is_dropped():
+    segments = [
+        seg(0, "今天讲分片转写"),
+        seg(2, "今天讲分片转写。"),
+        seg(4, "今天讲分片转写！"),
+        seg(6, "Today we talk about chunked transcription"),
+        seg(8, "today we talk about chunked transcription."),
+    ]
+    result = compact_segments(segments, bucket_seconds=0, render=render)
+
+    assert [s.start for s in result.segments] == [0, 6]
+    assert result.dropped == 3
+
+
+def test_duplicate_outside_window_is_kept():
+    texts = ["第一句是开场白", "第二句讲缓存策略", "第三句讲并发控制", "第四句讲音频转码", "第一句是开场白"]
+    result = compact_segments([seg(i * 2, t) for i, t in enumerate(texts)], bucket_seconds=0, render=render)
+
+    assert [s.text for s in result.segments] == texts
+    assert result.dropped == 0
+
+
+def test_segments_are_merged_into_time_buckets():
+    segments = [
+        seg(0, "先看缓存"),
+        seg(10, "再看并发。"),
+        seg(20, "最后是转码"),
+        seg(30, "First part"),
+        seg(40, "second part"),
+        seg(65, "新的段落", length=5),
+    ]
+    result = compact_segments(segments, bucket_seconds=30, render=render)
+
+    assert [(s.start, s.end, s.text) for s in result.segments] == [
+        (0, 22, "先看缓存，再看并发。最后是转码"),
+        (30, 42, "First part second part"),
+        (65, 70, "新的段落"),
+    ]
+    assert result.compacted_tokens == rendered_tokens(result.segments)
+    assert result.tokens_saved == result.original_tokens - result.compacted_tokens